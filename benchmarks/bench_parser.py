@@ -0,0 +1,121 @@
+"""请求解析基准：标准库的 parse_request（email 包）与 Handler 自带的解析器。
+
+用法：
+    python benchmarks/bench_parser.py [次数]
+
+stdlib  — http.server.BaseHTTPRequestHandler.parse_request，请求头解析为 email.message.Message
+fast    — HTTPRequestHandler.parse_request，请求头解析为 Headers
+split   — 同一请求目标用原来的 split_Path 写法与 split_target 分割为路径与参数
+"""
+import io
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import unquote
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cryskura.Handler import HTTPRequestHandler, split_target
+
+# 典型的 API 请求与浏览器请求
+REQUESTS = {
+    "api": (
+        b"POST /api/v1/items/42?fields=name,size&sort=desc HTTP/1.1\r\n"
+        b"Host: 127.0.0.1:8080\r\n"
+        b"User-Agent: python-requests/2.31.0\r\n"
+        b"Accept: */*\r\n"
+        b"Content-Type: application/json\r\n"
+        b"Content-Length: 2\r\n"
+        b"\r\n"
+    ),
+    "browser": (
+        b"GET /files/%E6%96%87%E6%A1%A3/report%202024.pdf?preview HTTP/1.1\r\n"
+        b"Host: files.example.com\r\n"
+        b"User-Agent: Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0\r\n"
+        b"Accept: text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8\r\n"
+        b"Accept-Language: zh-CN,zh;q=0.8,en-US;q=0.5,en;q=0.3\r\n"
+        b"Accept-Encoding: gzip, deflate, br, zstd\r\n"
+        b"Connection: keep-alive\r\n"
+        b"Cookie: session=7f3a9c1e2b4d6f80; theme=dark\r\n"
+        b"Upgrade-Insecure-Requests: 1\r\n"
+        b"Sec-Fetch-Dest: document\r\n"
+        b"Sec-Fetch-Mode: navigate\r\n"
+        b"Sec-Fetch-Site: none\r\n"
+        b"If-None-Match: \"5f2-1700000000\"\r\n"
+        b"\r\n"
+    ),
+}
+
+
+def make_handler():
+    handler = HTTPRequestHandler.__new__(HTTPRequestHandler)
+    handler.wfile = io.BytesIO()
+    handler.request_body = None
+    return handler
+
+
+def old_split_path(target):
+    # 改写前 split_Path 的实现
+    path = unquote(target).split("?", 1)
+    if len(path) == 1:
+        path, args = path[0], ""
+    else:
+        path, args = path
+    path = path.replace("\\", "/").split("/")
+    if path[0] == "":
+        path.pop(0)
+    if path[-1] == "":
+        path.pop(-1)
+    args = args.split("&")
+    processed_args = {}
+    for arg in args:
+        if "=" not in arg:
+            if arg != "":
+                processed_args[arg] = ""
+        else:
+            arg = arg.split("=", 1)
+            processed_args[arg[0]] = arg[1]
+    return path, processed_args
+
+
+def bench_parse(parse, raw, rounds):
+    handler = make_handler()
+    line, _, _ = raw.partition(b"\r\n")
+    head = raw[len(line) + 2:]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        handler.raw_requestline = line + b"\r\n"
+        handler.rfile = io.BytesIO(head)
+        assert parse(handler)
+    elapsed = time.perf_counter() - start
+    assert handler.headers.get("host")
+    return elapsed
+
+
+def bench_split(split, target, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        split(target)
+    return time.perf_counter() - start
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"{'request':>8} {'stdlib (us)':>12} {'fast (us)':>10} {'split old (us)':>15} {'split new (us)':>15}")
+    for name, raw in REQUESTS.items():
+        target = raw.split(b" ", 2)[1].decode("iso-8859-1")
+        assert old_split_path(target) == split_target(target)
+        results = [
+            # 取三次中最快的一次
+            min(bench_parse(BaseHTTPRequestHandler.parse_request, raw, rounds) for _ in range(3)),
+            min(bench_parse(HTTPRequestHandler.parse_request, raw, rounds) for _ in range(3)),
+            min(bench_split(old_split_path, target, rounds) for _ in range(3)),
+            min(bench_split(split_target, target, rounds) for _ in range(3)),
+        ]
+        us = [r / rounds * 1e6 for r in results]
+        print(f"{name:>8} {us[0]:>12.2f} {us[1]:>10.2f} {us[2]:>15.2f} {us[3]:>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""路由查找微基准：逐个 Route.match 线性扫描 vs 编译后的 RouteTable。
+
+用法：
+    python benchmarks/bench_routes.py [服务数量 ...]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cryskura.Services import BaseService, Route
+from cryskura.Services.RouteTable import RouteTable
+
+
+class _Service(BaseService):
+    def handle_GET(self, request, path, args):
+        pass
+
+
+def build_services(count):
+    services = []
+    for i in range(count):
+        services.append(_Service([
+            Route(f"/mount{i}/files", ["GET", "HEAD"], "prefix"),
+            Route(f"/api/v1/item{i}", ["POST"], "exact"),
+        ]))
+    # 兜底的根目录服务放在最后，与常见的配置相同
+    services.append(_Service([Route("/", ["GET", "HEAD"], "prefix")]))
+    return services
+
+
+def linear_lookup(services, path, method, host, port):
+    path_exists = False
+    for service in services:
+        for route in service.routes:
+            can_handle, path_ok = route.match(path, method, host, port)
+            if path_ok:
+                path_exists = True
+            if can_handle:
+                return service, True
+    return None, path_exists
+
+
+def main():
+    counts = [int(c) for c in sys.argv[1:]] or [1, 10, 100, 500]
+    paths = [
+        ["mount0", "files", "a", "b.txt"],   # 第一个服务命中
+        ["static", "index.html"],            # 落到最后的根目录服务
+        ["api", "v1", "item3"],              # 路径存在但方法不允许（405）
+    ]
+    print(f"{'services':>8} {'path':<28} {'linear (us)':>12} {'trie (us)':>10} {'speedup':>8}")
+    for count in counts:
+        services = build_services(count)
+        table = RouteTable(services)
+        for path in paths:
+            for method in ("GET",):
+                assert linear_lookup(services, path, method, "localhost", 8080) == \
+                    table.lookup(path, method, "localhost", 8080)
+                n = 20000 if count <= 100 else 2000
+                t_linear = timeit.timeit(
+                    lambda: linear_lookup(services, path, method, "localhost", 8080), number=n) / n * 1e6
+                t_trie = timeit.timeit(
+                    lambda: table.lookup(path, method, "localhost", 8080), number=n) / n * 1e6
+                print(f"{count:>8} {'/' + '/'.join(path):<28} {t_linear:>12.2f} {t_trie:>10.2f} {t_linear / t_trie:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""上传吞吐基准：multipart 解析器本身，以及经 localhost 的完整 HTTP 上传。
+
+用法：
+    python benchmarks/bench_upload.py [文件大小 MB ...]
+
+parser  — _read_multipart_upload 从内存流解析并写入临时目录（/dev/shm 可用时使用内存文件系统）
+copy    — 同样的数据只做 readinto + write，作为解析器吞吐的上限参考
+http    — 启动 FileService(allowUpload=True)，用 http.client 经 localhost 上传
+"""
+import http.client
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from cryskura import Server
+from cryskura.Services import FileService
+from cryskura.Services.FileService.upload import _read_multipart_upload
+
+BOUNDARY = b"----CryskuraBenchBoundary7MA4YWxkTrZu0gW"
+PORT = 18765
+
+
+def make_body(size):
+    # 伪随机内容，避免全零数据让 find 过快
+    block = os.urandom(1024 * 1024)
+    data = (block * (size // len(block) + 1))[:size]
+    return (
+        b"--" + BOUNDARY + b"\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="bench.bin"\r\n'
+        b"Content-Type: application/octet-stream\r\n\r\n"
+        + data + b"\r\n--" + BOUNDARY + b"--\r\n"
+    )
+
+
+def temp_dir():
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    return tempfile.mkdtemp(prefix="cryskura-bench-", dir=base)
+
+
+def bench_parser(body):
+    dest = temp_dir()
+    try:
+        start = time.perf_counter()
+        saved, errors, _ = _read_multipart_upload(io.BytesIO(body), len(body), BOUNDARY, dest)
+        elapsed = time.perf_counter() - start
+        assert len(saved) == 1 and not errors
+    finally:
+        shutil.rmtree(dest)
+    return elapsed
+
+
+def bench_copy(body):
+    dest = temp_dir()
+    try:
+        stream = io.BytesIO(body)
+        buf = bytearray(1024 * 1024)
+        view = memoryview(buf)
+        start = time.perf_counter()
+        with open(os.path.join(dest, "bench.bin"), "wb") as f:
+            while True:
+                n = stream.readinto(buf)
+                if not n:
+                    break
+                f.write(view[:n])
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(dest)
+    return elapsed
+
+
+def bench_http(body):
+    dest = temp_dir()
+    server = Server(
+        interface="127.0.0.1", port=PORT, forcePort=True,
+        services=[FileService(dest, "/", allowUpload=True)],
+    )
+    server.start()
+    try:
+        time.sleep(0.3)
+        conn = http.client.HTTPConnection("127.0.0.1", PORT)
+        start = time.perf_counter()
+        conn.request("POST", "/", body=body, headers={
+            "Content-Type": "multipart/form-data; boundary=" + BOUNDARY.decode(),
+            "Content-Length": str(len(body)),
+        })
+        response = conn.getresponse()
+        response.read()
+        elapsed = time.perf_counter() - start
+        conn.close()
+        assert response.status == 201, response.status
+    finally:
+        server.stop()
+        shutil.rmtree(dest)
+    return elapsed
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1:]] or [64, 512]
+    print(f"{'size (MB)':>9} {'parser (MB/s)':>14} {'copy (MB/s)':>12} {'http (MB/s)':>12}")
+    for size in sizes:
+        body = make_body(size * 1024 * 1024)
+        results = []
+        for bench in (bench_parser, bench_copy, bench_http):
+            # 取三次中最快的一次
+            best = min(bench(body) for _ in range(3))
+            results.append(len(body) / best / 1024 / 1024)
+        print(f"{size:>9} {results[0]:>14.0f} {results[1]:>12.0f} {results[2]:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
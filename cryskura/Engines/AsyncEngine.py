@@ -0,0 +1,446 @@
+"""asyncio 服务器引擎：连接由事件循环管理，服务处理函数在线程池中执行。
+
+空闲的 keep-alive 连接和慢速客户端只占用一个协程，不占用线程；
+只有正在执行服务处理函数（解析、路由、业务逻辑）的请求才占用线程池中的线程。
+通过 transmit.send_file 发送的文件内容由事件循环使用 loop.sendfile 推送，
+处理函数返回后线程即被释放。
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from ..Handler import HTTPRequestHandler
+from .Listener import create_listener
+
+# 请求头（请求行 + 头部）的最大长度
+_MAX_HEAD = 64 * 1024 + 4
+# 写缓冲中尚未发送的字节数上限，超过后处理线程阻塞等待（背压）
+_HIGH_WATER = 1024 * 1024
+# 回退路径（TLS）每次读取的块大小
+_FILE_CHUNK = 256 * 1024
+# 处理线程的小块写入合并到此大小后才交给事件循环
+_COALESCE_LIMIT = 64 * 1024
+
+
+class _Outbox:
+    """连接的有序输出队列：处理线程写入字节或文件段，事件循环按顺序发送。"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, writer: asyncio.StreamWriter, executor):
+        self.loop = loop
+        self.writer = writer
+        self.executor = executor
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.pending = 0
+        self.cond = threading.Condition()
+        self.error: Optional[BaseException] = None
+        self.task = loop.create_task(self._pump())
+
+    # ── 处理线程侧 ─────────────────────────────────────────────
+
+    def put(self, op) -> None:
+        if self.error is not None:
+            raise ConnectionResetError(f"Client connection lost: {self.error}")
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, op)
+
+    def put_bytes(self, data: bytes) -> None:
+        with self.cond:
+            self.pending += len(data)
+        self.put(data)
+        with self.cond:
+            while self.pending > _HIGH_WATER and self.error is None:
+                self.cond.wait()
+        if self.error is not None:
+            raise ConnectionResetError(f"Client connection lost: {self.error}")
+
+    # ── 事件循环侧 ─────────────────────────────────────────────
+
+    def _sent(self, n: int) -> None:
+        with self.cond:
+            self.pending -= n
+            self.cond.notify_all()
+
+    def _fail(self, e: BaseException) -> None:
+        with self.cond:
+            self.error = e
+            self.cond.notify_all()
+
+    async def _pump(self) -> None:
+        while True:
+            op = await self.queue.get()
+            if op is None:
+                return
+            if isinstance(op, asyncio.Future):  # 屏障：之前的数据已全部发出
+                if not op.done():
+                    op.set_result(self.error is None)
+                continue
+            if self.error is not None:
+                if isinstance(op, tuple):
+                    op[0].close()
+                continue
+            try:
+                if isinstance(op, tuple):
+                    await self._send_file(*op)
+                else:
+                    self.writer.write(op)
+                    await self.writer.drain()
+                    self._sent(len(op))
+            except (ConnectionError, OSError, RuntimeError) as e:
+                self._fail(e)
+                if not isinstance(op, tuple):
+                    self._sent(len(op))
+
+    async def _send_file(self, f, offset: int, count: int) -> None:
+        try:
+            transport = self.writer.transport
+            if transport.get_extra_info("sslcontext") is None:
+                sent = await self.loop.sendfile(transport, f, offset, count)
+            else:
+                # TLS 无法零拷贝：在服务器线程池中做位置读，在事件循环中写出
+                sent = 0
+                fd = f.fileno()
+                while sent < count:
+                    n = min(_FILE_CHUNK, count - sent)
+                    if hasattr(os, "pread"):
+                        chunk = await self.loop.run_in_executor(self.executor, os.pread, fd, n, offset + sent)
+                    else:
+                        f.seek(offset + sent)
+                        chunk = await self.loop.run_in_executor(self.executor, f.read, n)
+                    if not chunk:
+                        break
+                    self.writer.write(chunk)
+                    await self.writer.drain()
+                    sent += len(chunk)
+            if sent < count:  # 文件被截断，响应长度已不可信
+                raise ConnectionAbortedError("File truncated while sending")
+        finally:
+            f.close()
+
+    async def barrier(self) -> bool:
+        fut = self.loop.create_future()
+        self.queue.put_nowait(fut)
+        return await fut
+
+    async def close(self) -> None:
+        self.queue.put_nowait(None)
+        try:
+            await self.task
+        finally:
+            # 唤醒仍在等待背压的处理线程
+            self._fail(ConnectionAbortedError("Connection closed"))
+
+
+class _AsyncWriter:
+    """供处理函数使用的 wfile：小块写入先合并，攒够 _COALESCE_LIMIT 或 flush 时
+    作为一段数据进入 _Outbox，由事件循环发送（响应头与响应体通常只需一次写出）。"""
+
+    def __init__(self, outbox: _Outbox):
+        self.outbox = outbox
+        self._buffer = bytearray()
+        # 已写入的字节数（用于请求指标）
+        self.written = 0
+
+    def write(self, b) -> int:
+        with memoryview(b) as view:
+            n = view.nbytes
+        self.written += n
+        # 调用方可能复用缓冲区，必须复制
+        self._buffer += b
+        if len(self._buffer) >= _COALESCE_LIMIT:
+            self.flush()
+        return n
+
+    def flush(self) -> None:
+        if self._buffer:
+            data = self._buffer
+            self._buffer = bytearray()
+            self.outbox.put_bytes(data)
+
+    def close(self) -> None:
+        pass
+
+
+class _AsyncReader:
+    """供处理函数使用的 rfile：先返回已读取的请求头，再从 StreamReader 读取请求体。"""
+
+    def __init__(self, head: bytes, reader: asyncio.StreamReader, loop: asyncio.AbstractEventLoop):
+        self._head = head
+        self._pos = 0
+        self._reader = reader
+        self._loop = loop
+        self.body_read = 0
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    async def _read_upto(self, n: int) -> bytes:
+        out = bytearray()
+        while n < 0 or len(out) < n:
+            chunk = await self._reader.read(_FILE_CHUNK if n < 0 else n - len(out))
+            if not chunk:
+                break
+            out.extend(chunk)
+        return bytes(out)
+
+    def _take_head(self, n: int) -> bytes:
+        end = len(self._head) if n < 0 else min(len(self._head), self._pos + n)
+        data = self._head[self._pos:end]
+        self._pos = end
+        return data
+
+    def read(self, n: int = -1) -> bytes:
+        if n is None:
+            n = -1
+        data = self._take_head(n)
+        if n < 0 or len(data) < n:
+            more = self._call(self._read_upto(-1 if n < 0 else n - len(data)))
+            self.body_read += len(more)
+            data += more
+        return data
+
+    def read1(self, n: int = -1) -> bytes:
+        if self._pos < len(self._head):
+            return self._take_head(n)
+        data = self._call(self._reader.read(n if n and n > 0 else _FILE_CHUNK))
+        self.body_read += len(data)
+        return data
+
+    def readinto(self, b) -> int:
+        view = memoryview(b).cast("B")
+        data = self.read1(len(view))
+        view[:len(data)] = data
+        return len(data)
+
+    def readline(self, limit: int = -1) -> bytes:
+        if self._pos < len(self._head):
+            end = self._head.find(b"\n", self._pos)
+            end = len(self._head) if end == -1 else end + 1
+            if limit is not None and limit >= 0:
+                end = min(end, self._pos + limit)
+            data = self._head[self._pos:end]
+            self._pos = end
+            return data
+        data = self._call(self._reader.readline())
+        self.body_read += len(data)
+        return data
+
+    def close(self) -> None:
+        pass
+
+
+class _ConnectionShim:
+    """代替处理函数中的 request.connection，仅支持关闭连接。"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, writer: asyncio.StreamWriter):
+        self._loop = loop
+        self._writer = writer
+
+    def close(self) -> None:
+        self._loop.call_soon_threadsafe(self._writer.transport.abort)
+
+    def gettimeout(self):
+        return None
+
+
+class AsyncRequestHandler(HTTPRequestHandler):
+    """在线程池中执行的请求处理器，复用 HTTPRequestHandler 的解析与路由。"""
+
+    def __init__(self, head: bytes, reader, outbox: _Outbox, loop, client_address, server, services, errsvc,
+                 routes=None, keep_alive_timeout=None, keep_alive_requests=None, requests_handled: int = 0):
+        # 不调用 StreamRequestHandler 的 setup/handle/finish，由事件循环驱动
+        # 每个请求创建一个处理器，requests_handled 为同一连接上已处理的请求数
+        self.init_services(services, errsvc, routes, keep_alive_timeout, keep_alive_requests)
+        self.requests_handled = requests_handled
+        self.client_address = client_address
+        self.server = server
+        self.metrics = server.metrics
+        self.rfile = _AsyncReader(head, reader, loop)
+        self.wfile = _AsyncWriter(outbox)
+        self.connection = self.request = _ConnectionShim(loop, outbox.writer)
+        self.close_connection = True
+        self._outbox = outbox
+
+    def _read_request_line(self):
+        # 请求头已由事件循环读取，空闲超时也由事件循环处理
+        return self.rfile.readline(65537)
+
+    def transmit_file(self, f, offset: int, count: int) -> int:
+        """transmit.send_file 的钩子：文件段交给事件循环用 sendfile 发送。"""
+        fd = f if isinstance(f, int) else f.fileno()
+        if count <= _COALESCE_LIMIT and hasattr(os, "pread"):
+            # 小文件段直接读取，与暂存的响应头合并为一次写出
+            data = os.pread(fd, count, offset)
+            self.wfile.write(data)
+            return len(data)
+        # 暂存的响应头必须先于文件内容发出
+        self.wfile.flush()
+        self._outbox.put((os.fdopen(os.dup(fd), "rb"), offset, count))
+        self.sendfile_bytes += count
+        return count
+
+    def body_unread(self) -> bool:
+        """请求体是否未被处理函数读完（未读完时不能复用连接）。"""
+        headers = getattr(self, "headers", None)
+        if headers is None:
+            return False
+        if headers.get("Transfer-Encoding"):
+            return True
+        try:
+            length = int(headers.get("Content-Length", 0))
+        except ValueError:
+            return True
+        return self.rfile.body_read < length
+
+
+class AsyncHTTPServer:
+    """基于 asyncio 的 HTTP 服务器，接口与 socketserver.BaseServer 保持一致
+    （serve_forever / shutdown / server_close），便于 HTTPServer 统一管理。"""
+
+    def __init__(
+        self,
+        server_address: tuple,
+        handler_kwargs: dict,
+        ssl_context=None,
+        max_workers: Optional[int] = None,
+        backlog: int = 128,
+        sock=None,
+        reuse_port: bool = False,
+        tls=None,
+        metrics=None,
+    ) -> None:
+        self.handler_kwargs = handler_kwargs
+        self.ssl_context = ssl_context
+        # TLSConfig：握手超时与握手统计（握手本身由事件循环异步完成）
+        self.tls = tls
+        # cryskura.Metrics.Metrics，连接数在事件循环中记录，请求指标由处理器记录
+        self.metrics = metrics
+        if sock is None:
+            # 与 socketserver 一致：构造时即绑定端口，绑定错误立即抛出
+            sock = create_listener(server_address, backlog, reuse_port)
+        self.socket = sock
+        self.server_address = sock.getsockname()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cryskura-async")
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop: Optional[asyncio.Event] = None
+        self._serving = threading.Event()
+        self._is_shut_down = threading.Event()
+        self._is_shut_down.set()
+        self._connections: set = set()
+
+    def serve_forever(self) -> None:
+        self._is_shut_down.clear()
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.loop.run_until_complete(self._serve())
+        finally:
+            try:
+                _cancel_all_tasks(self.loop)
+                self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            finally:
+                self.loop.close()
+                self.loop = None
+                self._serving.clear()
+                self._is_shut_down.set()
+
+    async def _serve(self) -> None:
+        self._stop = asyncio.Event()
+        kwargs = {}
+        if self.ssl_context is not None and self.tls is not None:
+            kwargs["ssl_handshake_timeout"] = self.tls.handshake_timeout
+        server = await asyncio.start_server(
+            self._client, sock=self.socket, ssl=self.ssl_context, limit=_MAX_HEAD, **kwargs)
+        self._serving.set()
+        try:
+            async with server:
+                await self._stop.wait()
+        finally:
+            for task in list(self._connections):
+                task.cancel()
+            if self._connections:
+                await asyncio.gather(*self._connections, return_exceptions=True)
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        loop = asyncio.get_running_loop()
+        outbox = _Outbox(loop, writer, self.executor)
+        client_address = writer.get_extra_info("peername")
+        sock = writer.get_extra_info("socket")
+        if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+            # asyncio 只对 proto 为 IPPROTO_TCP 的套接字自动设置 TCP_NODELAY，监听套接字创建时 proto 为 0
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except OSError:
+                pass
+        ssl_object = writer.get_extra_info("ssl_object")
+        if ssl_object is not None and self.tls is not None:
+            self.tls.record_handshake(ssl_object)
+        if self.metrics is not None:
+            self.metrics.connection_opened()
+        handler = None
+        try:
+            while True:
+                try:
+                    if handler is None:
+                        head = await reader.readuntil(b"\r\n\r\n")
+                    else:
+                        # 持久连接上等待下一个请求，超过空闲时间后关闭
+                        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), handler.keep_alive_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                except asyncio.LimitOverrunError:
+                    writer.write(b"HTTP/1.1 431 Request Header Fields Too Large\r\n"
+                                 b"Connection: close\r\nContent-Length: 0\r\n\r\n")
+                    break
+                handler = AsyncRequestHandler(
+                    head, reader, outbox, loop, client_address, self, **self.handler_kwargs,
+                    requests_handled=0 if handler is None else handler.requests_handled)
+                try:
+                    await loop.run_in_executor(self.executor, handler.handle_one_request)
+                except (ConnectionError, OSError):
+                    raise
+                except Exception as e:
+                    # 与 socketserver 的 handle_error 相同：记录异常并关闭连接
+                    handler.log_error("Unhandled error while handling request: %r", e)
+                    traceback.print_exc()
+                    break
+                ok = await outbox.barrier()
+                if not ok or handler.close_connection or handler.body_unread():
+                    break
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            await outbox.close()
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+            if self.metrics is not None:
+                self.metrics.connection_closed()
+            self._connections.discard(task)
+
+    def shutdown(self) -> None:
+        loop = self.loop
+        if loop is not None and self._stop is not None:
+            loop.call_soon_threadsafe(self._stop.set)
+        self._is_shut_down.wait()
+
+    def server_close(self) -> None:
+        self.executor.shutdown(wait=False)
+        self.socket.close()
+
+
+def _cancel_all_tasks(loop: asyncio.AbstractEventLoop) -> None:
+    """取消事件循环中剩余的任务（例如 Ctrl+C 中断时仍在处理的连接）。"""
+    tasks = [t for t in asyncio.all_tasks(loop) if not t.done()]
+    if not tasks:
+        return
+    for task in tasks:
+        task.cancel()
+    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
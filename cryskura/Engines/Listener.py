@@ -0,0 +1,27 @@
+"""监听套接字的创建，供各服务器引擎和预派生模式共用。"""
+from __future__ import annotations
+
+import os
+import socket
+
+
+def reuse_port_supported() -> bool:
+    """当前平台是否支持 SO_REUSEPORT（多个进程各自绑定同一端口，由内核分发连接）。"""
+    return hasattr(socket, "SO_REUSEPORT") and os.name != "nt"
+
+
+def create_listener(server_address: tuple, backlog: int = 128, reuse_port: bool = False) -> socket.socket:
+    """创建并绑定监听套接字。IPv6 地址（包含 ":"）使用 AF_INET6。"""
+    family = socket.AF_INET6 if ":" in server_address[0] else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        if os.name != "nt":
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(server_address)
+        sock.listen(backlog)
+    except OSError:
+        sock.close()
+        raise
+    return sock
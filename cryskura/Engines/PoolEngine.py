@@ -0,0 +1,179 @@
+"""线程池服务器引擎：固定数量的工作线程 + 有界连接队列。
+
+接受线程只负责 accept 并把连接放入队列，工作线程从队列取出连接并处理。
+队列已满时：
+    wait — 接受线程暂停，刚接受的连接在用户态等待入队，后续新连接留在内核
+           listen 队列中（backlog 决定可容纳的数量）；
+    shed — 立即返回 503 Service Unavailable 和 Retry-After，然后关闭连接。
+
+每个连接设置读超时（timeout），迟迟不发送请求的客户端不会永久占用工作线程。
+"""
+from __future__ import annotations
+
+import os
+import queue
+import threading
+from http.server import HTTPServer as _BaseHTTPServer
+from typing import Optional
+
+from .. import __version__
+
+try:
+    import ssl
+except ImportError:
+    ssl = None
+
+# 队列满时的处理策略
+OVERLOAD_POLICIES = ("wait", "shed")
+# wait 策略下接受线程检查关闭请求的间隔（秒）
+_POLL_INTERVAL = 0.5
+
+
+def default_workers() -> int:
+    """与 concurrent.futures.ThreadPoolExecutor 相同的默认线程数。"""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+class PooledHTTPServer(_BaseHTTPServer):
+    """使用固定工作线程池处理连接的 HTTP 服务器。"""
+
+    # 503 响应中 Retry-After 的秒数
+    retry_after = 1
+
+    def __init__(
+        self,
+        server_address: tuple,
+        RequestHandlerClass,
+        max_workers: Optional[int] = None,
+        backlog: int = 128,
+        queue_size: Optional[int] = None,
+        overload: str = "wait",
+        timeout: Optional[float] = 30,
+        bind_and_activate: bool = True,
+    ) -> None:
+        if overload not in OVERLOAD_POLICIES:
+            raise ValueError(f"Overload policy {overload} is not valid. \nAvailable policies: {', '.join(OVERLOAD_POLICIES)}")
+        if queue_size is not None and queue_size < 1:
+            # queue.Queue(maxsize=0) 表示无上限，与“有界队列”的语义相反
+            raise ValueError(f"queue_size must be a positive integer, got {queue_size}.")
+        self.max_workers = max_workers or default_workers()
+        self.queue_size = self.max_workers * 2 if queue_size is None else queue_size
+        self.overload = overload
+        self.timeout = timeout
+        # socketserver 在 server_activate 中以此值调用 listen()
+        self.request_queue_size = backlog
+        super().__init__(server_address, RequestHandlerClass, bind_and_activate)
+
+        self._queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self._stopping = threading.Event()
+        self._closing = threading.Event()
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._accepted = 0
+        self._rejected = 0
+        self._completed = 0
+        self._peak_queued = 0
+        self._workers = []
+        for i in range(self.max_workers):
+            t = threading.Thread(target=self._work, name=f"cryskura-pool-{i}", daemon=True)
+            t.start()
+            self._workers.append(t)
+
+    # ── 接受线程 ───────────────────────────────────────────────
+
+    def process_request(self, request, client_address) -> None:
+        item = (request, client_address)
+        if self.overload == "shed":
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self._reject(request)
+                return
+        else:
+            # 定时醒来检查关闭请求，避免工作线程全部阻塞时 shutdown() 永远等待
+            while True:
+                try:
+                    self._queue.put(item, timeout=_POLL_INTERVAL)
+                    break
+                except queue.Full:
+                    if self._stopping.is_set() or self._closing.is_set():
+                        self.shutdown_request(request)
+                        return
+        with self._lock:
+            self._accepted += 1
+            queued = self._queue.qsize()
+            if queued > self._peak_queued:
+                self._peak_queued = queued
+
+    def _reject(self, request) -> None:
+        with self._lock:
+            self._rejected += 1
+        if ssl is not None and isinstance(request, ssl.SSLSocket):
+            # TLS 连接尚未握手，为发送 503 而在接受线程中握手会阻塞接受，直接关闭
+            self.shutdown_request(request)
+            return
+        try:
+            request.sendall(
+                f"HTTP/1.1 503 Service Unavailable\r\n"
+                f"Server: CryskuraHTTP/{__version__}\r\n"
+                f"Retry-After: {self.retry_after}\r\n"
+                f"Content-Length: 0\r\n"
+                f"Connection: close\r\n\r\n".encode()
+            )
+        except OSError:
+            pass
+        self.shutdown_request(request)
+
+    # ── 工作线程 ───────────────────────────────────────────────
+
+    def _work(self) -> None:
+        while not self._closing.is_set():
+            try:
+                request, client_address = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self._busy += 1
+            try:
+                # StreamRequestHandler 仅在自身 timeout 不为 None 时设置超时，此处统一设置
+                request.settimeout(self.timeout)
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                with self._lock:
+                    self._busy -= 1
+                    self._completed += 1
+
+    def stats(self) -> dict:
+        """返回线程池与连接队列的统计信息。"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "busy_workers": self._busy,
+                "queue_size": self.queue_size,
+                "queued": self._queue.qsize(),
+                "peak_queued": self._peak_queued,
+                "backlog": self.request_queue_size,
+                "overload": self.overload,
+                "timeout": self.timeout,
+                "accepted": self._accepted,
+                "rejected": self._rejected,
+                "completed": self._completed,
+            }
+
+    def shutdown(self) -> None:
+        self._stopping.set()
+        super().shutdown()
+
+    def server_close(self) -> None:
+        super().server_close()
+        # 通知工作线程退出，并关闭仍在排队的连接
+        self._closing.set()
+        while True:
+            try:
+                request, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self.shutdown_request(request)
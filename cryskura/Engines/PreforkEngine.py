@@ -0,0 +1,174 @@
+"""多进程预派生（pre-fork）模式：由监督进程派生 N 个工作进程，每个进程运行一个完整的服务器引擎。
+
+端口共享方式：
+    支持 SO_REUSEPORT 时，每个工作进程各自绑定同一端口，由内核在进程间分发连接；
+    否则由监督进程创建监听套接字，工作进程继承并共享它。
+
+工作进程异常退出时由监督进程重新派生；uPnP 映射等一次性工作留在监督进程中完成。
+仅支持提供 os.fork 的平台。
+"""
+from __future__ import annotations
+
+import os
+import signal
+import threading
+import time
+import traceback
+from typing import Callable, Optional
+
+from .Listener import create_listener, reuse_port_supported
+
+# 工作进程在此时间内退出视为“启动即崩溃”，重启前等待以避免快速循环
+_CRASH_WINDOW = 1.0
+_RESTART_DELAY = 1.0
+# 关闭时等待工作进程退出的时间，超时后强制结束
+_STOP_TIMEOUT = 5.0
+
+
+def _describe_status(status: int) -> str:
+    if os.WIFSIGNALED(status):
+        return f"was killed by signal {os.WTERMSIG(status)}"
+    return f"exited with code {os.WEXITSTATUS(status)}"
+
+
+class PreforkServer:
+    """监督进程。接口与 socketserver.BaseServer 保持一致（serve_forever / shutdown / server_close）。
+
+    child_init() 在工作进程 fork 之后、创建服务器之前调用，用于关闭继承来的无关资源。
+    create_server(sock, reuse_port) 在工作进程中调用，返回该进程使用的服务器引擎对象：
+    sock 为继承自监督进程的监听套接字（共享模式），否则为 None，引擎需自行以
+    reuse_port 绑定端口。
+    """
+
+    def __init__(
+        self,
+        server_address: tuple,
+        workers: int,
+        create_server: Callable,
+        backlog: int = 128,
+        reuse_port: Optional[bool] = None,
+        child_init: Optional[Callable] = None,
+    ) -> None:
+        if not hasattr(os, "fork"):
+            raise OSError("Multi-process mode requires os.fork, which is not available on this platform.")
+        self.server_address = server_address
+        self.workers = workers
+        self.create_server = create_server
+        self.child_init = child_init
+        self.reuse_port = reuse_port_supported() if reuse_port is None else reuse_port
+        if self.reuse_port:
+            # 先试绑定一次，端口不可用时在监督进程中立即报错
+            create_listener(server_address, backlog, reuse_port=True).close()
+            self.socket = None
+        else:
+            self.socket = create_listener(server_address, backlog)
+        self._children: dict[int, float] = {}  # pid -> 启动时间
+        self._restarts = 0
+        self._stopping = threading.Event()
+        self._is_shut_down = threading.Event()
+        self._is_shut_down.set()
+
+    # ── 工作进程 ───────────────────────────────────────────────
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self._children[pid] = time.monotonic()
+            return
+        # 子进程：Ctrl+C 由监督进程统一处理，子进程只响应 SIGTERM
+        code = 0
+        try:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            if self.child_init is not None:
+                self.child_init()
+            server = self.create_server(self.socket, self.reuse_port)
+            signal.signal(signal.SIGTERM, lambda *_: threading.Thread(
+                target=server.shutdown, daemon=True).start())
+            try:
+                server.serve_forever()
+            finally:
+                server.server_close()
+        except BaseException:
+            traceback.print_exc()
+            code = 1
+        finally:
+            os._exit(code)
+
+    # ── 监督进程 ───────────────────────────────────────────────
+
+    def serve_forever(self) -> None:
+        self._is_shut_down.clear()
+        self._stopping.clear()
+        # 监督进程收到 SIGTERM 时有序关闭工作进程，而不是留下孤儿进程
+        previous = None
+        if threading.current_thread() is threading.main_thread():
+            previous = signal.signal(signal.SIGTERM, lambda *_: self._stopping.set())
+        try:
+            for _ in range(self.workers):
+                self._spawn()
+            while not self._stopping.is_set():
+                try:
+                    pid, status = os.waitpid(-1, os.WNOHANG)
+                except ChildProcessError:
+                    pid = 0
+                if pid == 0:
+                    self._stopping.wait(0.5)
+                    continue
+                started = self._children.pop(pid, None)
+                if started is None or self._stopping.is_set():
+                    continue
+                print(f"Worker {pid} {_describe_status(status)}, restarting.")
+                if time.monotonic() - started < _CRASH_WINDOW:
+                    self._stopping.wait(_RESTART_DELAY)
+                    if self._stopping.is_set():
+                        break
+                self._restarts += 1
+                self._spawn()
+        finally:
+            self._stop_children()
+            if previous is not None:
+                signal.signal(signal.SIGTERM, previous)
+            self._is_shut_down.set()
+
+    def _stop_children(self) -> None:
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self._children.pop(pid, None)
+        deadline = time.monotonic() + _STOP_TIMEOUT
+        while self._children and time.monotonic() < deadline:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(0.05)
+                continue
+            self._children.pop(pid, None)
+        for pid in list(self._children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+        self._children.clear()
+
+    def stats(self) -> dict:
+        """返回工作进程的统计信息。"""
+        return {
+            "workers": self.workers,
+            "alive": len(self._children),
+            "pids": sorted(self._children),
+            "restarts": self._restarts,
+            "reuse_port": self.reuse_port,
+        }
+
+    def shutdown(self) -> None:
+        self._stopping.set()
+        self._is_shut_down.wait()
+
+    def server_close(self) -> None:
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
@@ -0,0 +1,5 @@
+"""服务器引擎：可替代默认 ThreadingHTTPServer 的连接处理模型。"""
+from .AsyncEngine import AsyncHTTPServer
+from .PoolEngine import PooledHTTPServer, OVERLOAD_POLICIES
+from .PreforkEngine import PreforkServer
+from .Listener import create_listener
@@ -8,6 +8,7 @@ except ImportError:
     webbrowser = None
 from cryskura import __version__
 from .Server import HTTPServer
+from .TLS import TLSConfig
 from .Services import FileService, PageService,RedirectService
 
 current_pid = os.getpid()
@@ -150,6 +151,7 @@ def main():
     parser.add_argument("-i", "--interface", type=str, default="0.0.0.0", help="The interface to listen on.")
     parser.add_argument("-p", "--port", type=int, default=8080, help="The port to listen on.")
     parser.add_argument("-c", "--certfile", type=str, default=None, help="The path to the certificate file.")
+    parser.add_argument("-kf", "--keyfile", type=str, default=None, help="The path to the private key file, if it is not in the certificate file.")
     parser.add_argument("-f", "--forcePort", action="store_true", help="Force to use the specified port even if it is already in use.")
     parser.add_argument("-d", "--path", type=str, default=None, help="The path to the directory to serve.")
     parser.add_argument("-n", "--name", type=str, default=None, help="The name of the server.")
@@ -160,6 +162,15 @@ def main():
     parser.add_argument("-ba", "--browserAddress", type=str, default=None, help="The address to open in the browser.")
     parser.add_argument("-t", "--allowUpload", action="store_true", help="Allow file upload.")
     parser.add_argument("-u", "--uPnP", action="store_true", help="Enable uPnP port forwarding.")
+    parser.add_argument("-e", "--engine", type=str, default="thread", choices=["thread", "asyncio", "pool"], help="The server engine to use.")
+    parser.add_argument("-bl", "--backlog", type=int, default=128, help="The listen backlog of the server socket.")
+    parser.add_argument("-qs", "--queueSize", type=int, default=None, help="The connection queue size of the pool engine.")
+    parser.add_argument("-ol", "--overload", type=str, default="wait", choices=["wait", "shed"], help="What the pool engine does when its queue is full.")
+    parser.add_argument("-to", "--timeout", type=float, default=30, help="The per-connection read timeout in seconds of the pool engine.")
+    parser.add_argument("-kt", "--keepAliveTimeout", type=float, default=15, help="The idle timeout in seconds of persistent connections, 0 to close every connection after one request.")
+    parser.add_argument("-kr", "--keepAliveRequests", type=int, default=100, help="The maximum number of requests served on one persistent connection.")
+    parser.add_argument("-wn", "--workers", type=int, default=1, help="The number of worker processes (POSIX only).")
+    parser.add_argument("-mw", "--maxWorkers", type=int, default=None, help="The maximum number of worker threads for the asyncio and pool engines.")
     parser.add_argument("-ar", "--addRightClick", action="store_true", help="Add to right-click menu.")
     parser.add_argument("-rr", "--removeRightClick", action="store_true", help="Remove from right-click menu.")
     parser.add_argument("-v", "--version", action="version", version=f"CryskuraHTTP/{__version__}")
@@ -200,13 +211,18 @@ def main():
             raise ValueError(f"Certfile {args.certfile} does not exist.")
         if args.http_to_https is not None and lanuch:
             rs=RedirectService("/","/",default_protocol="https")#f"https://{args.interface}:{args.port}")
-            redirect_server = HTTPServer(interface=args.interface, port=args.http_to_https, services=[rs], server_name=args.name, forcePort=args.forcePort, uPnP=args.uPnP)
+            redirect_server = HTTPServer(interface=args.interface, port=args.http_to_https, services=[rs], server_name=args.name, forcePort=args.forcePort, uPnP=args.uPnP, engine=args.engine)
             redirect_server.start()
     elif args.http_to_https is not None:
         raise ValueError("HTTP to HTTPS redirection requires a certificate file.")
+    tls = None
+    if args.keyfile is not None:
+        if args.certfile is None:
+            raise ValueError("A private key file requires a certificate file.")
+        tls = TLSConfig(args.certfile, args.keyfile)
     
     if lanuch:
-        server = HTTPServer(interface=args.interface, port=args.port, services=services, server_name=args.name, forcePort=args.forcePort, certfile=args.certfile, uPnP=args.uPnP)
+        server = HTTPServer(interface=args.interface, port=args.port, services=services, server_name=args.name, forcePort=args.forcePort, certfile=args.certfile, uPnP=args.uPnP, engine=args.engine, max_workers=args.maxWorkers, backlog=args.backlog, queue_size=args.queueSize, overload=args.overload, timeout=args.timeout, workers=args.workers, keep_alive_timeout=args.keepAliveTimeout, keep_alive_requests=args.keepAliveRequests, tls=tls)
         if args.browser:
             if webbrowser is None:
                 raise ImportError("The webbrowser module is not available.")
@@ -2,43 +2,376 @@ try:
     import ssl
 except ImportError:
     ssl = None
+import re
+import socket
+import time
+from io import BufferedIOBase
 from . import __version__
 from urllib.parse import unquote
 from http import HTTPStatus
 from http.server import SimpleHTTPRequestHandler
+from .Services.RouteTable import RouteTable
+
+
+# 响应结束时未读完的请求体不超过此大小时读取丢弃以复用连接，否则关闭连接
+_DRAIN_LIMIT = 64 * 1024
+# 小于此大小的写入先暂存合并，与之后的数据一起发出
+_COALESCE_LIMIT = 64 * 1024
+# 单次 sendmsg 的最大缓冲区个数（POSIX 保证的 IOV_MAX 下限为 16，Linux 为 1024）
+_IOV_MAX = 1024
+_MSG_MORE = getattr(socket, "MSG_MORE", 0)
+# 请求头单行的最大长度与字段个数，与 http.client 的限制相同
+_MAX_HEADER_LINE = 65536
+_MAX_HEADERS = 100
+# 快速路径直接处理的协议版本，其余交给标准库解析
+_FAST_VERSIONS = frozenset(("HTTP/1.0", "HTTP/1.1"))
+_TOKEN = re.compile(r"[!#$%&'*+\-.^_`|~0-9A-Za-z]+")
+_TOKEN_BYTES = re.compile(rb"[!#$%&'*+\-.^_`|~0-9A-Za-z]+")
+
+
+class _ResponseWriter(BufferedIOBase):
+    """合并写出的 wfile：响应头、分块编码的块头、页面片段等小块写入先暂存，
+    与之后的数据一起用一次 sendmsg（分散写）发出，不复制大块数据。
+
+    暂存的数据在 flush() 时发出；处理完每个请求后都会 flush。TLS 连接不支持 sendmsg，
+    合并为一次 sendall，同样只产生一个 TLS 记录。
+    """
+
+    def __init__(self, sock):
+        self._sock = sock
+        self._pending = []
+        self._size = 0
+        # 已写入的字节数（用于请求指标）
+        self.written = 0
+        self._vectored = hasattr(sock, "sendmsg") and not (ssl is not None and isinstance(sock, ssl.SSLSocket))
+
+    def writable(self):
+        return True
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    def write(self, b):
+        with memoryview(b) as view:
+            n = view.nbytes
+        if not n:
+            return 0
+        self.written += n
+        if self._size + n <= _COALESCE_LIMIT:
+            # 调用方可能复用缓冲区，小块数据复制一份
+            self._pending.append(bytes(b))
+            self._size += n
+            return n
+        buffers = self._pending
+        buffers.append(b)
+        self._pending = []
+        self._size = 0
+        self._send(buffers, 0)
+        return n
+
+    def flush(self):
+        if self._pending:
+            self._send(self._take(), 0)
+
+    def flush_more(self):
+        """发出暂存数据并告知内核随后还有数据（MSG_MORE，相当于单次的 TCP_CORK），
+        用于 sendfile 之前：响应头与文件开头合并到同一个 TCP 段中。"""
+        if self._pending:
+            self._send(self._take(), _MSG_MORE)
+
+    def _take(self):
+        buffers = self._pending
+        self._pending = []
+        self._size = 0
+        return buffers
+
+    def _send(self, buffers, flags):
+        if not self._vectored:
+            self._sock.sendall(buffers[0] if len(buffers) == 1 else b"".join(buffers))
+            return
+        views = [memoryview(b).cast("B") for b in buffers]
+        while views:
+            sent = self._sock.sendmsg(views[:_IOV_MAX], (), flags)
+            # 部分发送：跳过已发出的缓冲区
+            while sent:
+                if sent >= views[0].nbytes:
+                    sent -= views.pop(0).nbytes
+                else:
+                    views[0] = views[0][sent:]
+                    sent = 0
+
+
+class _BodyReader:
+    """带请求体的请求使用的 rfile：最多读取 Content-Length 字节，不会读到同一连接上的下一个请求。
+
+    Expect: 100-continue 请求在第一次读取时才回复 100 Continue。服务在读取请求体之前完成所有检查
+    （身份验证、大小限制、目标是否存在等），拒绝请求时不读取请求体，客户端也就不会收到 100，不必发送请求体。
+
+    length 为 None 表示长度由 Transfer-Encoding 决定，此时不限制读取，响应后关闭连接。
+    """
+
+    def __init__(self, request, rfile, length):
+        self._request = request
+        self._rfile = rfile
+        self.remaining = length
+        # 已读取的字节数（用于请求指标）
+        self.received = 0
+
+    def __getattr__(self, name):
+        return getattr(self._rfile, name)
+
+    def _limit(self, n):
+        self._request.send_continue()
+        if self.remaining is None:
+            return n
+        if n is None or n < 0 or n > self.remaining:
+            return self.remaining
+        return n
+
+    def _consumed(self, data):
+        self.received += len(data)
+        if self.remaining is not None:
+            self.remaining -= len(data)
+        return data
+
+    def read(self, n=-1):
+        return self._consumed(self._rfile.read(self._limit(n)))
+
+    def read1(self, n=-1):
+        return self._consumed(self._rfile.read1(self._limit(n)))
+
+    def readline(self, limit=-1):
+        return self._consumed(self._rfile.readline(self._limit(limit)))
+
+    def readinto(self, b):
+        view = memoryview(b)
+        n = self._limit(len(view))
+        if n < len(view):
+            view = view[:n]
+        n = self._rfile.readinto(view) if n else 0
+        self.received += n
+        if self.remaining is not None:
+            self.remaining -= n
+        return n
+
+    def drainable(self) -> bool:
+        """剩余的请求体能否在响应后读取丢弃（客户端仍在等待 100 Continue 时不能）。"""
+        if self.remaining == 0:
+            return True
+        return (self.remaining is not None and self.remaining <= _DRAIN_LIMIT
+                and not self._request.expect_continue)
+
+    def drain(self) -> bool:
+        """读取并丢弃剩余的请求体，返回连接能否复用。"""
+        if not self.drainable():
+            return False
+        while self.remaining:
+            if not self.read(self.remaining):
+                return False
+        return True
+
+
+class Headers:
+    """请求头：大小写不敏感的只读映射，按收到的顺序保存全部字段。
+
+    兼容 email.message.Message 的读取接口（get、[]、in、get_all、keys、values、items），
+    同名字段 get 与 [] 返回第一个值，字段不存在时 [] 返回 None。
+    """
+
+    __slots__ = ("_items", "_first")
+
+    def __init__(self, items=()):
+        self._items = []
+        self._first = {}
+        for name, value in items:
+            self.add(name, value)
+
+    def add(self, name: str, value: str) -> None:
+        self._items.append((name, value))
+        self._first.setdefault(name.lower(), value)
+
+    def get(self, name: str, failobj=None):
+        return self._first.get(name.lower(), failobj)
+
+    def __getitem__(self, name: str):
+        return self._first.get(name.lower())
+
+    def __contains__(self, name) -> bool:
+        return name.lower() in self._first
+
+    def get_all(self, name: str, failobj=None):
+        key = name.lower()
+        values = [value for field, value in self._items if field.lower() == key]
+        return values or failobj
+
+    def keys(self) -> list:
+        return [name for name, _ in self._items]
+
+    def values(self) -> list:
+        return [value for _, value in self._items]
+
+    def items(self) -> list:
+        return list(self._items)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __str__(self) -> str:
+        return "".join(f"{name}: {value}\n" for name, value in self._items) + "\n"
+
+    def __repr__(self) -> str:
+        return f"Headers({self._items!r})"
+
+
+def split_target(target: str) -> tuple:
+    """把请求目标分割为路径段列表与查询参数字典。
+
+    整个目标先做百分号解码再按第一个 ? 分割；反斜杠视为 /，首尾的空段被去掉；
+    没有 = 的参数值为空字符串。
+    """
+    path, _, query = unquote(target).partition("?")
+    parts = path.replace("\\", "/").split("/")
+    if parts[0] == "":
+        del parts[0]
+    if parts and parts[-1] == "":
+        del parts[-1]
+    args = {}
+    if query:
+        for arg in query.split("&"):
+            key, sep, value = arg.partition("=")
+            if sep or key:
+                args[key] = value
+    return parts, args
+
 
 class HTTPRequestHandler(SimpleHTTPRequestHandler):
     server_version = "CryskuraHTTP/" + __version__
     index_pages=()
+    protocol_version = "HTTP/1.1"
+    # 响应由 _ResponseWriter 合并写出，不需要 Nagle 算法再等待
+    disable_nagle_algorithm = True
+    # 客户端在等待 100 Continue，且尚未发送
+    expect_continue = False
+    # 持久连接：两个请求之间的最长空闲时间（秒，0 表示不复用连接）与每个连接最多处理的请求数
+    keep_alive_timeout = 15
+    keep_alive_requests = 100
+    # 当前连接上已处理的请求数
+    requests_handled = 0
+    # 当前请求的请求体读取器（没有请求体时为 None）
+    request_body = None
+    # 请求指标（服务器带有 MetricsService 时为 cryskura.Metrics.Metrics）
+    metrics = None
+    # 当前请求的传输类型（upload、zip、tar），由服务设置，计入吞吐量指标
+    transfer_kind = None
+    # 当前请求中绕过 wfile 直接发送（sendfile）的字节数
+    sendfile_bytes = 0
     
-    def __init__(self, *args, services, errsvc, directory=None, **kwargs):
+    def __init__(self, *args, services, errsvc, routes=None, directory=None, keep_alive_timeout=None, keep_alive_requests=None, **kwargs):
+        self.init_services(services, errsvc, routes, keep_alive_timeout, keep_alive_requests)
+        super().__init__(*args, directory=self.directory, **kwargs)
+
+    def init_services(self, services, errsvc, routes=None, keep_alive_timeout=None, keep_alive_requests=None):
+        # 与 asyncio 引擎的处理器共用的初始化，文件路径由各服务自行计算
+        # routes 为服务器启动时编译好的路由表，未提供时现场编译
         self.services = services
         self.errsvc = errsvc
-        directory = "/dev/null"
-        super().__init__(*args, directory=directory, **kwargs)
+        self.routes = routes if routes is not None else RouteTable(services)
+        self.directory = "/dev/null"
+        if keep_alive_timeout is not None:
+            self.keep_alive_timeout = keep_alive_timeout
+        if keep_alive_requests is not None:
+            self.keep_alive_requests = keep_alive_requests
+
+    def setup(self):
+        super().setup()
+        self.wfile = _ResponseWriter(self.connection)
+
+    def handle(self):
+        self.metrics = getattr(self.server, "metrics", None)
+        if self.metrics is not None:
+            self.metrics.connection_opened()
+        try:
+            # 接受连接时没有进行 TLS 握手，在处理连接的线程中完成，失败时直接关闭连接
+            tls = getattr(self.server, "tls", None)
+            if tls is not None and ssl is not None and isinstance(self.connection, ssl.SSLSocket):
+                if not tls.handshake(self.connection):
+                    return
+            super().handle()
+        finally:
+            if self.metrics is not None:
+                self.metrics.connection_closed()
+
+    def send_response_only(self, code, message=None):
+        self.response_code = code
+        self._framed = False
+        self._connection_sent = False
+        super().send_response_only(code, message)
     
+    def send_header(self, keyword, value):
+        # 记录已声明的 Content-Length，发送文件时按此长度发送，避免文件变化导致长度不一致
+        key = keyword.lower()
+        if key == "content-length":
+            self.content_length = int(value)
+            self._framed = True
+        elif key == "transfer-encoding":
+            self._framed = "chunked" in value.lower()
+        elif key == "connection":
+            self._connection_sent = True
+        super().send_header(keyword, value)
+
+    def end_headers(self):
+        if getattr(self, "response_code", 200) >= 200:
+            self._frame_response()
+        super().end_headers()
+
+    def _frame_response(self):
+        # 决定响应后能否复用连接，并相应地发送 Connection 头
+        code = self.response_code
+        if (not self._framed and code not in (HTTPStatus.NO_CONTENT, HTTPStatus.NOT_MODIFIED)
+                and self.command != "HEAD"):
+            # 既没有 Content-Length 也不是 chunked，以关闭连接标记响应结束
+            self.close_connection = True
+        if self.request_body is not None and not self.request_body.drainable():
+            self.close_connection = True
+        if self._connection_sent or self.request_version == "HTTP/0.9":
+            return
+        if self.close_connection:
+            super().send_header("Connection", "close")
+        elif self.request_version == "HTTP/1.0":
+            super().send_header("Connection", "keep-alive")
+
+    def send_header_block(self, block: bytes, content_length=None):
+        # 追加一段预先编码好的响应头（每行以 \r\n 结尾），用于缓存的响应
+        if self.request_version != 'HTTP/0.9':
+            if not hasattr(self, '_headers_buffer'):
+                self._headers_buffer = []
+            self._headers_buffer.append(block)
+        if content_length is not None:
+            self.content_length = content_length
+            self._framed = True
+
+    def handle_expect_100(self):
+        # 不在解析请求头时立即回复 100，由服务决定是否接受请求体（见 send_continue）
+        return True
+
+    def send_continue(self):
+        """回复 100 Continue，让等待中的客户端开始发送请求体。
+
+        读取请求体时会自动调用；服务也可以在确认接受请求后提前调用。没有待回复的期望时不做任何事。
+        """
+        if not self.expect_continue:
+            return
+        self.expect_continue = False
+        self.send_response_only(HTTPStatus.CONTINUE)
+        self.end_headers()
+        self.wfile.flush()
+
     def split_Path(self):
         # 将路径分割为路径和参数
-        path=unquote(self.path).split("?",1)
-        if len(path)==1:
-            path, args = path[0], ""
-        else:
-            path, args = path
-        path= path.replace("\\","/").split("/")
-        if path[0]=="":
-            path.pop(0)
-        if path[-1]=="":
-            path.pop(-1)
-        args = args.split("&")
-        processed_args = {}
-        for arg in args:
-            if "=" not in arg:
-                if arg!="":
-                    processed_args[arg] = ""
-            else:
-                arg = arg.split("=",1)
-                processed_args[arg[0]] = arg[1]
-        return path,processed_args
+        return split_target(self.path)
     
     # def do_OPERATION(self,operation:str):
     #     path,args = self.split_Path()
@@ -59,9 +392,102 @@ class HTTPRequestHandler(SimpleHTTPRequestHandler):
     #                     return
     #     self.errsvc.handle(self,path,args,operation,HTTPStatus.NOT_FOUND)
 
+    def _read_request_line(self):
+        # 持久连接上等待下一个请求时使用空闲超时，超时后直接关闭连接
+        if not self.requests_handled:
+            return self.rfile.readline(65537)
+        timeout = self.connection.gettimeout()
+        self.connection.settimeout(self.keep_alive_timeout)
+        try:
+            return self.rfile.readline(65537)
+        except TimeoutError:
+            return b""
+        finally:
+            self.connection.settimeout(timeout)
+
+    def parse_request(self):
+        """解析请求行与请求头，结果保存在 command、path、request_version 与 headers 中。
+
+        常见的 HTTP/1.0 与 HTTP/1.1 请求由这里直接解析为 Headers，不经过 email 包；
+        请求行不规范（多余空格、HTTP/0.9、其他版本号等）时交给标准库处理并回复相应的错误。
+        """
+        requestline = str(self.raw_requestline, "iso-8859-1").rstrip("\r\n")
+        words = requestline.split(" ")
+        if len(words) != 3 or words[2] not in _FAST_VERSIONS or not words[1] or not _TOKEN.fullmatch(words[0]):
+            return super().parse_request()
+        command, path, version = words
+        self.requestline = requestline
+        self.command = command
+        self.request_version = version
+        self.close_connection = version < "HTTP/1.1" or self.protocol_version < "HTTP/1.1"
+        if path.startswith("//"):
+            # 与标准库一致，避免 //host/path 被客户端当作其他主机的地址
+            path = "/" + path.lstrip("/")
+        self.path = path
+
+        headers = self._read_headers()
+        if headers is None:
+            return False
+        self.headers = headers
+        lengths = headers.get_all("Content-Length")
+        if lengths and (len(set(lengths)) > 1 or "Transfer-Encoding" in headers):
+            # 请求体长度有歧义（可用于请求走私），拒绝
+            self.send_error(HTTPStatus.BAD_REQUEST, "Conflicting message framing")
+            return False
+        connection = headers.get("Connection")
+        if connection:
+            tokens = [token.strip() for token in connection.lower().split(",")]
+            if "close" in tokens:
+                self.close_connection = True
+            elif "keep-alive" in tokens and self.protocol_version >= "HTTP/1.1":
+                self.close_connection = False
+        return True
+
+    def _read_headers(self):
+        # 逐行读取请求头直到空行；出错时回复错误并返回 None
+        headers = Headers()
+        readline = self.rfile.readline
+        while True:
+            line = readline(_MAX_HEADER_LINE + 1)
+            if len(line) > _MAX_HEADER_LINE:
+                self.send_error(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Line too long")
+                return None
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+            if len(headers) >= _MAX_HEADERS:
+                self.send_error(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Too many headers")
+                return None
+            name, sep, value = line.partition(b":")
+            # 字段名必须是 token：冒号前的空白与折行（obs-fold）都不接受
+            if not sep or not _TOKEN_BYTES.fullmatch(name):
+                self.send_error(HTTPStatus.BAD_REQUEST, "Invalid header line")
+                return None
+            headers.add(name.decode("ascii"), value.strip(b" \t\r\n").decode("iso-8859-1"))
+
+    def _open_body(self, rfile):
+        # 有请求体（或在等待 100 Continue）时包装 rfile，记录请求体的剩余长度
+        if self.headers.get("Transfer-Encoding"):
+            return _BodyReader(self, rfile, None)
+        content_length = self.headers.get("Content-Length")
+        if content_length is None:
+            return _BodyReader(self, rfile, 0) if self.expect_continue else None
+        try:
+            length = int(content_length)
+        except ValueError:
+            length = -1
+        return _BodyReader(self, rfile, length if length >= 0 else None)
+
     def handle_one_request(self):
+        self.content_length = None
+        self.response_code = None
+        self.request_body = None
+        self.transfer_kind = None
+        self.sendfile_bytes = 0
+        rfile = self.rfile
+        metrics = self.metrics
+        service = started = None
         try:
-            self.raw_requestline = self.rfile.readline(65537)
+            self.raw_requestline = self._read_request_line()
             if len(self.raw_requestline) > 65536:
                 self.requestline = ''
                 self.request_version = ''
@@ -71,9 +497,24 @@ class HTTPRequestHandler(SimpleHTTPRequestHandler):
             if not self.raw_requestline:
                 self.close_connection = True
                 return
+            if metrics is not None:
+                started = time.perf_counter()
+                written = self.wfile.written
+                metrics.request_started()
             if not self.parse_request():
                 # An error code has been sent, just exit
                 return
+            # HTTP/1.0 请求中的 Expect 必须忽略
+            self.expect_continue = (
+                self.request_version >= "HTTP/1.1"
+                and self.headers.get("Expect", "").strip().lower() == "100-continue"
+            )
+            self.requests_handled += 1
+            if not self.keep_alive_timeout or self.requests_handled >= self.keep_alive_requests:
+                self.close_connection = True
+            self.request_body = self._open_body(rfile)
+            if self.request_body is not None:
+                self.rfile = self.request_body
             
             path,args = self.split_Path()
             host = self.headers.get('Host',None)
@@ -106,36 +547,23 @@ class HTTPRequestHandler(SimpleHTTPRequestHandler):
                     host = None
                     port = None
 
-            path_exists = False
-            handled = False
-            for service in self.services:
-                for route in service.routes:
-                    can_handle,path_ok = route.match(path,self.command,host,port)
-                    if path_ok:
-                        path_exists = True
-                    if can_handle:
-                        try:
-                            if not hasattr(service, "handle_"+self.command):
-                                raise ValueError(f"Service to handle {path} does not have a {self.command} handler, but a route for it exists.")
-                            method = getattr(service, "handle_"+self.command)
-                            method(self,path,args)
-                            handled = True
-                            break
-                        except Exception as e:
-                            if isinstance(e,ConnectionAbortedError) or isinstance(e,ConnectionResetError) or isinstance(e,ssl.SSLEOFError):
-                                print(f"Client disconnected while handling {self.command} request for /{'/'.join(path)}: {e}")
-                                return
-                            print(f"Error while handling {self.command} request for /{'/'.join(path)}: {e}")
-                            self.errsvc.handle(self,path,args,self.command,HTTPStatus.INTERNAL_SERVER_ERROR)
-                            handled = True
-                            break
-                if handled:
-                    break
-            if not handled:
-                if path_exists:
-                    self.errsvc.handle(self,path,args,self.command,HTTPStatus.METHOD_NOT_ALLOWED)
-                else:
-                    self.errsvc.handle(self,path,args,self.command,HTTPStatus.NOT_FOUND)
+            service, path_exists = self.routes.lookup(path, self.command, host, port)
+            if service is not None:
+                try:
+                    if not hasattr(service, "handle_"+self.command):
+                        raise ValueError(f"Service to handle {path} does not have a {self.command} handler, but a route for it exists.")
+                    method = getattr(service, "handle_"+self.command)
+                    method(self,path,args)
+                except Exception as e:
+                    if isinstance(e,ConnectionAbortedError) or isinstance(e,ConnectionResetError) or isinstance(e,ssl.SSLEOFError):
+                        print(f"Client disconnected while handling {self.command} request for /{'/'.join(path)}: {e}")
+                        return
+                    print(f"Error while handling {self.command} request for /{'/'.join(path)}: {e}")
+                    self.errsvc.handle(self,path,args,self.command,HTTPStatus.INTERNAL_SERVER_ERROR)
+            elif path_exists:
+                self.errsvc.handle(self,path,args,self.command,HTTPStatus.METHOD_NOT_ALLOWED)
+            else:
+                self.errsvc.handle(self,path,args,self.command,HTTPStatus.NOT_FOUND)
 
             # mname = 'do_' + self.command
             # if not hasattr(self, mname):
@@ -146,12 +574,27 @@ class HTTPRequestHandler(SimpleHTTPRequestHandler):
             # method = getattr(self, mname)
             # method()
 
+            if self.request_body is not None and not self.close_connection:
+                # 服务未读完的请求体：较小时读取丢弃，否则（或客户端仍在等待 100 Continue）关闭连接
+                self.close_connection = not self.request_body.drain()
             self.wfile.flush() #actually send the response if not already done.
         except TimeoutError as e:
             #a read or a write timed out.  Discard this connection
             self.log_error("Request timed out: %r", e)
             self.close_connection = True
             return
+        finally:
+            self.rfile = rfile
+            self.expect_continue = False
+            if self.response_code is None or self.response_code < 200:
+                # 没有发送响应，客户端无法判断请求是否完成
+                self.close_connection = True
+            if started is not None:
+                body = self.request_body
+                metrics.request_finished(
+                    service, self.command, self.response_code or 0, time.perf_counter() - started,
+                    0 if body is None else body.received, self.wfile.written - written + self.sendfile_bytes,
+                    self.transfer_kind)
         
     # def do_GET(self):
     #     self.do_OPERATION("GET")
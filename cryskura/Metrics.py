@@ -0,0 +1,281 @@
+"""请求指标：按线程分片的计数器与延迟直方图，以 Prometheus 文本格式导出。
+
+处理请求的线程只更新自己的分片（普通的字典与列表，不加锁），导出时才把所有分片相加。
+已结束线程的分片在导出或新建分片时并入汇总，线程模型每个连接一个线程时分片数量不会无限增长。
+
+    cryskura_requests_total{service,route,method,status}   请求数
+    cryskura_request_duration_seconds{service,route}        处理时间直方图（读取请求行之后到响应写出）
+    cryskura_request_bytes_total / cryskura_response_bytes_total{service,route}
+                                                            请求体与响应（含响应头）的字节数
+    cryskura_requests_in_flight                             正在处理的请求数
+    cryskura_connections_active / cryskura_connections_total
+    cryskura_transfer_bytes_total / cryskura_transfer_seconds_total / cryskura_transfers_total{kind}
+                                                            上传（upload）与归档下载（zip、tar）的字节数与耗时，
+                                                            两者之比即吞吐量
+
+服务名为服务的类名，路由为服务的挂载路径；没有匹配服务的请求（404、解析错误）两者都为空。
+多进程模式下每个工作进程分别统计，导出的是处理该次抓取请求的进程的数值。
+"""
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import Optional
+
+# 延迟直方图的桶上限（秒），与 Prometheus 客户端库的默认值相同
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 作为 method 标签的请求方法，其余归为 OTHER，避免任意方法名造成标签爆炸
+_METHODS = frozenset(("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"))
+# 每新建这么多分片检查一次已结束的线程
+_SWEEP_EVERY = 256
+
+
+class _Shard:
+    """单个线程的计数器，只由所属线程修改。"""
+
+    __slots__ = ("thread", "requests", "latency", "received", "sent", "in_flight", "connections", "accepted",
+                 "transfers")
+
+    def __init__(self, thread: threading.Thread, buckets: int) -> None:
+        self.thread = thread
+        self.requests = {}      # (服务, 路由, 方法, 状态码) -> 次数
+        self.latency = {}       # (服务, 路由) -> [各桶计数..., +Inf 桶计数, 总秒数]
+        self.received = {}      # (服务, 路由) -> 字节数
+        self.sent = {}          # (服务, 路由) -> 字节数
+        self.in_flight = 0      # 仪表值：本线程开始与结束的差，所有分片相加即为总数
+        self.connections = 0
+        self.accepted = 0
+        self.transfers = {}     # 类型 -> [次数, 字节数, 秒数]
+
+    def merge_into(self, other: _Shard) -> None:
+        for name in ("requests", "received", "sent"):
+            target = getattr(other, name)
+            for key, value in getattr(self, name).copy().items():
+                target[key] = target.get(key, 0) + value
+        for name in ("latency", "transfers"):
+            target = getattr(other, name)
+            for key, values in getattr(self, name).copy().items():
+                current = target.get(key)
+                if current is None:
+                    target[key] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        current[i] += value
+        other.in_flight += self.in_flight
+        other.connections += self.connections
+        other.accepted += self.accepted
+
+
+class Metrics:
+    """进程内的指标注册表，线程安全。"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS) -> None:
+        buckets = tuple(float(b) for b in buckets)
+        if not buckets or list(buckets) != sorted(set(buckets)):
+            raise ValueError("buckets must be a non-empty increasing sequence.")
+        self.buckets = buckets
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []
+        self._created = 0
+        # 已结束线程的计数
+        self._retired = _Shard(None, len(buckets))
+        # 服务 -> (服务名, 路由) 标签
+        self._labels = {}
+
+    # ── 记录（处理线程调用） ───────────────────────────────────
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard(threading.current_thread(), len(self.buckets))
+            with self._lock:
+                self._shards.append(shard)
+                self._created += 1
+                if self._created % _SWEEP_EVERY == 0:
+                    self._retire()
+        return shard
+
+    def labels(self, service) -> tuple:
+        """服务的 (服务名, 路由) 标签。"""
+        if service is None:
+            return ("", "")
+        labels = self._labels.get(service)
+        if labels is None:
+            path = getattr(service, "remote_path", None)
+            if path is None:
+                path = service.routes[0].path if service.routes else []
+            labels = self._labels[service] = (type(service).__name__, "/" + "/".join(path))
+        return labels
+
+    def request_started(self) -> None:
+        self._shard().in_flight += 1
+
+    def request_finished(self, service, method: str, status: int, seconds: float, received: int, sent: int,
+                         transfer: Optional[str] = None) -> None:
+        """记录一个处理完的请求。transfer 为上传或归档下载的类型，计入吞吐量统计。"""
+        shard = self._shard()
+        shard.in_flight -= 1
+        labels = self.labels(service)
+        key = labels + (method if method in _METHODS else "OTHER", status)
+        requests = shard.requests
+        requests[key] = requests.get(key, 0) + 1
+        histogram = shard.latency.get(labels)
+        if histogram is None:
+            histogram = shard.latency[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        histogram[bisect_left(self.buckets, seconds)] += 1
+        histogram[-1] += seconds
+        if received:
+            shard.received[labels] = shard.received.get(labels, 0) + received
+        if sent:
+            shard.sent[labels] = shard.sent.get(labels, 0) + sent
+        if transfer is not None:
+            totals = shard.transfers.get(transfer)
+            if totals is None:
+                totals = shard.transfers[transfer] = [0, 0, 0.0]
+            totals[0] += 1
+            totals[1] += received + sent
+            totals[2] += seconds
+
+    def connection_opened(self) -> None:
+        shard = self._shard()
+        shard.connections += 1
+        shard.accepted += 1
+
+    def connection_closed(self) -> None:
+        self._shard().connections -= 1
+
+    # ── 汇总与导出 ─────────────────────────────────────────────
+
+    def _retire(self) -> None:
+        # 调用方需持有锁。线程结束后不会再修改自己的分片，可以安全地并入汇总
+        alive = []
+        for shard in self._shards:
+            if shard.thread.is_alive():
+                alive.append(shard)
+            else:
+                shard.merge_into(self._retired)
+        self._shards = alive
+
+    def snapshot(self) -> _Shard:
+        """把所有分片相加，返回一个新的 _Shard。"""
+        total = _Shard(None, len(self.buckets))
+        with self._lock:
+            self._retire()
+            self._retired.merge_into(total)
+            shards = list(self._shards)
+        for shard in shards:
+            shard.merge_into(total)
+        return total
+
+    def render(self, server=None) -> str:
+        """生成 Prometheus 文本格式（0.0.4）。提供 server 时附带缓存、引擎与 TLS 统计。"""
+        total = self.snapshot()
+        out = []
+
+        _family(out, "cryskura_requests_total", "counter", "Requests handled.")
+        for (service, route, method, status), value in sorted(total.requests.items()):
+            _sample(out, "cryskura_requests_total",
+                    {"service": service, "route": route, "method": method, "status": str(status)}, value)
+
+        _family(out, "cryskura_request_duration_seconds", "histogram", "Time spent handling requests.")
+        for (service, route), histogram in sorted(total.latency.items()):
+            labels = {"service": service, "route": route}
+            count = 0
+            for bound, value in zip(self.buckets, histogram):
+                count += value
+                _sample(out, "cryskura_request_duration_seconds_bucket", dict(labels, le=_number(bound)), count)
+            count += histogram[len(self.buckets)]
+            _sample(out, "cryskura_request_duration_seconds_bucket", dict(labels, le="+Inf"), count)
+            _sample(out, "cryskura_request_duration_seconds_sum", labels, histogram[-1])
+            _sample(out, "cryskura_request_duration_seconds_count", labels, count)
+
+        for name, source, text in (("cryskura_request_bytes_total", total.received, "Request body bytes read."),
+                                   ("cryskura_response_bytes_total", total.sent, "Response bytes written, including headers.")):
+            _family(out, name, "counter", text)
+            for (service, route), value in sorted(source.items()):
+                _sample(out, name, {"service": service, "route": route}, value)
+
+        _family(out, "cryskura_requests_in_flight", "gauge", "Requests currently being handled.")
+        _sample(out, "cryskura_requests_in_flight", {}, total.in_flight)
+        _family(out, "cryskura_connections_active", "gauge", "Open client connections.")
+        _sample(out, "cryskura_connections_active", {}, total.connections)
+        _family(out, "cryskura_connections_total", "counter", "Client connections accepted.")
+        _sample(out, "cryskura_connections_total", {}, total.accepted)
+
+        for index, name, text in ((0, "cryskura_transfers_total", "Uploads and archive downloads."),
+                                  (1, "cryskura_transfer_bytes_total", "Bytes moved by uploads and archive downloads."),
+                                  (2, "cryskura_transfer_seconds_total", "Time spent in uploads and archive downloads.")):
+            _family(out, name, "counter", text)
+            for kind, values in sorted(total.transfers.items()):
+                _sample(out, name, {"kind": kind}, values[index])
+
+        if server is not None:
+            _render_caches(out, server.service_stats())
+            _render_flat(out, "cryskura_engine_", server.stats() or {}, "Server engine statistic.")
+            tls = server.tls_stats()
+            if tls is not None:
+                for key in ("handshakes", "resumed", "failures"):
+                    name = f"cryskura_tls_{key}_total"
+                    _family(out, name, "counter", f"TLS {key.replace('_', ' ')}.")
+                    _sample(out, name, {}, tls[key])
+        return "".join(out)
+
+
+# 缓存统计中作为计数器导出的字段，其余数值字段作为仪表导出
+_CACHE_COUNTERS = ("hits", "misses", "evictions")
+
+
+def _render_caches(out: list, service_stats: dict) -> None:
+    # service_stats 的键为 "服务类名:/挂载路径"，值为 {缓存名: {hits, misses, ...}}
+    samples = {}
+    for key, caches in sorted(service_stats.items()):
+        service, _, route = key.partition(":")
+        for cache, stats in sorted(caches.items()):
+            if not isinstance(stats, dict):
+                continue
+            labels = {"service": service, "route": route, "cache": cache}
+            for field, value in stats.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                suffix = "_total" if field in _CACHE_COUNTERS else ""
+                samples.setdefault(f"cryskura_cache_{field}{suffix}", []).append((labels, value))
+            lookups = stats.get("hits", 0) + stats.get("misses", 0)
+            if "hits" in stats and lookups:
+                samples.setdefault("cryskura_cache_hit_ratio", []).append((labels, stats["hits"] / lookups))
+    for name, values in samples.items():
+        _family(out, name, "counter" if name.endswith("_total") else "gauge", "Cache statistic.")
+        for labels, value in values:
+            _sample(out, name, labels, value)
+
+
+def _render_flat(out: list, prefix: str, stats: dict, text: str) -> None:
+    for field, value in sorted(stats.items()):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        _family(out, prefix + field, "gauge", text)
+        _sample(out, prefix + field, {}, value)
+
+
+def _family(out: list, name: str, kind: str, text: str) -> None:
+    out.append(f"# HELP {name} {text}\n# TYPE {name} {kind}\n")
+
+
+def _sample(out: list, name: str, labels: dict, value) -> None:
+    if labels:
+        body = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+        out.append(f"{name}{{{body}}} {_number(value)}\n")
+    else:
+        out.append(f"{name} {_number(value)}\n")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(value)
+    return str(value)
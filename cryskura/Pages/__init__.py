@@ -1,7 +1,28 @@
 import importlib.resources as res
 from cryskura import Pages
 import base64
+import hashlib
+import html
+from functools import lru_cache
 
 Directory_Page = res.read_text(Pages, "directory.html", encoding='utf-8', errors='strict')
 Error_Page = res.read_text(Pages, "error.html", encoding='utf-8', errors='strict')
-Cryskura_Icon = "data:image/png;base64,"+base64.b64encode(res.read_binary(Pages, "Cryskura.png")).decode('utf-8')
\ No newline at end of file
+Cryskura_Icon_Data = res.read_binary(Pages, "Cryskura.png")
+Cryskura_Icon = "data:image/png;base64,"+base64.b64encode(Cryskura_Icon_Data).decode('utf-8')
+
+# 图标作为独立资源提供（见 AssetService），页面中只引用其地址，浏览器可长期缓存
+Cryskura_Icon_ETag = '"' + hashlib.sha1(Cryskura_Icon_Data).hexdigest()[:16] + '"'
+Cryskura_Icon_Path = "/__cryskura__/Cryskura.png"
+Cryskura_Icon_URL = Cryskura_Icon_Path + "?v=" + Cryskura_Icon_ETag.strip('"')
+
+
+@lru_cache(maxsize=32)
+def prerender(template: str, server_name: str) -> tuple:
+    """将页面模板按 server_name 预渲染并编码，返回在 <script> 之后切开的 (head, tail) 两段字节。
+
+    每次请求只需拼接 head + 脚本变量 + tail，不再对整个页面做字符串替换。
+    """
+    page = template.replace("CryskuraHTTP", html.escape(server_name))
+    page = page.replace('background: url("Cryskura.png");', f'background: url("{Cryskura_Icon_URL}");')
+    head, sep, tail = page.partition("<script>")
+    return (head + sep).encode(), tail.encode()
@@ -7,14 +7,24 @@ except ImportError:
 import socket
 import psutil
 import threading
+import weakref
 from http.server import ThreadingHTTPServer
 from .uPnP import uPnPClient
 from .Handler import HTTPRequestHandler as Handler
-from .Services import BaseService, FileService, ErrorService
+from .TLS import TLSConfig
+from .Services import BaseService, FileService, ErrorService, AssetService, MetricsService
+from .Services.RouteTable import RouteTable
+from .Engines import AsyncHTTPServer, PooledHTTPServer, PreforkServer, create_listener, OVERLOAD_POLICIES
+
+# 可选的服务器引擎
+ENGINES = ("thread", "asyncio", "pool")
 
 
 class HTTPServer:
-    def __init__(self, interface: str = "127.0.0.1", port: int = 8080, services=None, error_service=None, server_name: str = "CryskuraHTTP/1.0", forcePort: bool = False, certfile=None, uPnP=False):
+    # 本进程中已启动的服务器，多进程模式下工作进程需要关闭其它服务器继承来的套接字
+    _instances = weakref.WeakSet()
+
+    def __init__(self, interface: str = "127.0.0.1", port: int = 8080, services=None, error_service=None, server_name: str = "CryskuraHTTP/1.0", forcePort: bool = False, certfile=None, uPnP=False, engine: str = "thread", max_workers=None, backlog: int = 128, queue_size=None, overload: str = "wait", timeout: float = 30, workers: int = 1, keep_alive_timeout: float = 15, keep_alive_requests: int = 100, tls=None):
         # 获取系统所有网卡的IP地址
         addrs = psutil.net_if_addrs()
         available_devices = ["Any Available Interface"]
@@ -75,6 +85,16 @@ class HTTPServer:
                     raise ValueError(
                         f"Service {service} is not a valid service.")
 
+        # 指标服务：有 MetricsService 时处理请求的同时记录指标，导出时由它收集服务器的统计
+        self.metrics = None
+        for service in self.services:
+            if isinstance(service, MetricsService):
+                service.server = self
+                self.metrics = service.metrics
+
+        # 目录列表页和错误页引用的图标等静态资源，放在最前面以免被其它服务的前缀路由覆盖
+        self.services.insert(0, AssetService())
+
         # 检查错误服务是否合法
         if error_service is None:
             self.error_service = ErrorService(server_name)
@@ -89,34 +109,121 @@ class HTTPServer:
         if certfile is not None:
             if not os.path.exists(certfile):
                 raise ValueError(f"Certfile {certfile} does not exist.")
-            self.certfile = certfile
-        else:
-            self.certfile = None
+        # TLS 配置：只提供 certfile 时使用默认配置，TLSConfig 未指定证书时使用 certfile
+        if tls is not None:
+            if not isinstance(tls, TLSConfig):
+                raise ValueError(f"tls must be a TLSConfig, got {tls!r}.")
+            if tls.certfile is None:
+                if certfile is None:
+                    raise ValueError("TLS requires a certificate file.")
+                tls.certfile = certfile
+        elif certfile is not None and ssl is not None:
+            tls = TLSConfig(certfile)
+        self.tls = tls
+        self.certfile = tls.certfile if tls is not None else certfile
+
+        # 检查服务器引擎是否合法
+        if engine not in ENGINES:
+            raise ValueError(f"Engine {engine} is not a valid engine. \nAvailable engines: {', '.join(ENGINES)}")
+        if max_workers is not None and max_workers < 1:
+            raise ValueError(f"max_workers must be a positive integer, got {max_workers}.")
+        if backlog < 1:
+            raise ValueError(f"backlog must be a positive integer, got {backlog}.")
+        if queue_size is not None and queue_size < 1:
+            raise ValueError(f"queue_size must be a positive integer, got {queue_size}.")
+        if overload not in OVERLOAD_POLICIES:
+            raise ValueError(f"Overload policy {overload} is not valid. \nAvailable policies: {', '.join(OVERLOAD_POLICIES)}")
+        if timeout is not None and timeout <= 0:
+            raise ValueError(f"timeout must be positive, got {timeout}.")
+        if workers < 1:
+            raise ValueError(f"workers must be a positive integer, got {workers}.")
+        if keep_alive_timeout is None or keep_alive_timeout < 0:
+            raise ValueError(f"keep_alive_timeout must be non-negative, got {keep_alive_timeout}.")
+        if keep_alive_requests < 1:
+            raise ValueError(f"keep_alive_requests must be a positive integer, got {keep_alive_requests}.")
+        if workers > 1 and not hasattr(os, "fork"):
+            raise ValueError("Multi-process mode (workers > 1) is not supported on this platform.")
+        self.engine = engine
+        self.workers = workers
+        self.max_workers = max_workers
+        self.backlog = backlog
+        self.queue_size = queue_size
+        self.overload = overload
+        self.timeout = timeout
+        # 持久连接的空闲超时（0 表示每个连接只处理一个请求）与每个连接最多处理的请求数
+        self.keep_alive_timeout = keep_alive_timeout
+        self.keep_alive_requests = keep_alive_requests
 
         self.server_name = server_name
+        self.routes = None
         self.server = None
         self.thread = None
 
+    def create_ssl_context(self):
+        # 根据TLS配置创建SSL上下文，未配置证书时返回None
+        if self.tls is None:
+            return None
+        return self.tls.create_context()
+
+    def create_server(self, ssl_ctx=None, sock=None, reuse_port: bool = False):
+        # 按所选引擎创建服务器对象
+        # sock 为已在监听的套接字（多进程共享模式），否则自行绑定端口
+        if self.routes is None:
+            self.routes = RouteTable(self.services)
+        handler_kwargs = {"services": self.services, "errsvc": self.error_service, "routes": self.routes,
+                          "keep_alive_timeout": self.keep_alive_timeout,
+                          "keep_alive_requests": self.keep_alive_requests}
+        if self.engine == "asyncio":
+            return AsyncHTTPServer(
+                (self.interface, self.port), handler_kwargs,
+                ssl_context=ssl_ctx, max_workers=self.max_workers, backlog=self.backlog,
+                sock=sock, reuse_port=reuse_port, tls=self.tls, metrics=self.metrics)
+        handler = lambda *args, **kwargs: Handler(*args, **handler_kwargs, **kwargs)
+        if self.engine == "pool":
+            server_class = PooledHTTPServer
+            server_kwargs = {"max_workers": self.max_workers, "backlog": self.backlog,
+                             "queue_size": self.queue_size, "overload": self.overload,
+                             "timeout": self.timeout}
+        else:
+            server_class = ThreadingHTTPServer
+            server_kwargs = {}
+        server = server_class((self.interface, self.port), handler,
+                              bind_and_activate=False, **server_kwargs)
+        # 监听套接字统一由 create_listener 创建（IPv6、SO_REUSEPORT、backlog）
+        # 默认的 listen 队列长度只有 5，突发连接会被拒绝
+        server.request_queue_size = self.backlog
+        if sock is None:
+            sock = create_listener((self.interface, self.port), self.backlog, reuse_port)
+        server.socket.close()
+        server.socket = sock
+        server.server_address = sock.getsockname()
+        if ssl_ctx is not None:
+            # 接受连接时不握手，握手由处理连接的线程完成（见 Handler.handle）
+            server.socket = ssl_ctx.wrap_socket(server.socket, server_side=True, do_handshake_on_connect=False)
+        server.tls = self.tls
+        server.metrics = self.metrics
+        return server
+
     def start(self, threaded: bool = True):
         # 启动HTTP服务器
-        handler = lambda *args, **kwargs: Handler(
-            *args, services=self.services, errsvc=self.error_service, **kwargs)
-        if ":" in self.interface:  # Check if the interface is an IPv6 address
-            ThreadingHTTPServer.address_family = socket.AF_INET6
-        self.server = ThreadingHTTPServer((self.interface, self.port), handler)
-        if self.certfile is not None and ssl is not None:
-            ssl_ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
-            try:
-                ssl_ctx.load_cert_chain(certfile=self.certfile)
-            except Exception as e:
-                raise ValueError(
-                    f"Error loading certificate: {e}\nPlease provide a valid certificate file.\nOnly PEM file with both certificate and private key is supported.")
-            self.server.socket = ssl_ctx.wrap_socket(
-                self.server.socket, server_side=True)
+        # 将所有服务的路由编译为路由表，请求时按路径深度查找而不是逐个匹配
+        self.routes = RouteTable(self.services)
+        ssl_ctx = self.create_ssl_context()
+        if self.workers > 1:
+            # 多进程模式：SSL上下文在父进程中创建，各工作进程共享（包括会话票据密钥）
+            self.server = PreforkServer(
+                (self.interface, self.port), self.workers,
+                lambda sock, reuse_port: self.create_server(ssl_ctx, sock, reuse_port),
+                backlog=self.backlog, child_init=self._close_inherited)
+        else:
+            self.server = self.create_server(ssl_ctx)
+        HTTPServer._instances.add(self)
         if ":" in self.interface:
             print(f"Server started at [{self.interface}]:{self.port}")
         else:
             print(f"Server started at {self.interface}:{self.port}")
+        if self.workers > 1:
+            print(f"Running with {self.workers} worker processes.")
         if self.uPnP is not None:
             res, map = self.uPnP.add_port_mapping(
                 self.port, self.port, "TCP", self.server_name)
@@ -130,6 +237,38 @@ class HTTPServer:
         else:
             self.serve_forever()
 
+    def _close_inherited(self):
+        # 在工作进程中关闭从父进程继承的其它服务器（如HTTP跳转服务器）的监听套接字
+        for other in list(HTTPServer._instances):
+            if other is self or other.server is None:
+                continue
+            sock = getattr(other.server, "socket", None)
+            if sock is not None:
+                sock.close()
+            other.server = None
+            other.thread = None
+
+    def stats(self):
+        # 返回服务器引擎的统计信息（线程池引擎提供队列统计，多进程模式提供工作进程统计），不支持时返回None
+        if self.server is not None and hasattr(self.server, "stats"):
+            return self.server.stats()
+        return None
+
+    def tls_stats(self):
+        # 返回本进程的TLS握手与会话恢复统计，未启用HTTPS时返回None
+        if self.tls is None:
+            return None
+        return self.tls.stats()
+
+    def service_stats(self):
+        # 收集各服务的缓存统计（提供 stats() 的服务），键为 "服务类名:/挂载路径"
+        result = {}
+        for service in self.services:
+            if hasattr(service, "stats"):
+                remote_path = getattr(service, "remote_path", None) or []
+                result[f"{type(service).__name__}:/{'/'.join(remote_path)}"] = service.stats()
+        return result
+
     def serve_forever(self):
         try:
             self.server.serve_forever()
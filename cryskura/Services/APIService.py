@@ -23,6 +23,9 @@ class APIService(BaseService):
         request.send_response(code)
         for key in headers:
             request.send_header(key, headers[key])
+        if not any(key.lower() in ("content-length", "transfer-encoding") for key in headers):
+            # 未声明长度时补上，连接才能复用
+            request.send_header("Content-Length", str(len(content)))
         request.end_headers()
         request.wfile.write(content)
 
@@ -0,0 +1,43 @@
+from ..Pages import Cryskura_Icon_Data, Cryskura_Icon_ETag, Cryskura_Icon_Path
+
+from . import BaseService, Route
+from .FileService.validators import weak_match
+from .. import Handler
+
+from http import HTTPStatus
+
+
+class AssetService(BaseService):
+    """提供目录列表页与错误页引用的静态资源（图标），带 ETag 并允许长期缓存。
+
+    资源地址中带有内容哈希，内容变化时地址随之变化，因此可以标记为 immutable。
+    """
+
+    def __init__(self):
+        self.routes = [
+            Route(Cryskura_Icon_Path, ["GET", "HEAD"], "exact"),
+        ]
+        super().__init__(self.routes)
+
+    def _send_headers(self, request: Handler) -> bool:
+        # 返回是否需要发送内容
+        if weak_match(request.headers.get("If-None-Match", ""), Cryskura_Icon_ETag):
+            request.send_response(HTTPStatus.NOT_MODIFIED)
+            request.send_header("ETag", Cryskura_Icon_ETag)
+            request.send_header("Cache-Control", "public, max-age=31536000, immutable")
+            request.end_headers()
+            return False
+        request.send_response(HTTPStatus.OK)
+        request.send_header("Content-Type", "image/png")
+        request.send_header("Content-Length", str(len(Cryskura_Icon_Data)))
+        request.send_header("ETag", Cryskura_Icon_ETag)
+        request.send_header("Cache-Control", "public, max-age=31536000, immutable")
+        request.end_headers()
+        return True
+
+    def handle_GET(self, request: Handler, path: list, args: dict):
+        if self._send_headers(request):
+            request.wfile.write(Cryskura_Icon_Data)
+
+    def handle_HEAD(self, request: Handler, path: list, args: dict):
+        self._send_headers(request)
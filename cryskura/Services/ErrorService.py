@@ -1,4 +1,4 @@
-from ..Pages import Error_Page,Cryskura_Icon
+from ..Pages import Error_Page, prerender
 
 from . import BaseService
 from .. import Handler
@@ -8,20 +8,39 @@ from http import HTTPStatus
 class ErrorService(BaseService):
     def __init__(self, server_name):
         self.server_name = server_name
+        # 错误页面按状态码预先渲染并编码，请求时直接发送
+        head, tail = prerender(Error_Page, server_name)
+        self._pages = {}
+        for status in HTTPStatus:
+            if status >= 400:
+                self._pages[int(status)] = self._render(head, tail, status)
+
+    @staticmethod
+    def _render(head: bytes, tail: bytes, status: int) -> bytes:
+        try:
+            statusStr = HTTPStatus(status).phrase
+        except ValueError:
+            statusStr = ""
+        return head + f"let error='{str(status)+' '+statusStr}';".encode() + tail
+
+    def page(self, status: int) -> bytes:
+        # 返回指定状态码的错误页面，非常见状态码在首次使用时渲染
+        status = int(status)
+        page = self._pages.get(status)
+        if page is None:
+            head, tail = prerender(Error_Page, self.server_name)
+            page = self._pages[status] = self._render(head, tail, status)
+        return page
 
     def handle(self, request:Handler, path:list,args:dict, method:str, status:int):
-        if method=="HEAD":
-            request.send_response(status)
-            request.end_headers()
-            return
         request.send_response(status)
-        if method=="GET": # GET 请求返回错误页面
-            request.send_header("Content-Type", "text/html")
+        if method=="GET" or method=="HEAD": # GET 请求返回错误页面，HEAD 只返回对应的头部
+            page = self.page(status)
+            request.send_header("Content-Type", "text/html; charset=utf-8")
+            request.send_header("Content-Length", str(len(page)))
             request.end_headers()
-            statusStr=HTTPStatus(status).phrase
-            Page=Error_Page.replace("CryskuraHTTP", self.server_name)
-            Page=Page.replace('background: url("Cryskura.png");', f'background: url("{Cryskura_Icon}");')
-            Page=Page.replace("<script>", f"<script>let error='{str(status)+' '+statusStr}';")
-            request.wfile.write(Page.encode())
+            if method=="GET":
+                request.wfile.write(page)
         else: # 其他方法不返回内容
+            request.send_header("Content-Length", "0")
             request.end_headers()
@@ -3,23 +3,49 @@
 子模块：
     info     — ?info 端点（文件信息 JSON）
     zip      — ?zip 端点（压缩下载）
+    zipwriter — 流式 ZIP 写入与并行 deflate
+    zipstore — ?zip=store 不压缩、可续传的 ZIP64 归档
+    tar      — ?tar 端点（tar / tar.gz / tar.zst 流式下载）
+    archivecache — 压缩归档的磁盘缓存
     range    — 断点续传 Range 请求
+    transmit — sendfile 零拷贝发送引擎
     upload   — 文件上传（multipart/form-data）
+    resumable — 可续传上传（tus 风格的偏移量协议）
+    put      — PUT 原始请求体上传
     directory — 目录列表 HTML 渲染
+    listing  — 目录列表缓存（scandir + LRU）
+    resolve  — 路径解析与 stat 缓存
+    static   — 普通文件响应
+    fdcache  — 已打开文件描述符缓存
+    objcache — 小文件内存缓存
+    encoding — Accept-Encoding 协商、预压缩旁路文件与实时压缩
 """
 from __future__ import annotations
 
 import logging
 import os
 import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
 from typing import Optional, TYPE_CHECKING
 
 from ..BaseService import BaseService, Route
+from .archivecache import ArchiveCache
 from .directory import handle_directory
+from .encoding import ContentEncoder
+from .fdcache import OpenFileCache
 from .info import handle_info
+from .listing import DirectoryListingCache
+from .objcache import HotObjectCache
+from .put import FSYNC_POLICIES, handle_put
 from .range import handle_range_request
+from .resolve import PathResolver, ResolvedPath
+from .resumable import ResumableUploads, is_hidden
+from .static import serve_file
+from .tar import handle_tar
 from .upload import handle_upload
+from .zipstore import CRCCache
 from .zip import handle_zip
 
 if TYPE_CHECKING:
@@ -42,10 +68,26 @@ class FileService(BaseService):
         port: Optional[int] = None,
         upload_limit: int = 0,
         expose_details: bool = True,
+        listing_cache_size: int = 128,
+        resolve_cache_size: int = 4096,
+        resolve_cache_ttl: float = 2.0,
+        open_file_cache: Optional[OpenFileCache] = None,
+        object_cache: Optional[HotObjectCache] = None,
+        precompressed: bool = True,
+        compression: Optional[ContentEncoder] = None,
+        zip_workers: Optional[int] = None,
+        zip_level: int = 6,
+        zip_crc_cache_size: int = 65536,
+        archive_cache: Optional[ArchiveCache] = None,
+        resumable_expiry: float = 24 * 3600,
+        put_preallocate: bool = True,
+        put_fsync: str = "none",
     ) -> None:
+        if put_fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync policy {put_fsync} is not valid. \nAvailable policies: {', '.join(FSYNC_POLICIES)}")
         methods = ["GET", "HEAD"]
         if allowUpload:
-            methods.append("POST")
+            methods.extend(["POST", "PATCH", "PUT"])
         self.routes = [
             Route(remote_path, methods, "prefix" if isFolder else "exact", host, port),
         ]
@@ -63,26 +105,77 @@ class FileService(BaseService):
         if not isFolder and not os.path.isfile(local_path):
             raise ValueError(f"Path {local_path} is not a file.")
         self.server_name = server_name
+        # 目录列表缓存，按目录 mtime 校验；设为 0 关闭
+        self.listing_cache = DirectoryListingCache(listing_cache_size)
+        # 路径解析缓存，每个请求只需一次 stat；设为 0 关闭
+        self.resolver = PathResolver(self.local_path, resolve_cache_ttl, resolve_cache_size)
+        # 可选的已打开文件缓存，可在多个服务之间共享
+        self.open_file_cache = open_file_cache
+        # 可选的小文件内存缓存，可在多个服务之间共享
+        self.object_cache = object_cache
+        # 存在 .br / .gz 旁路文件时按 Accept-Encoding 发送；compression 为可选的实时压缩配置
+        self.precompressed = precompressed
+        self.compression = compression
+        # ?zip 并行压缩的线程数（默认 CPU 核数）与压缩级别；线程池在首次使用时创建
+        self.zip_workers = zip_workers or os.cpu_count() or 1
+        self.zip_level = zip_level
+        self._zip_executor = None
+        self._zip_lock = threading.Lock()
+        # ?zip=store 使用的文件 CRC 缓存，续传与分段下载时无需重复读取文件；设为 0 关闭
+        self.zip_crc_cache = CRCCache(zip_crc_cache_size)
+        # 可选的压缩归档磁盘缓存，可在多个服务之间共享
+        self.archive_cache = archive_cache
+        # 可续传上传，未完成的上传超过 resumable_expiry 秒后清理
+        self.resumable = ResumableUploads(self.local_path, resumable_expiry) if allowUpload and isFolder else None
+        # PUT 上传：已知长度时预分配空间；fsync 为落盘策略
+        self.put_preallocate = put_preallocate
+        self.put_fsync = put_fsync
         super().__init__(self.routes, auth_func)
         self.remote_path = self.routes[0].path
 
-    def calc_path(self, path: list) -> tuple[bool, str, str, str]:
-        """解析请求路径到本地文件路径，返回 (is_valid, r_directory, r_path, real_path)。"""
+    def resolve(self, path: list) -> tuple[str, str, ResolvedPath]:
+        """解析请求路径，返回 (r_directory, r_path, 解析记录)。"""
         if self.isFolder:
             sub_path = path[len(self.remote_path):]
-            r_directory = os.path.abspath(self.local_path)
-            real_path = os.path.realpath(os.path.join(r_directory, '/'.join(sub_path)))
+            r_directory = self.local_path
             r_path = '/' + '/'.join(sub_path)
+            real_path = os.path.join(r_directory, '/'.join(sub_path))
+            if any(is_hidden(name) for name in sub_path):
+                # 上传过程中的隐藏文件不对外提供
+                resolved = ResolvedPath(real_path, None, None, False)
+            else:
+                resolved = self.resolver.resolve(real_path, tuple(sub_path))
         else:
             r_directory = os.path.dirname(self.local_path)
             r_path = os.path.basename(self.local_path)
-            real_path = os.path.realpath(self.local_path)
-        try:
-            common_path = os.path.commonpath([real_path, os.path.realpath(self.local_path)])
-        except ValueError:
-            return False, r_directory, r_path, real_path
-        is_valid = os.path.exists(real_path) and os.path.samefile(common_path, os.path.realpath(self.local_path))
-        return is_valid, r_directory, r_path, real_path
+            resolved = self.resolver.resolve(self.local_path, ())
+        return r_directory, r_path, resolved
+
+    def zip_executor(self) -> ThreadPoolExecutor:
+        if self._zip_executor is None:
+            with self._zip_lock:
+                if self._zip_executor is None:
+                    self._zip_executor = ThreadPoolExecutor(self.zip_workers, thread_name_prefix="cryskura-zip")
+        return self._zip_executor
+
+    def calc_path(self, path: list) -> tuple[bool, str, str, str]:
+        """解析请求路径到本地文件路径，返回 (is_valid, r_directory, r_path, real_path)。"""
+        r_directory, r_path, resolved = self.resolve(path)
+        return resolved.valid, r_directory, r_path, resolved.real_path
+
+    def stats(self) -> dict:
+        """返回各缓存的命中统计。"""
+        stats = {"listing": self.listing_cache.stats(), "resolve": self.resolver.stats()}
+        if self.open_file_cache is not None:
+            stats["open_file"] = self.open_file_cache.stats()
+        if self.object_cache is not None:
+            stats["object"] = self.object_cache.stats()
+        if self.compression is not None:
+            stats["compression"] = self.compression.stats()
+        stats["zip_crc"] = self.zip_crc_cache.stats()
+        if self.archive_cache is not None:
+            stats["archive"] = self.archive_cache.stats()
+        return stats
 
     # ── GET ────────────────────────────────────────────────────
 
@@ -90,70 +183,63 @@ class FileService(BaseService):
         if not self.auth_verify(request, path, args, "GET"):
             return
 
-        is_valid, request.directory, request.path, real_path = self.calc_path(path)
-        if not is_valid:
+        request.directory, request.path, resolved = self.resolve(path)
+        if not resolved.valid:
             request.errsvc.handle(request, path, args, "GET", HTTPStatus.NOT_FOUND)
             return
+        real_path = resolved.real_path
 
         # ?info: 文件信息
         if "info" in args:
-            handle_info(request, real_path, self.expose_details)
+            handle_info(request, real_path, self.expose_details, resolved.stat, self.compression)
             return
 
         # ?zip: 压缩下载
         if "zip" in args:
-            handle_zip(request, real_path)
+            request.transfer_kind = "zip"
+            handle_zip(request, real_path, self.zip_executor(), self.zip_workers, self.zip_level,
+                       args.get("zip", ""), self.zip_crc_cache, self.archive_cache)
+            return
+
+        # ?tar: tar 归档下载
+        if "tar" in args:
+            request.transfer_kind = "tar"
+            handle_tar(request, real_path, args, self.archive_cache)
             return
 
         # Range: 断点续传
-        if self.allowResume and os.path.isfile(real_path):
-            if handle_range_request(request, real_path, args):
+        if self.allowResume and resolved.is_file:
+            if handle_range_request(request, real_path, args, resolved.stat, self.open_file_cache):
                 return
 
         # 目录列表
-        if os.path.isdir(real_path):
-            handle_directory(request, real_path, self.server_name, self.allowUpload)
-            return
-
-        # 304 Not Modified 检查（send_head 内部也检查，但依赖 self.etag 属性）
-        try:
-            st = os.stat(real_path)
-            etag = f'"{int(st.st_mtime):x}-{st.st_size:x}"'
-            inm = request.headers.get("If-None-Match")
-            if inm and etag in inm.split(","):
-                request.send_response(HTTPStatus.NOT_MODIFIED)
-                request.send_header("ETag", etag)
-                request.send_header("Last-Modified", request.date_time_string(int(st.st_mtime)))
-                request.end_headers()
-                return
-        except OSError:
-            pass
+        if resolved.is_dir:
+            handle_directory(request, real_path, self.server_name, self.allowUpload, self.listing_cache, self.compression)
+            return
 
         # 普通文件
-        f = request.send_head()  # type: ignore[assignment]
-        if f:
-            try:
-                request.copyfile(f, request.wfile)
-            finally:
-                f.close()
+        serve_file(request, real_path, resolved.stat, cache=self.open_file_cache, objects=self.object_cache,
+                   precompressed=self.precompressed, encoder=self.compression)
 
     # ── HEAD ───────────────────────────────────────────────────
 
     def handle_HEAD(self, request: Handler, path: list, args: dict) -> None:
         if not self.auth_verify(request, path, args, "HEAD"):
             return
-        is_valid, request.directory, request.path, real_path = self.calc_path(path)
-        if not is_valid:
+        request.directory, request.path, resolved = self.resolve(path)
+        if not resolved.valid:
             request.errsvc.handle(request, path, args, "HEAD", HTTPStatus.NOT_FOUND)
             return
-        if os.path.isdir(real_path):
+        if "upload" in args and self.resumable is not None and resolved.is_dir:
+            self.resumable.head(request, resolved.real_path, args["upload"])
+            return
+        if resolved.is_dir:
             request.send_response(HTTPStatus.OK)
             request.send_header("Content-Type", "text/html")
             request.end_headers()
         else:
-            f = request.send_head()
-            if f:
-                f.close()
+            serve_file(request, resolved.real_path, resolved.stat, send_body=False, cache=self.open_file_cache,
+                       objects=self.object_cache, precompressed=self.precompressed, encoder=self.compression)
 
     # ── POST (上传) ────────────────────────────────────────────
 
@@ -163,8 +249,43 @@ class FileService(BaseService):
         if not self.allowUpload:
             request.errsvc.handle(request, path, args, "POST", HTTPStatus.METHOD_NOT_ALLOWED)
             return
-        is_valid, request.directory, request.path, real_path = self.calc_path(path)
-        if not is_valid or not os.path.isdir(real_path):
+        request.directory, request.path, resolved = self.resolve(path)
+        if not resolved.valid or not resolved.is_dir:
             request.errsvc.handle(request, path, args, "POST", HTTPStatus.NOT_FOUND)
             return
-        handle_upload(request, real_path, self.upload_limit)
+        request.transfer_kind = "upload"
+        if "upload" in args and self.resumable is not None:
+            self.resumable.create(request, resolved.real_path, "/" + "/".join(path), self.upload_limit)
+            return
+        handle_upload(request, resolved.real_path, self.upload_limit)
+
+    # ── PATCH (可续传上传) ─────────────────────────────────────
+
+    def handle_PATCH(self, request: Handler, path: list, args: dict) -> None:
+        if not self.auth_verify(request, path, args, "PATCH"):
+            return
+        if self.resumable is None:
+            request.errsvc.handle(request, path, args, "PATCH", HTTPStatus.METHOD_NOT_ALLOWED)
+            return
+        request.directory, request.path, resolved = self.resolve(path)
+        if not resolved.valid or not resolved.is_dir or not args.get("upload"):
+            request.errsvc.handle(request, path, args, "PATCH", HTTPStatus.NOT_FOUND)
+            return
+        request.transfer_kind = "upload"
+        self.resumable.patch(request, resolved.real_path, args["upload"])
+
+    # ── PUT (原始请求体上传) ───────────────────────────────────
+
+    def handle_PUT(self, request: Handler, path: list, args: dict) -> None:
+        if not self.auth_verify(request, path, args, "PUT"):
+            return
+        if not self.allowUpload or not self.isFolder or len(path) <= len(self.remote_path):
+            request.errsvc.handle(request, path, args, "PUT", HTTPStatus.METHOD_NOT_ALLOWED)
+            return
+        request.directory, request.path, parent = self.resolve(path[:-1])
+        if not parent.valid or not parent.is_dir:
+            request.errsvc.handle(request, path, args, "PUT", HTTPStatus.NOT_FOUND)
+            return
+        request.transfer_kind = "upload"
+        handle_put(request, parent.real_path, path[-1], "/" + "/".join(path), self.upload_limit,
+                   self.put_preallocate, self.put_fsync)
@@ -0,0 +1,231 @@
+"""目录归档的磁盘缓存：同一目录树的压缩归档只生成一次。
+
+缓存键是归档格式与文件列表（归档内路径、大小、st_mtime_ns）的 SHA-256 签名，
+任何文件增删改都会得到新的键。首个请求在流式发送的同时把归档写入缓存目录中的临时文件
+（ArchiveWriter），完整写完且文件列表未变化时改名为正式条目；之后的请求直接用 sendfile 发送，
+带 Content-Length 并支持 Range。
+
+    directory — 缓存目录，不存在时自动创建；启动时载入已有条目
+    max_bytes — 磁盘预算，超出时按 LRU 淘汰；单个归档超过预算时不缓存
+
+同一个缓存对象可以在多个服务之间共享。
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Iterable, Optional
+
+from .range import abort_connection, send_entity
+from .transmit import send_file
+
+if TYPE_CHECKING:
+    from ...Handler import HTTPRequestHandler
+
+logger = logging.getLogger(__name__)
+
+_TMP_PREFIX = ".tmp-"
+
+
+def tree_parts(files: Iterable) -> list:
+    """把 (本地路径, 归档内路径) 序列转换为缓存键使用的成员描述，无法 stat 的文件被忽略。"""
+    parts = []
+    for path, arcname in files:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        parts.append(b"%s\0%x\0%x" % (arcname.encode("utf-8", "surrogateescape"), st.st_size, st.st_mtime_ns))
+    return parts
+
+
+def archive_key(kind: str, parts: Iterable[bytes]) -> str:
+    """由归档格式与每个成员的描述（名称、大小、修改时间）计算缓存键。"""
+    digest = hashlib.sha256(kind.encode("utf-8") + b"\0")
+    for part in parts:
+        digest.update(part)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ArchiveCache:
+    """线程安全的归档磁盘缓存。"""
+
+    def __init__(self, directory: str, max_bytes: int = 4 * 1024 * 1024 * 1024) -> None:
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be a positive integer.")
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        self._entries: OrderedDict = OrderedDict()  # 文件名 -> 大小
+        self._writing: set = set()
+        self._lock = threading.Lock()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._load()
+
+    def _load(self) -> None:
+        found = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            if entry.name.startswith(_TMP_PREFIX):
+                # 上次运行中断时留下的临时文件
+                self._unlink(entry.name)
+                continue
+            st = entry.stat(follow_symlinks=False)
+            found.append((st.st_atime, entry.name, st.st_size))
+        for _, name, size in sorted(found):
+            self._entries[name] = size
+            self._size += size
+        with self._lock:
+            self._evict()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _unlink(self, name: str) -> None:
+        try:
+            os.unlink(self._path(name))
+        except OSError:
+            pass
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        # 调用方需持有锁
+        while self._size > self.max_bytes and self._entries:
+            name = next(iter(self._entries))
+            if name == keep:
+                if len(self._entries) == 1:
+                    break
+                self._entries.move_to_end(name)
+                continue
+            size = self._entries.pop(name)
+            self._size -= size
+            self.evictions += 1
+            # 正在发送该文件的请求持有已打开的描述符，不受影响
+            self._unlink(name)
+
+    def open(self, name: str) -> Optional[tuple]:
+        """打开缓存条目，返回 (fd, stat)；不存在时返回 None。调用方负责关闭 fd。"""
+        with self._lock:
+            if name not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(name)
+        try:
+            fd = os.open(self._path(name), os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        except OSError:
+            # 文件已被外部删除
+            with self._lock:
+                self._size -= self._entries.pop(name, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return fd, os.fstat(fd)
+
+    def writer(self, name: str) -> Optional[ArchiveWriter]:
+        """开始写入一个新条目；同一条目正在由其他请求写入时返回 None。"""
+        with self._lock:
+            if name in self._writing or name in self._entries:
+                return None
+            self._writing.add(name)
+        try:
+            return ArchiveWriter(self, name)
+        except OSError as e:
+            logger.warning("Cannot create archive cache file for %s: %s", name, e)
+            with self._lock:
+                self._writing.discard(name)
+            return None
+
+    def _finish(self, name: str, tmp_name: str, size: Optional[int]) -> None:
+        # size 为 None 表示放弃该条目
+        with self._lock:
+            self._writing.discard(name)
+            if size is None:
+                self._unlink(tmp_name)
+                return
+            try:
+                os.replace(self._path(tmp_name), self._path(name))
+            except OSError:
+                self._unlink(tmp_name)
+                return
+            self._entries[name] = size
+            self._size += size
+            self._evict(keep=name)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def send_cached(request: HTTPRequestHandler, cache: ArchiveCache, name: str, headers: tuple) -> bool:
+    """缓存中存在 name 时发送它（支持条件请求与 Range）并返回 True。"""
+    opened = cache.open(name)
+    if opened is None:
+        return False
+    fd, st = opened
+    try:
+        etag = '"arc-' + name[:24] + '"'
+        send_entity(request, st.st_size, etag, st, headers,
+                    lambda start, end: send_file(request, fd, start, end - start + 1))
+    except OSError as e:
+        logger.warning("Aborting cached archive %s: %s", name, e)
+        abort_connection(request)
+    finally:
+        os.close(fd)
+    return True
+
+
+class ArchiveWriter:
+    """把归档边发送边写入缓存：write 写入临时文件，commit 后成为正式条目。
+
+    超过缓存预算或写入失败时自动放弃，不影响正在进行的下载。
+    """
+
+    def __init__(self, cache: ArchiveCache, name: str) -> None:
+        self.cache = cache
+        self.name = name
+        self.tmp_name = f"{_TMP_PREFIX}{name}-{os.getpid()}-{threading.get_ident()}"
+        self._file = open(cache._path(self.tmp_name), "wb")
+        self.size = 0
+        self.failed = False
+
+    def write(self, data: bytes) -> None:
+        if self.failed:
+            return
+        self.size += len(data)
+        if self.size > self.cache.max_bytes:
+            self.failed = True
+            return
+        try:
+            self._file.write(data)
+        except OSError as e:
+            logger.warning("Archive cache write failed for %s: %s", self.name, e)
+            self.failed = True
+
+    def commit(self) -> None:
+        try:
+            self._file.close()
+        except OSError:
+            self.failed = True
+        self.cache._finish(self.name, self.tmp_name, None if self.failed else self.size)
+
+    def abort(self) -> None:
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        self.cache._finish(self.name, self.tmp_name, None)
@@ -0,0 +1,248 @@
+"""内容编码协商（Accept-Encoding）：预压缩的 .br / .gz 旁路文件与实时 gzip / brotli 压缩。
+
+旁路文件：客户端接受对应编码且 <文件>.br / <文件>.gz 存在时直接发送该文件，
+仍走 sendfile 零拷贝路径。旁路文件必须是普通文件（不跟随符号链接），且不早于原文件。
+
+实时压缩（ContentEncoder）：对可压缩的 MIME 类型按需压缩。不超过 max_object_size 的
+文件压缩结果按 (路径, ETag, 编码) 缓存，总大小受 max_cached_bytes 限制；更大的文件
+流式压缩后以 chunked 分块发送。
+
+brotli 为可选依赖，未安装时只使用 gzip。
+"""
+from __future__ import annotations
+
+import os
+import stat
+import threading
+import zlib
+from collections import OrderedDict
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Optional
+
+from .transmit import BodyStream, pread
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+if TYPE_CHECKING:
+    from ...Handler import HTTPRequestHandler
+
+# 旁路文件扩展名，按优先顺序排列
+SIDECARS = (("br", ".br"), ("gzip", ".gz"))
+
+_COMPRESSIBLE_PREFIXES = ("text/",)
+_COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/javascript",
+    "application/x-javascript",
+    "application/xml",
+    "application/xhtml+xml",
+    "application/rss+xml",
+    "application/atom+xml",
+    "application/manifest+json",
+    "application/wasm",
+    "image/svg+xml",
+    "image/x-icon",
+    "image/vnd.microsoft.icon",
+    "font/ttf",
+    "font/otf",
+}
+
+# 流式压缩每次读取的块大小
+_STREAM_CHUNK = 256 * 1024
+
+
+def is_compressible(ctype: Optional[str]) -> bool:
+    if not ctype:
+        return False
+    ctype = ctype.split(";", 1)[0].strip().lower()
+    return ctype.startswith(_COMPRESSIBLE_PREFIXES) or ctype in _COMPRESSIBLE_TYPES
+
+
+def accepted_encodings(request: HTTPRequestHandler) -> dict:
+    """解析 Accept-Encoding，返回 {编码: q 值}，忽略 q=0 的编码。"""
+    header = request.headers.get("Accept-Encoding")
+    if not header:
+        return {}
+    result = {}
+    for item in header.split(","):
+        name, _, params = item.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            result[name] = q
+    if "x-gzip" in result and "gzip" not in result:
+        result["gzip"] = result["x-gzip"]
+    return result
+
+
+def choose_encoding(accepted: dict, available) -> Optional[str]:
+    """在 available（按服务端偏好排序）中选出客户端 q 值最高的编码，没有可用编码时返回 None。"""
+    best, best_q = None, 0.0
+    wildcard = accepted.get("*", 0.0)
+    for name in available:
+        q = accepted.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    """编码后内容的 ETag：在原 ETag 后附加编码名。"""
+    return etag[:-1] + "-" + encoding + '"'
+
+
+def find_sidecar(real_path: str, st: os.stat_result, accepted: dict) -> Optional[tuple]:
+    """查找客户端可接受的旁路文件，返回 (编码, 路径, stat)。"""
+    found = {}
+    for name, suffix in SIDECARS:
+        if choose_encoding(accepted, [name]) is None:
+            continue
+        sidecar = real_path + suffix
+        try:
+            sst = os.lstat(sidecar)
+        except OSError:
+            continue
+        if stat.S_ISREG(sst.st_mode) and sst.st_mtime_ns >= st.st_mtime_ns:
+            found[name] = (name, sidecar, sst)
+    if not found:
+        return None
+    return found[choose_encoding(accepted, list(found))]
+
+
+class ContentEncoder:
+    """实时压缩配置与压缩结果缓存，线程安全，可在多个服务之间共享。"""
+
+    def __init__(
+        self,
+        gzip_level: int = 6,
+        brotli_quality: int = 5,
+        min_size: int = 1024,
+        max_object_size: int = 4 * 1024 * 1024,
+        max_cached_bytes: int = 32 * 1024 * 1024,
+    ) -> None:
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.min_size = min_size
+        self.max_object_size = max_object_size
+        self.max_cached_bytes = max_cached_bytes
+        self.encodings = ("br", "gzip") if brotli is not None else ("gzip",)
+        self._variants: OrderedDict = OrderedDict()  # (路径, etag, 编码) -> bytes
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def choose(self, request: HTTPRequestHandler, ctype: Optional[str], size: int,
+               accepted: Optional[dict] = None) -> Optional[str]:
+        """判断此响应是否需要压缩，返回所用编码或 None。"""
+        if size < self.min_size or not is_compressible(ctype):
+            return None
+        if accepted is None:
+            accepted = accepted_encodings(request)
+        return choose_encoding(accepted, self.encodings)
+
+    def compress(self, data: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(data, quality=self.brotli_quality)
+        compressor = zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+
+    def compressor(self, encoding: str):
+        """返回流式压缩对象，提供 compress(data) / flush()。"""
+        if encoding == "br":
+            return _BrotliStream(brotli.Compressor(quality=self.brotli_quality))
+        return zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+
+    def get(self, key) -> Optional[bytes]:
+        with self._lock:
+            data = self._variants.get(key)
+            if data is not None:
+                self._variants.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return data
+
+    def put(self, key, data: bytes) -> None:
+        if len(data) > self.max_cached_bytes:
+            return
+        with self._lock:
+            old = self._variants.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._variants[key] = data
+            self._size += len(data)
+            while self._size > self.max_cached_bytes:
+                _, evicted = self._variants.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "encodings": list(self.encodings),
+                "entries": len(self._variants),
+                "bytes": self._size,
+                "max_cached_bytes": self.max_cached_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class _BrotliStream:
+    # 让 brotli.Compressor 与 zlib 压缩对象的接口一致
+    def __init__(self, compressor) -> None:
+        self._compressor = compressor
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+
+def send_encoded_body(
+    request: HTTPRequestHandler,
+    body: bytes,
+    ctype: str,
+    encoder: Optional[ContentEncoder],
+    send_body: bool = True,
+) -> None:
+    """发送内存中生成的 200 响应（目录列表、JSON 等），按需压缩。"""
+    encoding = encoder.choose(request, ctype, len(body)) if encoder is not None else None
+    if encoding is not None:
+        body = encoder.compress(body, encoding)
+    request.send_response(HTTPStatus.OK)
+    request.send_header("Content-Type", ctype)
+    if encoder is not None and is_compressible(ctype):
+        request.send_header("Vary", "Accept-Encoding")
+    if encoding is not None:
+        request.send_header("Content-Encoding", encoding)
+    request.send_header("Content-Length", str(len(body)))
+    request.end_headers()
+    if send_body:
+        request.wfile.write(body)
+
+
+def stream_compressed(stream: BodyStream, f, size: int, compressor) -> None:
+    """从文件（文件对象或描述符）读取 size 字节，流式压缩后写入 stream。"""
+    fd = f if isinstance(f, int) else f.fileno()
+    offset = 0
+    while offset < size:
+        chunk = pread(fd, min(_STREAM_CHUNK, size - offset), offset)
+        if not chunk:
+            break
+        offset += len(chunk)
+        stream.write(compressor.compress(chunk))
+    stream.write(compressor.flush())
+    stream.close()
@@ -0,0 +1,169 @@
+"""已打开文件描述符缓存（类似 nginx 的 open_file_cache）。
+
+热点静态文件保持打开状态，连同 fstat 结果一起缓存，请求时省去 open / fstat / close。
+发送文件全部使用位置读写（sendfile / preadv），不依赖文件读写位置，
+因此多个线程可以同时共享同一个描述符。
+
+    max_entries — 最多缓存的描述符数量，超出时按 LRU 淘汰
+    inactive    — 超过该时间（秒）未被使用的条目被淘汰
+    valid       — 调用方未提供新的 stat 时，每隔该时间（秒）重新 stat 校验一次
+
+条目被淘汰或失效时，仍在使用它的请求不受影响，描述符在最后一个使用者释放后关闭。
+同一个缓存对象可以在多个服务之间共享。
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional
+
+_OPEN_FLAGS = os.O_RDONLY | getattr(os, "O_BINARY", 0)
+
+
+def same_file(a: os.stat_result, b: os.stat_result) -> bool:
+    """两次 stat 是否指向同一个、内容未变化的文件。"""
+    return (a.st_dev == b.st_dev and a.st_ino == b.st_ino
+            and a.st_size == b.st_size and a.st_mtime_ns == b.st_mtime_ns)
+
+
+class CachedFile:
+    __slots__ = ("fd", "stat", "refs", "last_used", "validated", "stale")
+
+    def __init__(self, fd: int, st: os.stat_result, now: float) -> None:
+        self.fd = fd
+        self.stat = st
+        self.refs = 0
+        self.last_used = now
+        self.validated = now
+        self.stale = False
+
+
+class OpenFileCache:
+    """线程安全的已打开文件缓存。"""
+
+    def __init__(self, max_entries: int = 1000, inactive: float = 60.0, valid: float = 10.0) -> None:
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be a positive integer, got {max_entries}.")
+        self.max_entries = max_entries
+        self.inactive = inactive
+        self.valid = valid
+        self._entries: OrderedDict = OrderedDict()  # real_path -> CachedFile
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def acquire(self, real_path: str, st: Optional[os.stat_result] = None) -> CachedFile:
+        """取得 real_path 的缓存条目（引用计数加一），使用完毕后必须调用 release。
+
+        st 为调用方刚取得的 stat 结果，提供时直接用它校验缓存条目，不再额外 stat。
+        文件不存在时抛出 OSError。
+        """
+        now = time.monotonic()
+        if st is None:
+            with self._lock:
+                entry = self._entries.get(real_path)
+                due = entry is not None and now - entry.validated >= self.valid
+            if due:
+                try:
+                    st = os.stat(real_path)
+                except OSError:
+                    with self._lock:
+                        self._discard(real_path)
+                    raise
+        with self._lock:
+            entry = self._entries.get(real_path)
+            if entry is not None:
+                if st is not None and not same_file(entry.stat, st):
+                    self._discard(real_path)
+                else:
+                    if st is not None:
+                        entry.validated = now
+                    entry.refs += 1
+                    entry.last_used = now
+                    self._entries.move_to_end(real_path)
+                    self.hits += 1
+                    return entry
+            self.misses += 1
+
+        fd = os.open(real_path, _OPEN_FLAGS)
+        try:
+            fst = os.fstat(fd)
+        except OSError:
+            os.close(fd)
+            raise
+        with self._lock:
+            existing = self._entries.get(real_path)
+            if existing is not None:
+                if same_file(existing.stat, fst):
+                    # 其它线程已抢先打开了同一个文件
+                    os.close(fd)
+                    existing.refs += 1
+                    existing.last_used = now
+                    return existing
+                self._discard(real_path)
+            entry = CachedFile(fd, fst, now)
+            entry.refs = 1
+            self._entries[real_path] = entry
+            self._evict(now)
+            return entry
+
+    def release(self, entry: CachedFile) -> None:
+        with self._lock:
+            entry.refs -= 1
+            if entry.refs == 0 and entry.stale:
+                os.close(entry.fd)
+
+    def _discard(self, real_path: str) -> None:
+        # 调用方需持有锁
+        entry = self._entries.pop(real_path, None)
+        if entry is None:
+            return
+        self.evictions += 1
+        if entry.refs == 0:
+            os.close(entry.fd)
+        else:
+            entry.stale = True
+
+    def _evict(self, now: float) -> None:
+        # 调用方需持有锁；先淘汰超出数量的最久未用条目，再淘汰长时间未使用的条目
+        while len(self._entries) > self.max_entries:
+            self._discard(next(iter(self._entries)))
+        while self._entries:
+            path, entry = next(iter(self._entries.items()))
+            if now - entry.last_used < self.inactive:
+                break
+            self._discard(path)
+
+    def clear(self) -> None:
+        """关闭所有未在使用的描述符，正在使用的在释放后关闭。"""
+        with self._lock:
+            for path in list(self._entries):
+                self._discard(path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+@contextmanager
+def open_file(cache: Optional[OpenFileCache], real_path: str, st: Optional[os.stat_result] = None):
+    """打开文件供发送使用：有缓存时返回共享的描述符（int），否则返回新打开的文件对象。"""
+    if cache is None:
+        with open(real_path, "rb") as f:
+            yield f
+        return
+    entry = cache.acquire(real_path, st)
+    try:
+        yield entry.fd
+    finally:
+        cache.release(entry)
@@ -2,11 +2,14 @@
 from __future__ import annotations
 
 import os
+import stat
 import json
 import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 from http import HTTPStatus
 
+from .encoding import ContentEncoder, send_encoded_body
+
 if TYPE_CHECKING:
     from ...Handler import HTTPRequestHandler
 
@@ -15,6 +18,8 @@ def handle_info(
     request: HTTPRequestHandler,
     real_path: str,
     expose_details: bool = True,
+    st: Optional[os.stat_result] = None,
+    encoder: Optional[ContentEncoder] = None,
 ) -> None:
     """处理 ?info 查询参数，返回文件/目录的详细信息 JSON。
 
@@ -23,12 +28,17 @@ def handle_info(
         real_path: 目标文件/目录的绝对路径。
         expose_details: Issue 11 — 是否在响应中包含 permissions 和 is_symlink 字段。
                         默认为 True（保持原有行为），可在敏感环境中设为 False。
+        st: 调用方已取得的 stat 结果，未提供时自行 stat。
+        encoder: 可选的实时压缩配置，提供时按 Accept-Encoding 压缩 JSON。
     """
-    try:
-        st = os.stat(real_path)
-    except OSError:
-        request.errsvc.handle(request, [], {}, "GET", HTTPStatus.NOT_FOUND)
-        return
+    if st is None:
+        try:
+            st = os.stat(real_path)
+        except OSError:
+            request.errsvc.handle(request, [], {}, "GET", HTTPStatus.NOT_FOUND)
+            return
+    is_dir = stat.S_ISDIR(st.st_mode)
+    is_file = stat.S_ISREG(st.st_mode)
 
     info: dict = {
         "name": os.path.basename(real_path),
@@ -40,8 +50,8 @@ def handle_info(
         "created": datetime.datetime.fromtimestamp(
             getattr(st, "st_ctime", st.st_mtime), tz=datetime.timezone.utc
         ).isoformat(),
-        "is_dir": os.path.isdir(real_path),
-        "is_file": os.path.isfile(real_path),
+        "is_dir": is_dir,
+        "is_file": is_file,
     }
 
     # Issue 11: conditionally include sensitive fields
@@ -49,7 +59,7 @@ def handle_info(
         info["is_symlink"] = os.path.islink(real_path)
         info["permissions"] = oct(st.st_mode & 0o777)
 
-    if os.path.isdir(real_path):
+    if is_dir:
         try:
             entries = os.listdir(real_path)
             info["item_count"] = len(entries)
@@ -58,9 +68,12 @@ def handle_info(
         except PermissionError:
             info["item_count"] = -1
 
-    info["mime_type"] = request.guess_type(request.path) if os.path.isfile(real_path) else None
+    info["mime_type"] = request.guess_type(request.path) if is_file else None
 
     body = json.dumps(info, ensure_ascii=False).encode()
+    if encoder is not None:
+        send_encoded_body(request, body, "application/json; charset=utf-8", encoder)
+        return
     request.send_response(HTTPStatus.OK)
     request.send_header("Content-Type", "application/json; charset=utf-8")
     request.send_header("Content-Length", str(len(body)))
@@ -0,0 +1,103 @@
+"""目录列表缓存：用 os.scandir 构建列表，按目录 st_mtime_ns 校验，LRU 淘汰。
+
+缓存的是已序列化、已编码的页面脚本片段（子目录与文件的 JSON 数组），
+命中时一次 stat 即可直接发送，无需重新遍历和排序。
+
+目录中增删条目会更新目录自身的 mtime；只修改已有文件的内容不会，
+但列表只包含名称，不受影响。
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from .resumable import is_hidden
+
+
+def _html_safe_json(obj) -> str:
+    """将对象序列化为 JSON 字符串，并将 <、>、/、& 替换为 Unicode 转义，
+    避免在 HTML <script> 块中被浏览器解析为标签或提前结束脚本。"""
+    raw = json.dumps(obj, ensure_ascii=True)
+    return re.sub(r'[<>/&]', lambda m: f'\\u{ord(m.group()):04x}', raw)
+
+
+def scan_directory(real_path: str) -> tuple[list, list]:
+    """返回排序后的 (子目录, 文件) 名称列表。
+
+    DirEntry.is_dir() 使用 readdir 返回的 d_type，普通条目无需额外 stat；
+    符号链接仍会跟随（与 os.path.isdir 相同）。上传过程中的隐藏文件不列出。
+    """
+    dirs, files = [], []
+    with os.scandir(real_path) as it:
+        for entry in it:
+            if is_hidden(entry.name):
+                continue
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            (dirs if is_dir else files).append(entry.name)
+    dirs.sort()
+    files.sort()
+    return dirs, files
+
+
+def render_listing(real_path: str, allow_upload: bool) -> bytes:
+    """生成目录列表页面的脚本变量片段。"""
+    dirs, files = scan_directory(real_path)
+    # Issue 1: use HTML-safe JSON to prevent </script> injection in <script> block
+    return (
+        f"let subfolders={_html_safe_json(dirs)};"
+        f"let files={_html_safe_json(files)};"
+        f"let allowUpload={int(allow_upload)};"
+    ).encode()
+
+
+class DirectoryListingCache:
+    """有界 LRU 目录列表缓存，线程安全。max_entries 为 0 时不缓存。"""
+
+    def __init__(self, max_entries: int = 128) -> None:
+        if max_entries < 0:
+            raise ValueError(f"max_entries must not be negative, got {max_entries}.")
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # real_path -> (allow_upload, mtime_ns, 片段)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, real_path: str, allow_upload: bool) -> bytes:
+        """返回目录的列表片段，缓存未命中或目录已变化时重新扫描。"""
+        if self.max_entries == 0:
+            return render_listing(real_path, allow_upload)
+        mtime_ns = os.stat(real_path).st_mtime_ns
+        with self._lock:
+            cached: Optional[tuple] = self._entries.get(real_path)
+            if cached is not None and cached[0] == allow_upload and cached[1] == mtime_ns:
+                self._entries.move_to_end(real_path)
+                self.hits += 1
+                return cached[2]
+            self.misses += 1
+        fragment = render_listing(real_path, allow_upload)
+        with self._lock:
+            self._entries[real_path] = (allow_upload, mtime_ns, fragment)
+            self._entries.move_to_end(real_path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return fragment
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
@@ -0,0 +1,120 @@
+"""小文件内存缓存：直接从内存发送文件内容、预先生成的响应头和 ETag。
+
+    max_bytes       — 全局内存预算（所有缓存内容的总字节数）
+    max_object_size — 只缓存不超过该大小的文件
+    policy          — 超出预算时的淘汰策略：
+                      "lru" 淘汰最久未使用的条目；
+                      "lfu" 在最久未使用的若干条目中淘汰命中次数最少的（近似 LFU，开销固定）
+
+每次请求用路径解析时得到的 stat 结果校验（st_dev、st_ino、st_size、st_mtime_ns），
+文件变化后条目立即失效。同一个缓存对象可以在多个服务之间共享。
+"""
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from .fdcache import same_file
+
+# 缓存策略
+CACHE_POLICIES = ("lru", "lfu")
+# lfu 策略每次淘汰时比较的候选条目数
+_LFU_SAMPLES = 16
+
+
+class CachedObject:
+    __slots__ = ("stat", "body", "headers", "hits")
+
+    def __init__(self, st: os.stat_result, body: bytes, headers: bytes) -> None:
+        self.stat = st
+        self.body = body
+        self.headers = headers  # 已编码的响应头（不含状态行、Date、Server）
+        self.hits = 0
+
+
+class HotObjectCache:
+    """线程安全的小文件内存缓存。"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_object_size: int = 256 * 1024, policy: str = "lru") -> None:
+        if policy not in CACHE_POLICIES:
+            raise ValueError(f"Cache policy {policy} is not valid. \nAvailable policies: {', '.join(CACHE_POLICIES)}")
+        if max_bytes < 1 or max_object_size < 1:
+            raise ValueError("max_bytes and max_object_size must be positive integers.")
+        self.max_bytes = max_bytes
+        self.max_object_size = min(max_object_size, max_bytes)
+        self.policy = policy
+        self._entries: OrderedDict = OrderedDict()  # key -> CachedObject
+        self._lock = threading.Lock()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def cacheable(self, st: os.stat_result) -> bool:
+        return st.st_size <= self.max_object_size
+
+    def get(self, key, st: os.stat_result) -> Optional[CachedObject]:
+        """返回与 st 一致的缓存条目，不存在或文件已变化时返回 None。"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if same_file(entry.stat, st):
+                    entry.hits += 1
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+                self._remove(key)
+            self.misses += 1
+            return None
+
+    def put(self, key, st: os.stat_result, body: bytes, headers: bytes) -> CachedObject:
+        entry = CachedObject(st, body, headers)
+        if len(body) > self.max_object_size:
+            return entry
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                self._remove(self._victim(), evicted=True)
+        return entry
+
+    def _victim(self):
+        # 调用方需持有锁
+        if self.policy == "lru":
+            return next(iter(self._entries))
+        victim, fewest = None, None
+        for i, (key, entry) in enumerate(self._entries.items()):
+            if i >= _LFU_SAMPLES:
+                break
+            if fewest is None or entry.hits < fewest:
+                victim, fewest = key, entry.hits
+        return victim
+
+    def _remove(self, key, evicted: bool = False) -> None:
+        # 调用方需持有锁
+        entry = self._entries.pop(key)
+        self._size -= len(entry.body)
+        if evicted:
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "max_object_size": self.max_object_size,
+                "policy": self.policy,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,187 @@
+"""PUT 上传：原始请求体直接流式写入磁盘（curl -T、CI 产物推送等脚本客户端）。
+
+请求体写入目标目录中的隐藏临时文件（.cryskura-<随机>.put），完整接收后以不覆盖的方式
+原子地改名为目标文件；目标已存在时返回 409，与 multipart 上传的检查一致。
+支持 Content-Length 与 Transfer-Encoding: chunked。
+
+    preallocate — 已知长度时用 posix_fallocate 预分配空间（平台不支持时忽略）
+    fsync       — 落盘策略："none" 不调用 fsync；"file" 改名前 fsync 文件；
+                  "full" 另外 fsync 所在目录，保证改名本身持久化
+"""
+from __future__ import annotations
+
+import logging
+import os
+import secrets
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import quote
+
+from .resumable import PARTIAL_PREFIX, is_hidden, place_file
+
+if TYPE_CHECKING:
+    from ...Handler import HTTPRequestHandler
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("none", "file", "full")
+# 接收缓冲区大小
+_BUFFER_SIZE = 1024 * 1024
+# chunked 编码中单行（块大小、trailer）的最大长度
+_MAX_LINE = 8 * 1024
+
+
+class _TooLarge(Exception):
+    pass
+
+
+def _read_into(rfile, view: memoryview) -> int:
+    readinto = getattr(rfile, "readinto", None)
+    if readinto is not None:
+        return readinto(view)
+    chunk = rfile.read(len(view))
+    view[:len(chunk)] = chunk
+    return len(chunk)
+
+
+def _copy_exact(rfile, f, view: memoryview, count: int) -> int:
+    """从 rfile 读取 count 字节写入 f，返回实际读取的字节数（连接提前结束时偏少）。"""
+    total = 0
+    while count > 0:
+        n = _read_into(rfile, view[:min(len(view), count)])
+        if not n:
+            break
+        f.write(view[:n])
+        total += n
+        count -= n
+    return total
+
+
+def _copy_chunked(rfile, f, view: memoryview, limit: int) -> int:
+    """解码 chunked 请求体写入 f，返回总字节数。"""
+    total = 0
+    while True:
+        line = rfile.readline(_MAX_LINE + 1)
+        if len(line) > _MAX_LINE or not line.endswith(b"\n"):
+            raise ValueError("Invalid chunk size line")
+        try:
+            size = int(line.split(b";", 1)[0].strip(), 16)
+        except ValueError:
+            raise ValueError("Invalid chunk size line") from None
+        if size < 0:
+            raise ValueError("Invalid chunk size line")
+        if size == 0:
+            break
+        if limit > 0 and total + size > limit:
+            raise _TooLarge()
+        if _copy_exact(rfile, f, view, size) < size:
+            raise ConnectionError("Upload stream ended prematurely")
+        total += size
+        if rfile.readline(_MAX_LINE + 1).strip():
+            raise ValueError("Missing CRLF after chunk data")
+    # 忽略 trailer，读到空行为止
+    while True:
+        line = rfile.readline(_MAX_LINE + 1)
+        if not line.strip():
+            break
+        if len(line) > _MAX_LINE:
+            raise ValueError("Trailer line too long")
+    return total
+
+
+def _fsync_dir(directory: str) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # Windows 不能打开目录
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def handle_put(
+    request: HTTPRequestHandler,
+    directory: str,
+    name: str,
+    url_path: str,
+    upload_limit: int,
+    preallocate: bool = True,
+    fsync: str = "none",
+) -> None:
+    """把请求体保存为 directory/name。directory 为已解析的目标目录，url_path 为目标文件的请求路径。"""
+    if not name or name in (".", "..") or "\x00" in name or is_hidden(name):
+        request.errsvc.handle(request, [], {}, "PUT", HTTPStatus.BAD_REQUEST)
+        return
+    target = os.path.join(directory, name)
+    if os.path.lexists(target):
+        request.errsvc.handle(request, [], {}, "PUT", HTTPStatus.CONFLICT)
+        return
+
+    chunked = "chunked" in request.headers.get("Transfer-Encoding", "").lower()
+    length: Optional[int] = None
+    if not chunked:
+        content_length = request.headers.get("Content-Length")
+        if not content_length:
+            request.errsvc.handle(request, [], {}, "PUT", HTTPStatus.LENGTH_REQUIRED)
+            return
+        try:
+            length = int(content_length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            request.errsvc.handle(request, [], {}, "PUT", HTTPStatus.BAD_REQUEST)
+            return
+        if upload_limit > 0 and length > upload_limit:
+            request.errsvc.handle(request, [], {}, "PUT", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            return
+
+    tmp = os.path.join(directory, f"{PARTIAL_PREFIX}{secrets.token_hex(8)}.put")
+    buf = bytearray(_BUFFER_SIZE if length is None else max(1, min(_BUFFER_SIZE, length)))
+    view = memoryview(buf)
+    placed = False
+    try:
+        with open(tmp, "xb") as f:
+            if preallocate and length and hasattr(os, "posix_fallocate"):
+                try:
+                    os.posix_fallocate(f.fileno(), 0, length)
+                except OSError:
+                    pass
+            if chunked:
+                _copy_chunked(request.rfile, f, view, upload_limit)
+            elif _copy_exact(request.rfile, f, view, length) < length:
+                raise ConnectionError("Upload stream ended prematurely")
+            if fsync != "none":
+                f.flush()
+                os.fsync(f.fileno())
+        placed = place_file(tmp, target)
+        if placed and fsync == "full":
+            _fsync_dir(directory)
+    except _TooLarge:
+        # 未读完的请求体无法继续复用连接
+        request.close_connection = True
+        request.errsvc.handle(request, [], {}, "PUT", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+        return
+    except ValueError as e:
+        logger.error("PUT upload error: %s", e)
+        request.close_connection = True
+        request.errsvc.handle(request, [], {}, "PUT", HTTPStatus.BAD_REQUEST)
+        return
+    finally:
+        view.release()
+        if not placed:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+
+    if not placed:
+        request.errsvc.handle(request, [], {}, "PUT", HTTPStatus.CONFLICT)
+        return
+    logger.info("PUT upload completed: %s", target)
+    request.send_response(HTTPStatus.CREATED)
+    request.send_header("Location", quote(url_path))
+    request.send_header("Content-Length", "0")
+    request.end_headers()
@@ -3,9 +3,13 @@ from __future__ import annotations
 
 import os
 import secrets
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Callable, Optional
 from http import HTTPStatus
 
+from .fdcache import OpenFileCache, open_file
+from .transmit import send_file
+from .validators import evaluate_preconditions, make_etag, range_applies, send_precondition_response, send_validators
+
 if TYPE_CHECKING:
     from ...Handler import HTTPRequestHandler
 
@@ -13,64 +17,78 @@ if TYPE_CHECKING:
 _MAX_RANGES = 10
 
 
+def parse_ranges(range_h: list[str], size: int) -> Optional[list[tuple[int, int]]]:
+    """把 Range 头的各段解析为闭区间 [(start, end), ...]，任何一段无效时返回 None。"""
+    ranges: list[tuple[int, int]] = []
+    for r in range_h:
+        try:
+            if '-' in r:
+                start_str, end_str = r.split('-', 1)
+                if start_str == '':
+                    start = max(size - int(end_str), 0)
+                    end = size - 1
+                elif end_str == '':
+                    start = int(start_str)
+                    end = size - 1
+                else:
+                    start = int(start_str)
+                    end = min(int(end_str), size - 1)
+            else:
+                start = int(r)
+                end = size - 1
+        except ValueError:
+            return None
+        if start < 0 or start > end:
+            return None
+        ranges.append((start, end))
+    return ranges
+
+
 def handle_range_request(
     request: HTTPRequestHandler,
     real_path: str,
     args: dict[str, str],
+    st: Optional[os.stat_result] = None,
+    cache: Optional[OpenFileCache] = None,
 ) -> bool:
     """处理 Range 请求头，支持单段和多段范围请求。
 
+    st 为调用方已取得的 stat 结果，未提供时自行 stat；cache 为可选的已打开文件缓存。
+
+    条件请求头在此处检查；If-Range 校验失败时不处理 Range，由调用方发送完整内容。
+
     Returns:
-        True 如果处理了 Range 请求（包括错误），False 如果没有 Range 头。
+        True 如果处理了 Range 请求（包括错误与 304 / 412），False 如果没有 Range 头或 If-Range 不匹配。
     """
     if 'Range' not in request.headers:
         return False
+    if st is None:
+        st = os.stat(real_path)
+    etag = make_etag(st)
+    status = evaluate_preconditions(request, etag, st)
+    if status is not None:
+        send_precondition_response(request, status, etag, st)
+        return True
+    if not range_applies(request, etag, st):
+        return False
 
-    range_header = request.headers["Range"]
-    range_h = range_header.strip("bytes=").split(",")
+    range_h = request.headers["Range"].strip("bytes=").split(",")
 
     # Issue 7: reject requests with too many range segments
     if len(range_h) > _MAX_RANGES:
         request.errsvc.handle(request, [], args, "GET", HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
         return True
 
-    file_size = os.path.getsize(real_path)
-    ranges: list[tuple[int, int]] = []
-
-    for r in range_h:
-        if '-' in r:
-            start_str, end_str = r.split('-', 1)
-            try:
-                if start_str == '':
-                    end = int(end_str)
-                    start = max(file_size - end, 0)
-                    end = file_size - 1
-                elif end_str == '':
-                    start = int(start_str)
-                    end = file_size - 1
-                else:
-                    start = int(start_str)
-                    end = min(int(end_str), file_size - 1)
-            except ValueError:
-                request.errsvc.handle(request, [], args, "GET", HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
-                return True
-        else:
-            try:
-                start = int(r)
-            except ValueError:
-                request.errsvc.handle(request, [], args, "GET", HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
-                return True
-            end = file_size - 1
-
-        if start < 0 or start > end:
-            request.errsvc.handle(request, [], args, "GET", HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
-            return True
-        ranges.append((start, end))
+    file_size = st.st_size
+    ranges = parse_ranges(range_h, file_size)
+    if ranges is None:
+        request.errsvc.handle(request, [], args, "GET", HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+        return True
 
     if len(ranges) == 1:
-        _send_single_range(request, real_path, ranges[0], file_size)
+        _send_single_range(request, real_path, ranges[0], file_size, st, cache, etag)
     else:
-        _send_multi_range(request, real_path, ranges, file_size)
+        _send_multi_range(request, real_path, ranges, file_size, st, cache, etag)
 
     return True
 
@@ -80,23 +98,24 @@ def _send_single_range(
     real_path: str,
     range_tuple: tuple[int, int],
     file_size: int,
+    st: Optional[os.stat_result] = None,
+    cache: Optional[OpenFileCache] = None,
+    etag: Optional[str] = None,
 ) -> None:
     """发送单段 Range 响应 (206 Partial Content)。"""
     start, end = range_tuple
     length = end - start + 1
-    request.send_response(HTTPStatus.PARTIAL_CONTENT)
-    request.send_header("Content-Range", f"bytes {start}-{end}/{file_size}")
-    request.send_header("Content-Length", str(length))
-    request.send_header("Accept-Ranges", "bytes")
-    request.send_header("Content-Type", request.guess_type(request.path))
-    request.end_headers()
-    with open(real_path, 'rb') as f:
-        f.seek(start)
-        remaining = length
-        while remaining > 0:
-            chunk = f.read(min(8192, remaining))
-            request.wfile.write(chunk)
-            remaining -= len(chunk)
+    # 先打开文件再发送头部，打开失败时仍可返回错误页面
+    with open_file(cache, real_path, st) as f:
+        request.send_response(HTTPStatus.PARTIAL_CONTENT)
+        request.send_header("Content-Range", f"bytes {start}-{end}/{file_size}")
+        request.send_header("Content-Length", str(length))
+        request.send_header("Accept-Ranges", "bytes")
+        request.send_header("Content-Type", request.guess_type(request.path))
+        if etag is not None:
+            send_validators(request, etag, st)
+        request.end_headers()
+        send_file(request, f, start, length)
 
 
 def _send_multi_range(
@@ -104,25 +123,82 @@ def _send_multi_range(
     real_path: str,
     ranges: list[tuple[int, int]],
     file_size: int,
+    st: Optional[os.stat_result] = None,
+    cache: Optional[OpenFileCache] = None,
+    etag: Optional[str] = None,
 ) -> None:
     """发送多段 Range 响应 (multipart/byteranges)。"""
     # Issue 14: use secrets for an unpredictable boundary
     boundary = "CRYSKURA_BOUNDARY_" + secrets.token_hex(8)
-    request.send_response(HTTPStatus.PARTIAL_CONTENT)
-    request.send_header("Content-Type", f"multipart/byteranges; boundary={boundary}")
-    request.end_headers()
-    with open(real_path, 'rb') as f:
-        for start, end in ranges:
-            length = end - start + 1
-            request.wfile.write(f"--{boundary}\r\n".encode())
-            request.wfile.write(f"Content-Type: {request.guess_type(request.path)}\r\n".encode())
-            request.wfile.write(f"Content-Range: bytes {start}-{end}/{file_size}\r\n".encode())
-            request.wfile.write(b"\r\n")
-            f.seek(start)
-            remaining = length
-            while remaining > 0:
-                chunk = f.read(min(8192, remaining))
-                request.wfile.write(chunk)
-                remaining -= len(chunk)
+    ctype = request.guess_type(request.path)
+    # 各段的分隔行与段头预先生成，以便计算 Content-Length
+    heads = [
+        f"--{boundary}\r\nContent-Type: {ctype}\r\nContent-Range: bytes {start}-{end}/{file_size}\r\n\r\n".encode()
+        for start, end in ranges
+    ]
+    tail = f"--{boundary}--\r\n".encode()
+    length = sum(len(head) + end - start + 1 + 2 for head, (start, end) in zip(heads, ranges)) + len(tail)
+    with open_file(cache, real_path, st) as f:
+        request.send_response(HTTPStatus.PARTIAL_CONTENT)
+        request.send_header("Content-Type", f"multipart/byteranges; boundary={boundary}")
+        request.send_header("Content-Length", str(length))
+        if etag is not None:
+            send_validators(request, etag, st)
+        request.end_headers()
+        for head, (start, end) in zip(heads, ranges):
+            request.wfile.write(head)
+            send_file(request, f, start, end - start + 1)
             request.wfile.write(b"\r\n")
-    request.wfile.write(f"--{boundary}--\r\n".encode())
+    request.wfile.write(tail)
+
+
+def send_entity(
+    request: HTTPRequestHandler,
+    size: int,
+    etag: str,
+    st: os.stat_result,
+    headers: tuple,
+    send_range: Callable[[int, int], None],
+) -> None:
+    """发送大小已知的生成内容（归档等）：处理条件请求与单段 Range，多段 Range 按完整内容发送。
+
+    st 只用于 Last-Modified 与日期类条件请求；send_range(start, end) 负责写出 [start, end] 闭区间的字节。
+    发送内容时的 OSError 由调用方处理，此时响应头已发出，通常只能调用 abort_connection。
+    """
+    status = evaluate_preconditions(request, etag, st)
+    if status is not None:
+        send_precondition_response(request, status, etag, st)
+        return
+    start, end = 0, size - 1
+    partial = False
+    if "Range" in request.headers and range_applies(request, etag, st):
+        ranges = parse_ranges(request.headers["Range"].strip("bytes=").split(","), size)
+        if ranges is None:
+            request.errsvc.handle(request, [], {}, "GET", HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            return
+        if len(ranges) == 1:
+            (start, end), partial = ranges[0], True
+
+    if partial:
+        request.send_response(HTTPStatus.PARTIAL_CONTENT)
+        request.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+    else:
+        request.send_response(HTTPStatus.OK)
+    for keyword, value in headers:
+        request.send_header(keyword, value)
+    request.send_header("Content-Length", str(end - start + 1))
+    request.send_header("Accept-Ranges", "bytes")
+    send_validators(request, etag, st)
+    request.end_headers()
+    if request.command != "HEAD" and size:
+        send_range(start, end)
+    request.wfile.flush()
+
+
+def abort_connection(request: HTTPRequestHandler) -> None:
+    """响应头已发出后无法完成响应时，关闭连接。"""
+    request.close_connection = True
+    try:
+        request.connection.close()
+    except OSError:
+        pass
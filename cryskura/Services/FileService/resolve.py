@@ -0,0 +1,133 @@
+"""路径解析缓存：把请求路径解析为一条记录（真实路径、stat 结果、类型、是否位于根目录内）。
+
+未命中时执行 realpath 与包含关系检查；命中时只做一次 stat，
+并用 (st_dev, st_ino) 与缓存时的结果比对：路径中某一级被替换（例如换成指向
+根目录外的符号链接）时文件身份随之改变，记录会被丢弃并重新解析。
+记录另有存活时间（TTL）与条目数上限。
+
+同一请求中 handle_GET / handle_HEAD / ?info / Range 共用这一次 stat 的结果。
+"""
+from __future__ import annotations
+
+import os
+import stat as stat_module
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+
+class ResolvedPath(NamedTuple):
+    real_path: str
+    stat: Optional[os.stat_result]  # 路径不存在时为 None
+    kind: Optional[str]             # "file" / "dir" / "other"，无效路径为 None
+    valid: bool                     # 存在且位于根目录内
+
+    @property
+    def is_file(self) -> bool:
+        return self.kind == "file"
+
+    @property
+    def is_dir(self) -> bool:
+        return self.kind == "dir"
+
+
+def _kind(st: os.stat_result) -> str:
+    if stat_module.S_ISREG(st.st_mode):
+        return "file"
+    if stat_module.S_ISDIR(st.st_mode):
+        return "dir"
+    return "other"
+
+
+def _contained(real_path: str, root: str) -> bool:
+    real_path = os.path.normcase(real_path)
+    root = os.path.normcase(root)
+    if real_path == root:
+        return True
+    if not root.endswith(os.sep):
+        root += os.sep
+    return real_path.startswith(root)
+
+
+class PathResolver:
+    """按服务实例使用的路径解析缓存，线程安全。max_entries 为 0 时不缓存。"""
+
+    def __init__(self, root: str, ttl: float = 2.0, max_entries: int = 4096) -> None:
+        if max_entries < 0:
+            raise ValueError(f"max_entries must not be negative, got {max_entries}.")
+        self.root = root
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (过期时间, real_path, valid, st_dev, st_ino)
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def resolve(self, target: str, key=None) -> ResolvedPath:
+        """解析 target（未经 realpath 的本地路径）。key 为缓存键，默认使用 target。"""
+        if key is None:
+            key = target
+        if self.max_entries:
+            now = time.monotonic()
+            with self._lock:
+                cached = self._entries.get(key)
+                if cached is not None and cached[0] > now:
+                    self._entries.move_to_end(key)
+                else:
+                    cached = None
+            if cached is not None:
+                _, real_path, valid, dev, ino = cached
+                if not valid:
+                    with self._lock:
+                        self.hits += 1
+                    return ResolvedPath(real_path, None, None, False)
+                try:
+                    st = os.stat(real_path)
+                except OSError:
+                    st = None
+                if st is not None and st.st_dev == dev and st.st_ino == ino:
+                    with self._lock:
+                        self.hits += 1
+                    return ResolvedPath(real_path, st, _kind(st), True)
+        result = self._resolve(target)
+        if self.max_entries and result.stat is not None:
+            # 不存在的路径不缓存，文件随时可能被创建
+            entry = (time.monotonic() + self.ttl, result.real_path, result.valid,
+                     result.stat.st_dev, result.stat.st_ino)
+            with self._lock:
+                self.misses += 1
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        else:
+            with self._lock:
+                self.misses += 1
+        return result
+
+    def _resolve(self, target: str) -> ResolvedPath:
+        real_path = os.path.realpath(target)
+        try:
+            st = os.stat(real_path)
+        except OSError:
+            return ResolvedPath(real_path, None, None, False)
+        if not _contained(real_path, os.path.realpath(self.root)):
+            # 保留 stat，以便缓存“位于根目录外”的结论
+            return ResolvedPath(real_path, st, None, False)
+        return ResolvedPath(real_path, st, _kind(st), True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
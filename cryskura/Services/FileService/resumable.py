@@ -0,0 +1,290 @@
+"""可续传上传（兼容 tus 1.0 核心协议的偏移量上传）。
+
+    POST  <目录>/?upload        创建上传：Upload-Length 为总大小，
+                                Upload-Metadata 中的 filename（base64）为文件名；
+                                返回 201，Location 为上传地址 <目录>/?upload=<id>
+    PATCH <目录>/?upload=<id>   追加数据：Upload-Offset 必须等于当前偏移量，
+                                Content-Type 为 application/offset+octet-stream；返回 204 与新的 Upload-Offset
+    HEAD  <目录>/?upload=<id>   查询当前偏移量（Upload-Offset / Upload-Length）
+
+未完成的数据写入目标目录中的隐藏文件 .cryskura-<id>.part，偏移量即该文件的大小，
+连接中断时已写入的部分保留，客户端 HEAD 查询后从该偏移量继续。全部数据到齐后以
+不覆盖的方式原子地改名为目标文件。上传记录保存在根目录的 .cryskura-uploads 中，
+超过有效期未完成的上传会被清理。以 .cryskura- 开头的文件不会出现在目录列表、
+下载和归档中。
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import logging
+import os
+import secrets
+import threading
+import time
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import quote
+
+if TYPE_CHECKING:
+    from ...Handler import HTTPRequestHandler
+
+logger = logging.getLogger(__name__)
+
+# 隐藏文件前缀：未完成的上传与上传记录
+PARTIAL_PREFIX = ".cryskura-"
+_RECORD_DIR = PARTIAL_PREFIX + "uploads"
+_TUS_VERSION = "1.0.0"
+_OFFSET_TYPE = "application/offset+octet-stream"
+# 接收缓冲区大小
+_BUFFER_SIZE = 1024 * 1024
+# 两次清理过期上传之间的最短间隔（秒）
+_SWEEP_INTERVAL = 60
+
+
+def is_hidden(name: str) -> bool:
+    """是否为上传过程中使用的隐藏文件。"""
+    return name.startswith(PARTIAL_PREFIX)
+
+
+def place_file(src: str, target: str) -> bool:
+    """把已写完的临时文件原子地改名为 target，不覆盖已有文件；target 已存在时返回 False。"""
+    try:
+        os.link(src, target)
+    except FileExistsError:
+        return False
+    except (OSError, AttributeError, NotImplementedError):
+        # 不支持硬链接的平台或文件系统：改用 rename（仍先检查目标是否存在）
+        if os.path.lexists(target):
+            return False
+        os.rename(src, target)
+    else:
+        os.unlink(src)
+    return True
+
+
+def _parse_metadata(header: str) -> dict:
+    # Upload-Metadata: key base64value, key2 base64value2
+    result = {}
+    for item in header.split(","):
+        key, _, value = item.strip().partition(" ")
+        if not key:
+            continue
+        try:
+            result[key] = base64.b64decode(value.strip(), validate=True).decode("utf-8")
+        except (binascii.Error, UnicodeDecodeError):
+            continue
+    return result
+
+
+class ResumableUploads:
+    """管理一个 FileService 下所有可续传上传的记录，线程安全。"""
+
+    def __init__(self, root: str, expiry: float = 24 * 3600) -> None:
+        self.root = root
+        self.expiry = expiry
+        self.record_dir = os.path.join(root, _RECORD_DIR)
+        self._active: set = set()  # 正在写入数据的上传
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+
+    # ── 记录 ──
+
+    def _record_path(self, upload_id: str) -> str:
+        return os.path.join(self.record_dir, upload_id + ".json")
+
+    @staticmethod
+    def _partial_path(directory: str, upload_id: str) -> str:
+        return os.path.join(directory, f"{PARTIAL_PREFIX}{upload_id}.part")
+
+    def _load(self, upload_id: str) -> Optional[dict]:
+        if not upload_id.isalnum():
+            return None
+        try:
+            with open(self._record_path(upload_id), "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get("expires", 0) < time.time():
+            self._remove(upload_id, record)
+            return None
+        return record
+
+    def _remove(self, upload_id: str, record: Optional[dict]) -> None:
+        paths = [self._record_path(upload_id)]
+        if record is not None:
+            paths.append(self._partial_path(record["dir"], upload_id))
+        for path in paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    def sweep(self) -> None:
+        """清理过期的上传。"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < _SWEEP_INTERVAL:
+                return
+            self._last_sweep = now
+        try:
+            names = os.listdir(self.record_dir)
+        except OSError:
+            return
+        for name in names:
+            upload_id, ext = os.path.splitext(name)
+            if ext == ".json" and upload_id not in self._active:
+                self._load(upload_id)  # 过期记录在读取时删除
+
+    def _headers(self, request: HTTPRequestHandler, offset: int, length: int) -> None:
+        request.send_header("Tus-Resumable", _TUS_VERSION)
+        request.send_header("Upload-Offset", str(offset))
+        request.send_header("Upload-Length", str(length))
+        request.send_header("Cache-Control", "no-store")
+
+    # ── 协议 ──
+
+    def create(self, request: HTTPRequestHandler, directory: str, url_path: str, upload_limit: int) -> None:
+        """POST：创建上传。directory 为已解析的目标目录，url_path 为该目录的请求路径。"""
+        self.sweep()
+        try:
+            length = int(request.headers.get("Upload-Length", ""))
+        except ValueError:
+            length = -1
+        if length < 0:
+            request.errsvc.handle(request, [], {}, "POST", HTTPStatus.BAD_REQUEST)
+            return
+        if upload_limit > 0 and length > upload_limit:
+            request.errsvc.handle(request, [], {}, "POST", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            return
+        name = _parse_metadata(request.headers.get("Upload-Metadata", "")).get("filename", "")
+        name = os.path.basename(name)
+        if not name or name in (".", "..") or "\x00" in name or is_hidden(name):
+            request.errsvc.handle(request, [], {}, "POST", HTTPStatus.BAD_REQUEST)
+            return
+        if os.path.lexists(os.path.join(directory, name)):
+            request.errsvc.handle(request, [], {}, "POST", HTTPStatus.CONFLICT)
+            return
+
+        upload_id = secrets.token_hex(16)
+        record = {"name": name, "dir": directory, "length": length, "expires": time.time() + self.expiry}
+        os.makedirs(self.record_dir, exist_ok=True)
+        with open(self._partial_path(directory, upload_id), "xb"):
+            pass
+        with open(self._record_path(upload_id), "x", encoding="utf-8") as f:
+            json.dump(record, f)
+
+        location = url_path.rstrip("/") + "/?upload=" + upload_id
+        request.send_response(HTTPStatus.CREATED)
+        request.send_header("Location", quote(location, safe="/?="))
+        self._headers(request, 0, length)
+        request.send_header("Content-Length", "0")
+        request.end_headers()
+        if length == 0:
+            self._finish(upload_id, record)
+
+    def _lookup(self, request: HTTPRequestHandler, directory: str, upload_id: str) -> Optional[dict]:
+        record = self._load(upload_id)
+        # 上传地址与目录绑定，身份验证按目录路径进行
+        if record is None or os.path.normcase(record["dir"]) != os.path.normcase(directory):
+            request.errsvc.handle(request, [], {}, request.command, HTTPStatus.NOT_FOUND)
+            return None
+        return record
+
+    def head(self, request: HTTPRequestHandler, directory: str, upload_id: str) -> None:
+        """HEAD：查询当前偏移量。"""
+        record = self._lookup(request, directory, upload_id)
+        if record is None:
+            return
+        try:
+            offset = os.stat(self._partial_path(directory, upload_id)).st_size
+        except OSError:
+            request.errsvc.handle(request, [], {}, "HEAD", HTTPStatus.NOT_FOUND)
+            return
+        request.send_response(HTTPStatus.OK)
+        self._headers(request, offset, record["length"])
+        request.end_headers()
+
+    def patch(self, request: HTTPRequestHandler, directory: str, upload_id: str) -> None:
+        """PATCH：从 Upload-Offset 处追加请求体。"""
+        record = self._lookup(request, directory, upload_id)
+        if record is None:
+            return
+        if request.headers.get("Content-Type", "").split(";")[0].strip() != _OFFSET_TYPE:
+            request.errsvc.handle(request, [], {}, "PATCH", HTTPStatus.UNSUPPORTED_MEDIA_TYPE)
+            return
+        try:
+            offset = int(request.headers.get("Upload-Offset", ""))
+            count = int(request.headers.get("Content-Length", ""))
+        except ValueError:
+            request.errsvc.handle(request, [], {}, "PATCH", HTTPStatus.BAD_REQUEST)
+            return
+        if count < 0 or offset + count > record["length"]:
+            request.errsvc.handle(request, [], {}, "PATCH", HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+            return
+        with self._lock:
+            if upload_id in self._active:
+                # 同一上传同时只允许一个 PATCH
+                request.errsvc.handle(request, [], {}, "PATCH", HTTPStatus.LOCKED)
+                return
+            self._active.add(upload_id)
+        try:
+            partial = self._partial_path(directory, upload_id)
+            try:
+                current = os.stat(partial).st_size
+            except OSError:
+                request.errsvc.handle(request, [], {}, "PATCH", HTTPStatus.NOT_FOUND)
+                return
+            if offset != current:
+                request.errsvc.handle(request, [], {}, "PATCH", HTTPStatus.CONFLICT)
+                return
+            offset = self._receive(request, partial, offset, count)
+            if offset == record["length"] and not self._finish(upload_id, record):
+                request.errsvc.handle(request, [], {}, "PATCH", HTTPStatus.CONFLICT)
+                return
+        finally:
+            with self._lock:
+                self._active.discard(upload_id)
+        request.send_response(HTTPStatus.NO_CONTENT)
+        self._headers(request, offset, record["length"])
+        request.end_headers()
+
+    @staticmethod
+    def _receive(request: HTTPRequestHandler, partial: str, offset: int, count: int) -> int:
+        # 连接中断时已写入的数据保留，异常继续向上抛出
+        buf = bytearray(min(_BUFFER_SIZE, max(count, 1)))
+        view = memoryview(buf)
+        readinto = getattr(request.rfile, "readinto", None)
+        with open(partial, "r+b") as f:
+            f.seek(offset)
+            try:
+                while count > 0:
+                    want = min(len(buf), count)
+                    if readinto is not None:
+                        n = readinto(view[:want])
+                    else:
+                        chunk = request.rfile.read(want)
+                        n = len(chunk)
+                        view[:n] = chunk
+                    if not n:
+                        break
+                    f.write(view[:n])
+                    offset += n
+                    count -= n
+            finally:
+                view.release()
+        return offset
+
+    def _finish(self, upload_id: str, record: dict) -> bool:
+        """全部数据到齐：不覆盖地改名为目标文件。目标已存在时返回 False。"""
+        partial = self._partial_path(record["dir"], upload_id)
+        target = os.path.join(record["dir"], record["name"])
+        if not place_file(partial, target):
+            return False
+        try:
+            os.unlink(self._record_path(upload_id))
+        except OSError:
+            pass
+        logger.info("Resumable upload completed: %s", target)
+        return True
@@ -0,0 +1,184 @@
+"""普通文件响应：条件请求、内容编码、响应头与文件内容。
+
+替代 SimpleHTTPRequestHandler.send_head：直接使用路径解析时得到的 stat 结果，
+不再重复 translate_path / isdir / fstat。
+"""
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, Optional
+from http import HTTPStatus
+
+from .fdcache import OpenFileCache, open_file
+from .encoding import ContentEncoder, accepted_encodings, find_sidecar, is_compressible, stream_compressed, variant_etag
+from .objcache import HotObjectCache
+from .transmit import BodyStream, pread, send_file, start_stream
+from .validators import evaluate_preconditions, make_etag, send_precondition_response
+
+if TYPE_CHECKING:
+    from ...Handler import HTTPRequestHandler
+
+
+def serve_file(
+    request: HTTPRequestHandler,
+    real_path: str,
+    st: os.stat_result,
+    send_body: bool = True,
+    cache: Optional[OpenFileCache] = None,
+    objects: Optional[HotObjectCache] = None,
+    precompressed: bool = False,
+    encoder: Optional[ContentEncoder] = None,
+) -> None:
+    """发送普通文件。st 为解析路径时得到的 stat 结果，Content-Length 以此为准；
+    若文件随后被截断，send_file 会在短写后关闭连接。
+
+    cache 为可选的已打开文件缓存，objects 为可选的小文件内存缓存；
+    precompressed 为 True 时按 Accept-Encoding 发送 .br / .gz 旁路文件，
+    encoder 为可选的实时压缩配置。"""
+    etag = make_etag(st)
+    ctype = request.guess_type(request.path)
+    # 响应内容可能随 Accept-Encoding 变化时需要发送 Vary
+    negotiable = (precompressed or encoder is not None) and is_compressible(ctype)
+    encoding, sidecar = None, None
+    if negotiable:
+        accepted = accepted_encodings(request)
+        if accepted:
+            if precompressed:
+                sidecar = find_sidecar(real_path, st, accepted)
+                if sidecar is not None:
+                    encoding = sidecar[0]
+            if encoding is None and encoder is not None:
+                encoding = encoder.choose(request, ctype, st.st_size, accepted)
+    if sidecar is not None:
+        # 旁路文件内容与实时压缩结果不同，ETag 取自旁路文件本身
+        sidecar_st = sidecar[2]
+        etag = variant_etag(make_etag(sidecar_st), encoding)
+    elif encoding is not None:
+        etag = variant_etag(etag, encoding)
+
+    status = evaluate_preconditions(request, etag, st)
+    if status is not None:
+        send_precondition_response(request, status, etag, st,
+                                   (("Vary", "Accept-Encoding"),) if negotiable else ())
+        return
+
+    headers = [
+        ("Content-Type", ctype),
+        ("Last-Modified", request.date_time_string(st.st_mtime)),
+        ("ETag", etag),
+    ]
+    if negotiable:
+        headers.append(("Vary", "Accept-Encoding"))
+    if encoding is not None:
+        headers.append(("Content-Encoding", encoding))
+
+    if sidecar is not None:
+        _, sidecar_path, sidecar_st = sidecar
+        _serve_stream(request, sidecar_path, sidecar_st, headers, send_body, cache)
+    elif encoding is not None:
+        _serve_compressed(request, (real_path, etag), real_path, st, headers, send_body, cache, encoder, encoding)
+    elif objects is not None and objects.cacheable(st) and \
+            _serve_cached(request, (real_path, ctype, negotiable), real_path, st, headers, send_body, cache, objects):
+        pass
+    else:
+        _serve_stream(request, real_path, st, headers, send_body, cache)
+
+
+def _send_headers(request: HTTPRequestHandler, headers: list, length: Optional[int]) -> Optional[BodyStream]:
+    # length 为 None 时响应体分块发送，返回写入对象
+    request.send_response(HTTPStatus.OK)
+    for keyword, value in headers:
+        request.send_header(keyword, value)
+    stream = None
+    if length is not None:
+        request.send_header("Content-Length", str(length))
+    else:
+        stream = start_stream(request)
+    request.end_headers()
+    return stream
+
+
+def _serve_stream(
+    request: HTTPRequestHandler,
+    real_path: str,
+    st: os.stat_result,
+    headers: list,
+    send_body: bool,
+    cache: Optional[OpenFileCache],
+) -> None:
+    if not send_body:
+        _send_headers(request, headers, st.st_size)
+        return
+    # 先打开文件再发送头部，打开失败时仍可返回错误页面
+    with open_file(cache, real_path, st) as f:
+        _send_headers(request, headers, st.st_size)
+        send_file(request, f, 0, st.st_size)
+
+
+def _read_exact(cache: Optional[OpenFileCache], real_path: str, st: os.stat_result) -> Optional[bytes]:
+    # 读取整个文件，长度与 stat 不一致（文件正在变化）时返回 None
+    with open_file(cache, real_path, st) as f:
+        fd = f if isinstance(f, int) else f.fileno()
+        body = pread(fd, st.st_size + 1, 0)
+    return body if len(body) == st.st_size else None
+
+
+def _serve_cached(
+    request: HTTPRequestHandler,
+    key: tuple,
+    real_path: str,
+    st: os.stat_result,
+    headers: list,
+    send_body: bool,
+    cache: Optional[OpenFileCache],
+    objects: HotObjectCache,
+) -> bool:
+    """从内存缓存发送小文件，未命中时读入并缓存。文件读取长度与 stat 不一致时返回 False。"""
+    entry = objects.get(key, st)
+    if entry is None:
+        body = _read_exact(cache, real_path, st)
+        if body is None:
+            return False
+        block = "".join(f"{keyword}: {value}\r\n" for keyword, value in headers)
+        block += f"Content-Length: {len(body)}\r\n"
+        entry = objects.put(key, st, body, block.encode("latin-1", "strict"))
+    request.send_response(HTTPStatus.OK)
+    request.send_header_block(entry.headers, len(entry.body))
+    request.end_headers()
+    if send_body:
+        request.wfile.write(entry.body)
+    return True
+
+
+def _serve_compressed(
+    request: HTTPRequestHandler,
+    key: tuple,
+    real_path: str,
+    st: os.stat_result,
+    headers: list,
+    send_body: bool,
+    cache: Optional[OpenFileCache],
+    encoder: ContentEncoder,
+    encoding: str,
+) -> None:
+    """实时压缩发送。小文件的压缩结果按 key（路径与编码后的 ETag）缓存，
+    大文件流式压缩并分块发送。"""
+    if st.st_size <= encoder.max_object_size:
+        data = encoder.get(key)
+        if data is None:
+            body = _read_exact(cache, real_path, st)
+            if body is not None:
+                data = encoder.compress(body, encoding)
+                encoder.put(key, data)
+        if data is not None:
+            _send_headers(request, headers, len(data))
+            if send_body:
+                request.wfile.write(data)
+            return
+    # 压缩后的长度未知
+    if not send_body:
+        _send_headers(request, headers, None)
+        return
+    with open_file(cache, real_path, st) as f:
+        stream = _send_headers(request, headers, None)
+        stream_compressed(stream, f, st.st_size, encoder.compressor(encoding))
@@ -0,0 +1,227 @@
+"""?tar 端点：流式 tar 归档下载，可选 gzip / zstd 压缩。
+
+    ?tar            — 不压缩，总大小可预先计算（带 Content-Length），文件内容用 sendfile 发送
+    ?tar=gz         — gzip 压缩（大小未知，以 chunked 分块发送）
+    ?tar=zst        — zstd 压缩（需要可选依赖 zstandard）
+    &level=N        — 压缩级别，默认 gzip 6、zstd 3
+
+文件头与文件内容依次写出，不需要中央目录和 CRC，适合向 Linux 客户端流式发送很大的目录树。
+遍历与 ?zip 相同（zipwriter.walk_files），跳过解析后位于目录之外的符号链接。
+启用归档缓存时，压缩归档第一次生成时写入缓存，之后直接从缓存发送。
+"""
+from __future__ import annotations
+
+import logging
+import os
+import stat
+import tarfile
+import zlib
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import quote
+
+from .archivecache import ArchiveCache, ArchiveWriter, archive_key, send_cached, tree_parts
+from .range import abort_connection
+from .transmit import BodyStream, pread, send_file, start_stream
+from .zipwriter import walk_files
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+if TYPE_CHECKING:
+    from ...Handler import HTTPRequestHandler
+
+logger = logging.getLogger(__name__)
+
+_BLOCK = tarfile.BLOCKSIZE
+_RECORD = tarfile.RECORDSIZE
+# 压缩时每次读取的块大小
+_CHUNK = 1024 * 1024
+
+# 压缩方式 -> (扩展名, Content-Type, 默认级别, 最高级别)
+TAR_COMPRESSIONS = {
+    "": (".tar", "application/x-tar", 0, 0),
+    "gz": (".tar.gz", "application/gzip", 6, 9),
+    "zst": (".tar.zst", "application/zstd", 3, 22),
+}
+
+
+def _tar_header(arcname: str, st: os.stat_result) -> bytes:
+    info = tarfile.TarInfo(arcname)
+    info.size = st.st_size
+    info.mtime = int(st.st_mtime)
+    info.mode = stat.S_IMODE(st.st_mode)
+    info.type = tarfile.REGTYPE
+    # 长文件名、非 ASCII 文件名与超过 8GB 的文件由 PAX 扩展头记录
+    return info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+
+
+def _padding(size: int) -> int:
+    return -size % _BLOCK
+
+
+def _padding_record(size: int) -> int:
+    # 与 tarfile 一致，结尾补零到整个记录（20 个块）
+    return -size % _RECORD
+
+
+def _compressor(compression: str, level: int):
+    if compression == "gz":
+        return zlib.compressobj(level, zlib.DEFLATED, 31)
+    if compression == "zst":
+        return zstandard.ZstdCompressor(level=level).compressobj()
+    return None
+
+
+def handle_tar(
+    request: HTTPRequestHandler,
+    real_path: str,
+    args: dict,
+    archive_cache: Optional[ArchiveCache] = None,
+) -> None:
+    """处理 ?tar 查询参数，以 tar 归档形式下载文件或目录。
+
+    archive_cache 为可选的磁盘缓存，只用于压缩归档（不压缩的 tar 本身即可直接 sendfile）。
+    """
+    compression = args.get("tar", "").lower()
+    if compression in ("gzip", "tgz"):
+        compression = "gz"
+    elif compression in ("zstd", "zstandard"):
+        compression = "zst"
+    if compression not in TAR_COMPRESSIONS:
+        request.errsvc.handle(request, [], args, "GET", HTTPStatus.BAD_REQUEST)
+        return
+    if compression == "zst" and zstandard is None:
+        request.errsvc.handle(request, [], args, "GET", HTTPStatus.NOT_IMPLEMENTED)
+        return
+    suffix, ctype, level, max_level = TAR_COMPRESSIONS[compression]
+    if compression and "level" in args:
+        try:
+            level = int(args["level"])
+        except ValueError:
+            level = -1
+        if not 1 <= level <= max_level:
+            request.errsvc.handle(request, [], args, "GET", HTTPStatus.BAD_REQUEST)
+            return
+
+    basename = os.path.basename(real_path) or "download"
+    headers = (
+        ("Content-Type", ctype),
+        ("Content-Disposition", f'attachment; filename="{quote(basename + suffix)}"'),
+    )
+    files = list(walk_files(real_path, basename, _skip))
+    parts = tee = None
+    if compression and archive_cache is not None:
+        parts = tree_parts(files)
+        name = archive_key(f"tar.{compression}:{level}", parts) + suffix
+        if send_cached(request, archive_cache, name, headers):
+            return
+        tee = archive_cache.writer(name)
+
+    members = []
+    for path, arcname in files:
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            _skip(path, e)
+            continue
+        if stat.S_ISREG(st.st_mode):
+            members.append((path, _tar_header(arcname, st), st))
+
+    request.send_response(HTTPStatus.OK)
+    for keyword, value in headers:
+        request.send_header(keyword, value)
+    if not compression:
+        size = sum(len(header) + st.st_size + _padding(st.st_size) for _, header, st in members) + 2 * _BLOCK
+        request.send_header("Content-Length", str(size + _padding_record(size)))
+    else:
+        # 压缩后大小未知，分块发送
+        stream = start_stream(request)
+    request.end_headers()
+
+    try:
+        if compression:
+            _send_compressed(stream, members, _compressor(compression, level), tee)
+            stream.close()
+        else:
+            _send_plain(request, members)
+            request.wfile.flush()
+    except OSError as e:
+        logger.warning("Aborting tar download %s: %s", basename, e)
+        if tee is not None:
+            tee.abort()
+        abort_connection(request)
+        return
+    if tee is not None:
+        if tree_parts(files) == parts:
+            tee.commit()
+        else:
+            tee.abort()
+
+
+def _skip(path: str, reason) -> None:
+    logger.warning("Skipping file %s in tar: %s", path, reason)
+
+
+def _open_member(path: str, st: os.stat_result) -> int:
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    fst = os.fstat(fd)
+    if fst.st_size != st.st_size:
+        # 头部中已写入文件大小，文件被修改后无法继续
+        os.close(fd)
+        raise OSError(f"{path} changed during download")
+    return fd
+
+
+def _send_plain(request: HTTPRequestHandler, members: list) -> None:
+    total = 0
+    for path, header, st in members:
+        fd = _open_member(path, st)
+        try:
+            request.wfile.write(header)
+            if send_file(request, fd, 0, st.st_size) < st.st_size:
+                raise OSError(f"{path} was truncated")
+        finally:
+            os.close(fd)
+        pad = _padding(st.st_size)
+        request.wfile.write(b"\0" * pad)
+        total += len(header) + st.st_size + pad
+    total += 2 * _BLOCK
+    request.wfile.write(b"\0" * (2 * _BLOCK + _padding_record(total)))
+
+
+def _send_compressed(stream: BodyStream, members: list, compressor,
+                     tee: Optional[ArchiveWriter] = None) -> None:
+    total = 0
+
+    def write(data: bytes) -> None:
+        stream.write(data)
+        if tee is not None:
+            tee.write(data)
+
+    def emit(data: bytes) -> None:
+        out = compressor.compress(data)
+        if out:
+            write(out)
+
+    for path, header, st in members:
+        fd = _open_member(path, st)
+        try:
+            emit(header)
+            offset = 0
+            while offset < st.st_size:
+                chunk = pread(fd, min(_CHUNK, st.st_size - offset), offset)
+                if not chunk:
+                    raise OSError(f"{path} was truncated")
+                emit(chunk)
+                offset += len(chunk)
+        finally:
+            os.close(fd)
+        pad = _padding(st.st_size)
+        emit(b"\0" * pad)
+        total += len(header) + st.st_size + pad
+    total += 2 * _BLOCK
+    emit(b"\0" * (2 * _BLOCK + _padding_record(total)))
+    write(compressor.flush())
@@ -0,0 +1,228 @@
+"""文件发送引擎：优先使用 os.sendfile 零拷贝发送文件内容。
+
+TLS 连接、非普通文件或平台不支持 sendfile 时，回退到基于 memoryview 的
+读写循环（256KB 块），仍避免逐块分配新 bytes 对象。
+"""
+from __future__ import annotations
+
+import errno
+import os
+import selectors
+import stat
+import threading
+from typing import TYPE_CHECKING, BinaryIO, Union
+
+try:
+    import ssl
+except ImportError:
+    ssl = None
+
+if TYPE_CHECKING:
+    from ...Handler import HTTPRequestHandler
+
+# 回退路径每次读写的块大小
+_FALLBACK_CHUNK = 256 * 1024
+
+# Linux 单次 sendfile 最多传输 0x7ffff000 字节
+_SENDFILE_MAX = 0x7FFFF000
+
+# sendfile 首次调用即失败时，这些 errno 表示“此 fd 组合不支持”，可安全回退
+_GIVEUP_ERRNOS = {
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTSOCK,
+    getattr(errno, "EOPNOTSUPP", errno.EINVAL),
+    getattr(errno, "ENOTSUP", errno.EINVAL),
+}
+
+
+def _fileno(f: Union[BinaryIO, int]) -> int:
+    return f if isinstance(f, int) else f.fileno()
+
+
+def can_sendfile(request: HTTPRequestHandler, fd: int) -> bool:
+    """判断当前连接与文件能否走 sendfile 零拷贝路径。"""
+    if not hasattr(os, "sendfile"):
+        return False
+    sock = getattr(request, "connection", None)
+    if sock is None or not hasattr(sock, "fileno"):
+        return False
+    # TLS 需要在用户态加密，只能回退
+    if ssl is not None and isinstance(sock, ssl.SSLSocket):
+        return False
+    try:
+        return stat.S_ISREG(os.fstat(fd).st_mode)
+    except OSError:
+        return False
+
+
+def send_file(
+    request: HTTPRequestHandler,
+    f: Union[BinaryIO, int],
+    offset: int,
+    count: int,
+) -> int:
+    """将 f 中 [offset, offset + count) 的字节发送给客户端，返回已发送字节数。
+
+    使用位置读写（sendfile / preadv），不移动文件对象的读写位置，
+    多个线程可以共享同一个文件描述符。
+
+    如果文件在发送过程中被截断，实际发送量会少于 count，此时会将连接
+    标记为关闭，避免客户端按 Content-Length 继续等待。
+    """
+    if count <= 0:
+        return 0
+    # asyncio 引擎：文件段交给事件循环发送，不占用处理线程
+    transmit_file = getattr(request, "transmit_file", None)
+    if transmit_file is not None:
+        return transmit_file(f, offset, count)
+    fd = _fileno(f)
+
+    sent = 0
+    if can_sendfile(request, fd):
+        # 头部可能仍在缓冲区中，必须先于文件内容发出；支持时提示内核与文件开头合并发送
+        getattr(request.wfile, "flush_more", request.wfile.flush)()
+        sent = _sendfile_loop(request, fd, offset, count)
+        if sent < 0:  # 首次调用即不被支持，整体回退
+            sent = 0
+        else:
+            # 绕过 wfile 发送，单独计入响应字节数
+            request.sendfile_bytes += sent
+            if sent < count:
+                request.close_connection = True
+            return sent
+    sent = _copy_loop(request, f, offset, count)
+    if sent < count:
+        request.close_connection = True
+    return sent
+
+
+def _sendfile_loop(request: HTTPRequestHandler, fd: int, offset: int, count: int) -> int:
+    """os.sendfile 循环。返回 -1 表示尚未发送任何数据就确认不支持 sendfile。"""
+    sock = request.connection
+    sock_fd = sock.fileno()
+    timeout = sock.gettimeout()
+    selector = None
+    total = 0
+    try:
+        while count > 0:
+            try:
+                sent = os.sendfile(sock_fd, fd, offset, min(count, _SENDFILE_MAX))
+            except BlockingIOError:
+                # 带超时的 socket 处于非阻塞模式，等待可写
+                if selector is None:
+                    selector = selectors.DefaultSelector()
+                    selector.register(sock_fd, selectors.EVENT_WRITE)
+                if not selector.select(timeout):
+                    raise TimeoutError("timed out")
+                continue
+            except OSError as e:
+                if total == 0 and e.errno in _GIVEUP_ERRNOS:
+                    return -1
+                raise
+            if sent == 0:  # 文件已被截断
+                break
+            offset += sent
+            count -= sent
+            total += sent
+    finally:
+        if selector is not None:
+            selector.close()
+    return total
+
+
+def _copy_loop(
+    request: HTTPRequestHandler,
+    f: Union[BinaryIO, int],
+    offset: int,
+    count: int,
+) -> int:
+    """sendfile 不可用时的回退路径：复用单个缓冲区做位置读 + 写。"""
+    fd = _fileno(f)
+    buf = bytearray(min(_FALLBACK_CHUNK, count))
+    view = memoryview(buf)
+    total = 0
+    try:
+        while count > 0:
+            want = min(len(buf), count)
+            n = _pread_into(fd, view[:want], offset)
+            if not n:
+                break
+            request.wfile.write(view[:n])
+            offset += n
+            count -= n
+            total += n
+    finally:
+        view.release()
+    return total
+
+
+def pread(fd: int, size: int, offset: int) -> bytes:
+    """位置读：读取 fd 中 offset 处最多 size 字节，不移动读写位置。"""
+    if hasattr(os, "pread"):
+        return os.pread(fd, size, offset)
+    buf = bytearray(size)
+    n = _pread_into(fd, memoryview(buf), offset)
+    del buf[n:]
+    return bytes(buf)
+
+
+# 没有 pread 的平台（Windows）上用 lseek + read 模拟位置读，
+# 加锁并恢复原读写位置，使共享描述符的线程之间互不干扰
+_seek_lock = threading.Lock()
+
+
+def _pread_into(fd: int, view: memoryview, offset: int) -> int:
+    if hasattr(os, "preadv"):
+        return os.preadv(fd, [view], offset)
+    if hasattr(os, "pread"):
+        data = os.pread(fd, len(view), offset)
+    else:
+        with _seek_lock:
+            saved = os.lseek(fd, 0, os.SEEK_CUR)
+            try:
+                os.lseek(fd, offset, os.SEEK_SET)
+                data = os.read(fd, len(view))
+            finally:
+                os.lseek(fd, saved, os.SEEK_SET)
+    view[:len(data)] = data
+    return len(data)
+
+
+class BodyStream:
+    """长度未知的响应体（实时压缩、流式归档）的写入对象，由 start_stream 创建。
+
+    HTTP/1.1 以 Transfer-Encoding: chunked 分帧，响应结束后连接可以复用；
+    HTTP/1.0 客户端不支持 chunked，直接写出数据并以关闭连接标记响应结束。
+    """
+
+    def __init__(self, request: HTTPRequestHandler, chunked: bool) -> None:
+        self.request = request
+        self.chunked = chunked
+
+    def write(self, data: bytes) -> None:
+        if not data:
+            return  # 空块会被当作结束标记
+        wfile = self.request.wfile
+        if self.chunked:
+            # 块头与块尾由 wfile 与数据合并写出，数据本身不复制
+            wfile.write(b"%x\r\n" % len(data))
+            wfile.write(data)
+            wfile.write(b"\r\n")
+        else:
+            wfile.write(data)
+
+    def close(self) -> None:
+        """写出结束标记。"""
+        if self.chunked:
+            self.request.wfile.write(b"0\r\n\r\n")
+        self.request.wfile.flush()
+
+
+def start_stream(request: HTTPRequestHandler) -> BodyStream:
+    """在 end_headers 之前调用：为长度未知的响应体选择分帧方式，返回写入对象。"""
+    if request.request_version >= "HTTP/1.1":
+        request.send_header("Transfer-Encoding", "chunked")
+        return BodyStream(request, True)
+    request.close_connection = True
+    return BodyStream(request, False)
@@ -16,8 +16,7 @@ if TYPE_CHECKING:
 logger = logging.getLogger(__name__)
 
 # ── 常量 ─────────────────────────────────────────────────────────────────────
-_CHUNK = 64 * 1024          # 读取块大小 64KB
-_READ_AHEAD = 128 * 1024    # 缓冲区预读上限 128KB
+_BUFFER_SIZE = 1024 * 1024  # 接收缓冲区 1MB（预分配，readinto 填充）
 _MAX_HEAD_LEN = 8 * 1024    # part 头部最大长度 8KB（B3：防内存耗尽）
 
 # 状态
@@ -66,6 +65,62 @@ def _sanitize_filename(name: str) -> str | None:
 
 
 # ── 流式 multipart 解析器 ────────────────────────────────────────────────────
+class _ReadBuffer:
+    """预分配的接收缓冲区：readinto 直接写入缓冲区，文件内容从 memoryview 切片写出。
+
+    数据在 socket → 缓冲区 → 文件之间各复制一次；缓冲区写满时只把未消费的尾部
+    （不超过 boundary 或 part 头部长度）移到开头。
+    """
+
+    def __init__(self, stream, length: int, size: int = _BUFFER_SIZE) -> None:
+        self.buf = bytearray(size)
+        self.view = memoryview(self.buf)
+        self.start = 0
+        self.end = 0
+        self.remaining = length
+        self.eof = length <= 0
+        self._stream = stream
+        self._readinto = getattr(stream, "readinto", None)
+
+    def __len__(self) -> int:
+        return self.end - self.start
+
+    def find(self, sub: bytes, start: int | None = None) -> int:
+        return self.buf.find(sub, self.start if start is None else start, self.end)
+
+    def fill(self) -> bool:
+        """读取更多数据，返回是否读到了新数据。"""
+        if self.eof:
+            return False
+        if self.start == self.end:
+            self.start = self.end = 0
+        elif self.end == len(self.buf):
+            if self.start == 0:
+                return False  # 缓冲区已满且无法腾出空间
+            pending = bytes(self.view[self.start:self.end])
+            self.buf[:len(pending)] = pending
+            self.start, self.end = 0, len(pending)
+        want = min(len(self.buf) - self.end, self.remaining)
+        target = self.view[self.end:self.end + want]
+        if self._readinto is not None:
+            n = self._readinto(target)
+        else:
+            chunk = self._stream.read(want)
+            n = len(chunk)
+            target[:n] = chunk
+        if not n:
+            self.eof = True
+            return False
+        self.end += n
+        self.remaining -= n
+        if self.remaining == 0:
+            self.eof = True
+        return True
+
+    def release(self) -> None:
+        self.view.release()
+
+
 def _read_multipart_upload(
     stream,
     length: int,
@@ -80,8 +135,8 @@ def _read_multipart_upload(
     part_boundary  = b"\r\n--" + boundary      # 后续 boundary：\r\n--boundary
     bnd_len = len(part_boundary)
 
-    buf = bytearray()
-    remaining = length
+    rb = _ReadBuffer(stream, length)
+    view = rb.view
     saved: list[str] = []          # B6: 存完整路径
     errors: list[str] = []
     seen_file = False
@@ -91,27 +146,8 @@ def _read_multipart_upload(
     fp = None
     cur_path = ""
     skip_body = False              # B1: 文件已存在时跳过 body 写入
-    # 用于头部分块收集
-    head_buf = bytearray()
     # 记录本次上传打开过的所有路径，用于异常时清理半成品文件
     opened_paths: set[str] = set()
-    # 流是否已到末尾
-    eof = False
-
-    def _fill() -> None:
-        """从 stream 读取数据填充 buffer，直到达到 _READ_AHEAD 或流耗尽。"""
-        nonlocal remaining, eof
-        if eof:
-            return
-        while len(buf) < _READ_AHEAD and remaining > 0:
-            chunk = stream.read(min(_CHUNK, remaining))
-            if not chunk:
-                eof = True
-                return
-            buf.extend(chunk)
-            remaining -= len(chunk)
-        if remaining == 0:
-            eof = True
 
     def _close_fp() -> None:
         nonlocal fp
@@ -133,53 +169,42 @@ def _read_multipart_upload(
 
     try:
         # ── 跳过请求体开头到首个 boundary 之间的 preamble ──────────────
+        rb.fill()
         while True:
-            _fill()
-            idx = buf.find(start_boundary)
+            idx = rb.find(start_boundary)
             if idx != -1:
-                buf = buf[idx + len(start_boundary):]
+                rb.start = idx + len(start_boundary)
                 break
-            if eof:
+            # 丢弃已扫描部分（保留可能是 boundary 开头的尾部）
+            rb.start = max(rb.start, rb.end - len(start_boundary) + 1)
+            if not rb.fill():
                 return saved, errors, seen_file
-            # buffer 过大但没找到 → 丢弃已扫描部分（保留尾部 bnd_len 字节）
-            if len(buf) > bnd_len:
-                buf = buf[-bnd_len:]
-
-        state = _S_HEAD
-        head_buf.clear()
 
         # ── 主循环 ──────────────────────────────────────────────────────
         while True:
             if state == _S_HEAD:
-                _fill()
-                # 在 buffer 中找 \r\n\r\n（头部结束标志）
-                sep = buf.find(b"\r\n\r\n")
+                # 在 buffer 中找 \r\n\r\n（头部结束标志），头部可能分块到达
+                sep = rb.find(b"\r\n\r\n")
                 if sep == -1:
-                    if eof:
-                        # 没有更多数据且头部不完整 → 截断
-                        _cleanup_partial()
-                        raise ConnectionError("Upload stream ended prematurely")
                     # B3: 检查头部长度限制
-                    if len(head_buf) + len(buf) > _MAX_HEAD_LEN:
+                    if len(rb) > _MAX_HEAD_LEN:
                         _cleanup_partial()
                         raise ValueError("Part header too large")
-                    # 头部可能分块到达，把 buffer 暂存后继续读
-                    head_buf.extend(buf)
-                    buf.clear()
+                    if not rb.fill():
+                        # 没有更多数据且头部不完整 → 截断
+                        _cleanup_partial()
+                        raise ConnectionError("Upload stream ended prematurely")
                     continue
-                # 合并分块头部（也检查长度）
-                if len(head_buf) + sep > _MAX_HEAD_LEN:
+                if sep - rb.start > _MAX_HEAD_LEN:
                     _cleanup_partial()
                     raise ValueError("Part header too large")
-                head_buf.extend(buf[:sep])
-                raw_name = _parse_filename(bytes(head_buf))
-                buf = buf[sep + 4:]  # 跳过 \r\n\r\n
-                head_buf.clear()
+                raw_name = _parse_filename(bytes(view[rb.start:sep]))
+                rb.start = sep + 4  # 跳过 \r\n\r\n
+                state = _S_BODY
 
                 if not raw_name:
                     errors.append("Missing filename in multipart part")
                     skip_body = True
-                    state = _S_BODY
                     continue
 
                 seen_file = True
@@ -188,7 +213,6 @@ def _read_multipart_upload(
                 if not filename:
                     errors.append(f"Invalid filename: {raw_name}")
                     skip_body = True
-                    state = _S_BODY
                     continue
 
                 cur_path = os.path.join(dest_dir, filename)
@@ -202,60 +226,43 @@ def _read_multipart_upload(
                 except OSError as e:
                     errors.append(f"{filename}: {e}")
                     skip_body = True      # B1: 同样跳过写入
-                    state = _S_BODY
-                    continue
-
-                state = _S_BODY
 
             elif state == _S_BODY:
-                _fill()
-                safe = len(buf) - bnd_len
-                if safe < 0:
-                    safe = 0
-
-                if safe == 0:
-                    if eof:
-                        # 流断开，数据不完整
-                        _cleanup_partial()
-                        raise ConnectionError("Upload stream ended prematurely")
-                    # 数据不足，继续读
-                    continue
-
-                # 搜整个 buffer 找 boundary
-                idx = buf.find(part_boundary)
+                # 只搜索新到达的数据（上一轮保留的尾部不足一个 boundary 长度）
+                idx = rb.find(part_boundary)
                 if idx == -1:
-                    if eof:
+                    # 没找到：除可能是 boundary 开头的尾部外，其余数据直接从缓冲区写入文件
+                    safe = rb.end - bnd_len + 1
+                    if safe > rb.start:
+                        if not skip_body:
+                            fp.write(view[rb.start:safe])
+                        rb.start = safe
+                    if not rb.fill():
                         # 流断开且无 boundary，数据不完整
                         _cleanup_partial()
                         raise ConnectionError("Upload stream ended prematurely")
-                    # 没找到，写出 safe 区域的数据（这部分不可能是 boundary 起始）
-                    if not skip_body:
-                        fp.write(buf[:safe])
-                    buf = buf[safe:]
                     continue
 
                 # 找到了：boundary 前的数据写入文件
                 if not skip_body:
-                    fp.write(buf[:idx])
+                    fp.write(view[rb.start:idx])
                     saved.append(cur_path)      # B6: 存完整路径
                 _close_fp()
-                buf = buf[idx + bnd_len:]
+                rb.start = idx + bnd_len
                 state = _S_DONE
 
             elif state == _S_DONE:
                 # 检查 boundary 后面的分隔符
-                # part_boundary 匹配后 buf 已跳过 \r\n--boundary
-                # 正常 part → buf 以 \r\n 开头
-                # 结束     → buf 以 -- 开头 (--boundary-- 的 --\r\n)
-                _fill()
-                if eof and len(buf) == 0:
-                    break
-                if buf.startswith(b"\r\n"):
-                    buf = buf[2:]
+                # part_boundary 匹配后已跳过 \r\n--boundary
+                # 正常 part → 以 \r\n 开头
+                # 结束     → 以 -- 开头 (--boundary-- 的 --\r\n)
+                while len(rb) < 2 and rb.fill():
+                    pass
+                if view[rb.start:rb.start + 2] == b"\r\n":
+                    rb.start += 2
                     state = _S_HEAD
-                    head_buf.clear()
                 else:
-                    # 以 -- 开头 = 结束边界；其他异常情况也视为结束
+                    # 以 -- 开头 = 结束边界；其他异常情况（包括流结束）也视为结束
                     break
 
     except (OSError, ConnectionError):
@@ -263,6 +270,7 @@ def _read_multipart_upload(
         raise
     finally:
         _close_fp()
+        rb.release()
 
     return saved, errors, seen_file
 
@@ -0,0 +1,127 @@
+"""缓存校验与条件请求（RFC 9110 第 13 节），供所有文件发送路径共用。
+
+强 ETag 由 st_mtime_ns、inode 与文件大小生成，文件内容变化（即使在同一秒内）ETag 也会变化。
+条件请求头按标准顺序处理：
+    If-Match → If-Unmodified-Since → If-None-Match → If-Modified-Since，
+Range 请求另外检查 If-Range：校验不通过时忽略 Range，返回完整的 200 响应。
+客户端重新验证只需一次 stat 即可得到 304。
+"""
+from __future__ import annotations
+
+import datetime
+import email.utils
+import os
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from ...Handler import HTTPRequestHandler
+
+
+def make_etag(st: os.stat_result) -> str:
+    """由 stat 结果生成强 ETag。"""
+    return f'"{st.st_mtime_ns:x}-{st.st_ino:x}-{st.st_size:x}"'
+
+
+def _parse_tags(header: str) -> list:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def strong_match(header: str, etag: str) -> bool:
+    """If-Match / If-Range 使用的强比较：弱 ETag 永不匹配。"""
+    for tag in _parse_tags(header):
+        if tag == "*" or (not tag.startswith("W/") and tag == etag):
+            return True
+    return False
+
+
+def weak_match(header: str, etag: str) -> bool:
+    """If-None-Match 使用的弱比较：忽略 W/ 前缀。"""
+    opaque = _opaque(etag)
+    for tag in _parse_tags(header):
+        if tag == "*" or _opaque(tag) == opaque:
+            return True
+    return False
+
+
+def _parse_date(value: str) -> Optional[datetime.datetime]:
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, IndexError, OverflowError, ValueError):
+        return None
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=datetime.timezone.utc)
+    return date
+
+
+def _mtime(st: os.stat_result) -> datetime.datetime:
+    # HTTP 日期精确到秒
+    return datetime.datetime.fromtimestamp(int(st.st_mtime), datetime.timezone.utc)
+
+
+def evaluate_preconditions(request: HTTPRequestHandler, etag: str, st: os.stat_result) -> Optional[int]:
+    """检查条件请求头。返回 304 / 412 表示应直接以该状态码响应，None 表示继续处理。"""
+    headers = request.headers
+    if_match = headers.get("If-Match")
+    if if_match is not None:
+        if not strong_match(if_match, etag):
+            return HTTPStatus.PRECONDITION_FAILED
+    else:
+        ius = headers.get("If-Unmodified-Since")
+        if ius is not None:
+            date = _parse_date(ius)
+            if date is not None and _mtime(st) > date:
+                return HTTPStatus.PRECONDITION_FAILED
+
+    safe = request.command in ("GET", "HEAD")
+    if_none_match = headers.get("If-None-Match")
+    if if_none_match is not None:
+        if weak_match(if_none_match, etag):
+            return HTTPStatus.NOT_MODIFIED if safe else HTTPStatus.PRECONDITION_FAILED
+    elif safe:
+        ims = headers.get("If-Modified-Since")
+        if ims is not None:
+            date = _parse_date(ims)
+            if date is not None and _mtime(st) <= date:
+                return HTTPStatus.NOT_MODIFIED
+    return None
+
+
+def range_applies(request: HTTPRequestHandler, etag: str, st: os.stat_result) -> bool:
+    """If-Range 校验：没有 If-Range 或校验通过时返回 True；否则应忽略 Range 发送完整内容。"""
+    if_range = request.headers.get("If-Range")
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return strong_match(if_range, etag)
+    date = _parse_date(if_range)
+    # 日期只能作为弱校验器，要求与 Last-Modified 完全相同
+    return date is not None and date == _mtime(st)
+
+
+def send_validators(request: HTTPRequestHandler, etag: str, st: os.stat_result) -> None:
+    request.send_header("ETag", etag)
+    request.send_header("Last-Modified", request.date_time_string(int(st.st_mtime)))
+
+
+def send_precondition_response(
+    request: HTTPRequestHandler,
+    status: int,
+    etag: str,
+    st: os.stat_result,
+    extra_headers: tuple = (),
+) -> None:
+    """发送 304 或 412 响应。"""
+    if status == HTTPStatus.NOT_MODIFIED:
+        request.send_response(status)
+        send_validators(request, etag, st)
+        for keyword, value in extra_headers:
+            request.send_header(keyword, value)
+        request.end_headers()
+    else:
+        request.errsvc.handle(request, [], {}, request.command, status)
@@ -1,5 +1,6 @@
 """?zip 端点：zip 压缩下载（单文件 + 递归目录）。
 
+目录与大文件由 zipwriter 并行压缩后流式发送；?zip=store 由 zipstore 发送不压缩、可续传的归档。
 """
 from __future__ import annotations
 
@@ -7,10 +8,16 @@ import io
 import logging
 import os
 import zipfile
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Optional
 from http import HTTPStatus
 from urllib.parse import quote
 
+from .archivecache import ArchiveCache, ArchiveWriter, archive_key, send_cached, tree_parts
+from .range import abort_connection, send_entity
+from .transmit import BodyStream, start_stream
+from .zipstore import CRCCache, StoredZip
+from .zipwriter import ParallelZipWriter, walk_files
+
 if TYPE_CHECKING:
     from ...Handler import HTTPRequestHandler
 
@@ -24,11 +31,11 @@ _CHUNK_SIZE = 8 * 1024 * 1024  # 8 MB
 
 
 class _ChunkedWriter:
-    """文件对象接口，供 zipfile 写入时使用。
+    """文件对象接口，供 zipfile 写入时使用；数据攒够 _CHUNK_SIZE 后作为一个 chunk 写入 stream。
     """
 
-    def __init__(self, request):
-        self.request = request
+    def __init__(self, stream: BodyStream):
+        self.stream = stream
         self._buffer = bytearray()
         self._pos = 0
 
@@ -44,42 +51,95 @@ class _ChunkedWriter:
     def flush(self) -> None:
         if not self._buffer:
             return
-        data = bytes(self._buffer)
-        self.request.wfile.write(data)
+        self.stream.write(self._buffer)
         self._buffer.clear()
 
     def close(self) -> None:
         self.flush()
-        self.request.wfile.flush()
+        self.stream.close()
 
 
-def handle_zip(request: HTTPRequestHandler, real_path: str) -> None:
+def handle_zip(
+    request: HTTPRequestHandler,
+    real_path: str,
+    executor,
+    workers: int,
+    level: int = 6,
+    mode: str = "",
+    crc_cache: Optional[CRCCache] = None,
+    archive_cache: Optional[ArchiveCache] = None,
+) -> None:
     """处理 ?zip 查询参数，以 zip 压缩包形式下载文件或目录。
 
+    mode 为 ?zip 的值："store" 不压缩，"deflate" 压缩，其他值按内容自动选择。
+    archive_cache 为可选的磁盘缓存，压缩归档第一次生成时写入，之后直接从缓存发送。
+
     策略：
+    - store（或已压缩的媒体文件占绝大部分时自动选择）：确定布局的 ZIP64，带 Content-Length，支持 Range。
     - 单个小文件：在内存中构建 zip 并发送。
-    - 其他实时压缩并发送（不占用磁盘/大量内存）。
+    - 其他由 executor（workers 个线程）并行压缩、按顺序实时发送（不占用磁盘/大量内存），
+      启用 archive_cache 时同时写入缓存。
     """
     basename = os.path.basename(real_path) or "download"
     zip_name = basename + ".zip"
+    files = list(walk_files(real_path, basename, _skip))
+
+    if mode != "deflate":
+        layout = StoredZip(files, crc_cache, _skip)
+        if mode == "store" or layout.mostly_compressed():
+            _send_stored(request, layout, zip_name)
+            return
 
     # 单文件且小于阈值时：在内存中构建 zip 并发送 Content-Length
     if os.path.isfile(real_path) and os.path.getsize(real_path) <= _IN_MEMORY_LIMIT:
-        _send_in_memory_single_file(request, real_path, basename, zip_name)
+        _send_in_memory_single_file(request, real_path, basename, zip_name, level)
         return
 
+    headers = (
+        ("Content-Type", "application/zip"),
+        ("Content-Disposition", f'attachment; filename="{quote(zip_name)}"'),
+    )
+    parts = tee = None
+    if archive_cache is not None:
+        parts = tree_parts(files)
+        name = archive_key(f"zip:{level}", parts) + ".zip"
+        if send_cached(request, archive_cache, name, headers):
+            return
+        tee = archive_cache.writer(name)
+
     # 否则采用流式实时压缩并发送
-    _send_streamed_on_the_fly(request, real_path, basename, zip_name)
+    _send_streamed_on_the_fly(request, files, headers, executor, workers, level, tee, parts)
+
+
+def _skip(path: str, reason) -> None:
+    logger.warning("Skipping file %s in zip: %s", path, reason)
+
+
+def _send_stored(request: HTTPRequestHandler, layout: StoredZip, zip_name: str) -> None:
+    """发送 store 模式归档，支持条件请求与单段 Range（多段 Range 按完整内容发送）。"""
+    headers = (
+        ("Content-Type", "application/zip"),
+        ("Content-Disposition", f'attachment; filename="{quote(zip_name)}"'),
+    )
+    try:
+        send_entity(request, layout.size, layout.etag, layout.stat, headers,
+                    lambda start, end: layout.send(request, start, end))
+    except OSError as e:
+        # 客户端断开，或文件在下载过程中被修改；已声明的长度无法满足，只能关闭连接
+        logger.warning("Aborting zip download %s: %s", zip_name, e)
+        abort_connection(request)
+
 
 def _send_in_memory_single_file(
     request: HTTPRequestHandler,
     file_path: str,
     basename: str,
     zip_name: str,
+    level: int,
 ) -> None:
     """针对单个小文件，直接在内存中构建 zip 并发送（带 Content-Length）。"""
     bio = io.BytesIO()
-    with zipfile.ZipFile(bio, "w", zipfile.ZIP_DEFLATED) as zf:
+    with zipfile.ZipFile(bio, "w", zipfile.ZIP_DEFLATED, compresslevel=level) as zf:
         zf.write(file_path, basename)
     data = bio.getvalue()
 
@@ -96,13 +156,19 @@ def _send_in_memory_single_file(
 
 def _send_streamed_on_the_fly(
     request: HTTPRequestHandler,
-    real_path: str,
-    basename: str,
-    zip_name: str,
+    files: list,
+    headers: tuple,
+    executor,
+    workers: int,
+    level: int,
+    tee: Optional[ArchiveWriter] = None,
+    parts: Optional[list] = None,
 ) -> None:
     """实时分段压缩并流式发送 zip（仅支持 HTTP/1.1）。
 
-    使用 zipfile 写入到自定义的 `_ChunkedWriter`，它会把数据直接写入 `request.wfile`。此方法不会在磁盘或一次性内存中构建完整 zip 文件，适用于目录或大文件集合。
+    文件按块交给线程池并行压缩，按顺序写入 `_ChunkedWriter`，它会把数据直接写入 `request.wfile`。
+    同时在途的块数为 workers 的两倍，不会在磁盘或内存中构建完整 zip 文件，适用于目录或大文件集合。
+    tee 不为空时同时写入归档缓存，完成后文件列表（parts）未变化才提交。
     """
     is_http10 = (
         hasattr(request, "request_version")
@@ -110,6 +176,8 @@ def _send_streamed_on_the_fly(
     )
 
     if is_http10:
+        if tee is not None:
+            tee.abort()
         request.send_error(
             HTTPStatus.INSUFFICIENT_STORAGE,
             "Zip file is too large for HTTP/1.0. Please retry with HTTP/1.1.",
@@ -117,40 +185,29 @@ def _send_streamed_on_the_fly(
         return
 
     request.send_response(HTTPStatus.OK)
-    request.send_header("Content-Type", "application/zip")
-    request.send_header(
-        "Content-Disposition",
-        f'attachment; filename="{quote(zip_name)}"',
-    )
+    for keyword, value in headers:
+        request.send_header(keyword, value)
+    stream = start_stream(request)
     request.end_headers()
 
-    writer = _ChunkedWriter(request)
-
-    root_real = os.path.realpath(real_path)
-
+    writer = _ChunkedWriter(stream)
+    write = writer.write
+    if tee is not None:
+        def write(data: bytes) -> None:
+            writer.write(data)
+            tee.write(data)
+    zw = ParallelZipWriter(write, executor, workers * 2, level, on_skip=_skip)
     try:
-        with zipfile.ZipFile(writer, "w", zipfile.ZIP_DEFLATED) as zf:
-            if os.path.isfile(real_path):
-                zf.write(real_path, basename)
-            elif os.path.isdir(real_path):
-                for dirpath, _dirnames, filenames in os.walk(real_path):
-                    for fn in filenames:
-                        fp = os.path.join(dirpath, fn)
-                        resolved = os.path.realpath(fp)
-                        if not (resolved == root_real or resolved.startswith(root_real + os.sep)):
-                            logger.warning("Skipping out-of-tree path in zip: %s -> %s", fp, resolved)
-                            continue
-                        arcname = os.path.join(
-                            basename, os.path.relpath(fp, real_path),
-                        )
-                        try:
-                            zf.write(fp, arcname)
-                        except (OSError, PermissionError) as e:
-                            logger.warning("Skipping file %s in zip: %s", fp, e)
-                            continue
+        zw.write_files(files)
+        writer.close()
     except (BrokenPipeError, ConnectionAbortedError, ConnectionResetError, OSError):
         # 在写入过程中，如果发生任何异常（例如客户端断开），直接终止
-        try:
-            request.connection.close()
-        except OSError:
-            pass
+        if tee is not None:
+            tee.abort()
+        abort_connection(request)
+        return
+    if tee is not None:
+        if tree_parts(files) == parts:
+            tee.commit()
+        else:
+            tee.abort()
@@ -0,0 +1,276 @@
+"""?zip=store：不压缩的 ZIP64 归档，总大小可预先计算，支持 Content-Length 与 Range。
+
+归档布局只由文件列表（名称排序）与 stat 结果决定，同一组文件每次生成的字节完全相同：
+    本地文件头（固定带 ZIP64 扩展字段）+ 文件内容 + ZIP64 数据描述符，依次排列；
+    之后是中央目录（每项固定带 ZIP64 扩展字段）、ZIP64 结束记录、定位器与结束记录。
+各部分长度只取决于文件名与文件大小，因此可以把任意字节偏移映射到某个文件头或文件内容，
+文件内容直接用 sendfile 发送。
+
+CRC32 只出现在数据描述符与中央目录中（本地文件头置零），按需计算：
+完整发送某个文件时顺带计算，否则单独读取该文件计算。结果存入 CRCCache，
+按 (st_dev, st_ino, st_size, st_mtime_ns) 校验，续传与分段并行下载时无需重复读取。
+"""
+from __future__ import annotations
+
+import bisect
+import hashlib
+import os
+import stat
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
+from .fdcache import same_file
+from .transmit import pread, send_file
+from .zipwriter import dos_datetime
+
+if TYPE_CHECKING:
+    from ...Handler import HTTPRequestHandler
+
+# 已压缩的媒体与归档格式，再次 deflate 几乎没有收益
+STORED_EXTENSIONS = frozenset((
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar", ".br",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".avif", ".heic",
+    ".mp3", ".aac", ".m4a", ".ogg", ".opus", ".flac",
+    ".mp4", ".m4v", ".mkv", ".webm", ".mov", ".avi",
+    ".pdf", ".docx", ".xlsx", ".pptx", ".epub", ".apk", ".jar", ".whl",
+))
+# 已压缩文件字节数达到此比例时，?zip 自动使用 store 模式
+_AUTO_STORE_RATIO = 0.9
+
+# 计算 CRC 时每次读取的块大小
+_CRC_CHUNK = 1024 * 1024
+
+_FLAGS = 0x08 | 0x800  # 数据描述符 + UTF-8 文件名
+_VERSION = 45
+_LOCAL_FIXED = 30 + 20  # 本地文件头 + ZIP64 扩展字段
+_DESCRIPTOR = 24
+_CENTRAL_FIXED = 46 + 28  # 中央目录项 + ZIP64 扩展字段
+_END_RECORDS = 56 + 20 + 22
+
+
+class CRCCache:
+    """文件 CRC32 缓存，按 stat 校验，线程安全，可在多个服务之间共享。"""
+
+    def __init__(self, max_entries: int = 65536) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()  # 路径 -> (stat, crc)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, st: os.stat_result) -> Optional[int]:
+        with self._lock:
+            item = self._entries.get(path)
+            if item is not None and same_file(item[0], st):
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+            return None
+
+    def put(self, path: str, st: os.stat_result, crc: int) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[path] = (st, crc)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class _StoredEntry:
+    __slots__ = ("path", "name", "stat", "header", "offset", "data_offset", "crc")
+
+    def __init__(self, path: str, arcname: str, st: os.stat_result, offset: int) -> None:
+        self.path = path
+        self.name = arcname.encode("utf-8")
+        self.stat = st
+        self.offset = offset
+        self.data_offset = offset + _LOCAL_FIXED + len(self.name)
+        self.crc: Optional[int] = None
+        dos_time, dos_date = dos_datetime(st.st_mtime)
+        self.header = struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, _VERSION, _FLAGS, 0, dos_time, dos_date,
+            0, 0xFFFFFFFF, 0xFFFFFFFF, len(self.name), 20,
+        ) + self.name + struct.pack("<HHQQ", 0x0001, 16, st.st_size, st.st_size)
+
+    @property
+    def descriptor_offset(self) -> int:
+        return self.data_offset + self.stat.st_size
+
+    @property
+    def end(self) -> int:
+        return self.descriptor_offset + _DESCRIPTOR
+
+    def descriptor(self) -> bytes:
+        return struct.pack("<IIQQ", 0x08074B50, self.crc, self.stat.st_size, self.stat.st_size)
+
+    def central_header(self) -> bytes:
+        dos_time, dos_date = dos_datetime(self.stat.st_mtime)
+        return struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | _VERSION, _VERSION, _FLAGS, 0,
+            dos_time, dos_date, self.crc, 0xFFFFFFFF, 0xFFFFFFFF,
+            len(self.name), 28, 0, 0, 0, (self.stat.st_mode & 0xFFFF) << 16, 0xFFFFFFFF,
+        ) + self.name + struct.pack("<HHQQQ", 0x0001, 24, self.stat.st_size, self.stat.st_size, self.offset)
+
+
+class StoredZip:
+    """一个 store 模式归档的布局。files 为 (本地路径, 归档内路径) 序列。"""
+
+    def __init__(self, files: Iterable, crc_cache: Optional[CRCCache] = None,
+                 on_skip: Optional[Callable] = None) -> None:
+        self.crc_cache = crc_cache
+        self.entries: list = []
+        self.compressed_bytes = 0
+        position = 0
+        digest = hashlib.sha1()
+        mtime = 0.0
+        for path, arcname in files:
+            try:
+                st = os.stat(path)
+            except OSError as e:
+                if on_skip is not None:
+                    on_skip(path, e)
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                continue
+            entry = _StoredEntry(path, arcname, st, position)
+            self.entries.append(entry)
+            position = entry.end
+            digest.update(b"%s\0%x-%x-%x-%x\0" % (entry.name, st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns))
+            mtime = max(mtime, st.st_mtime)
+            if os.path.splitext(path)[1].lower() in STORED_EXTENSIONS:
+                self.compressed_bytes += st.st_size
+        self._starts = [entry.offset for entry in self.entries]
+        self.cd_offset = position
+        self.cd_size = sum(_CENTRAL_FIXED + len(entry.name) for entry in self.entries)
+        self.size = self.cd_offset + self.cd_size + _END_RECORDS
+        self.etag = '"zip-' + digest.hexdigest()[:24] + '"'
+        # 供条件请求与 Last-Modified 使用：取所有文件中最新的修改时间
+        self.stat = os.stat_result((0, 0, 0, 0, 0, 0, self.size, int(mtime), int(mtime), int(mtime)))
+        self._tail: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    def mostly_compressed(self) -> bool:
+        """已压缩格式的文件是否占绝大部分字节，是则适合自动使用 store 模式。"""
+        total = sum(entry.stat.st_size for entry in self.entries)
+        return total > 0 and self.compressed_bytes >= total * _AUTO_STORE_RATIO
+
+    # ── CRC ──
+
+    def _crc(self, entry: _StoredEntry) -> int:
+        if entry.crc is None and self.crc_cache is not None:
+            entry.crc = self.crc_cache.get(entry.path, entry.stat)
+        if entry.crc is None:
+            with _open_checked(entry) as fd:
+                crc = 0
+                offset = 0
+                while offset < entry.stat.st_size:
+                    chunk = pread(fd, min(_CRC_CHUNK, entry.stat.st_size - offset), offset)
+                    if not chunk:
+                        raise OSError(f"{entry.path} was truncated")
+                    crc = zlib.crc32(chunk, crc)
+                    offset += len(chunk)
+            self._set_crc(entry, crc)
+        return entry.crc
+
+    def _set_crc(self, entry: _StoredEntry, crc: int) -> None:
+        entry.crc = crc
+        if self.crc_cache is not None:
+            self.crc_cache.put(entry.path, entry.stat, crc)
+
+    def _tail_bytes(self) -> bytes:
+        # 中央目录与结束记录，需要全部文件的 CRC
+        with self._lock:
+            if self._tail is None:
+                parts = [self._entry_central(entry) for entry in self.entries]
+                count = len(self.entries)
+                zip64_eocd = self.cd_offset + self.cd_size
+                parts.append(struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, _VERSION, _VERSION, 0, 0,
+                                         count, count, self.cd_size, self.cd_offset))
+                parts.append(struct.pack("<IIQI", 0x07064B50, 0, zip64_eocd, 1))
+                parts.append(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, min(count, 0xFFFF), min(count, 0xFFFF),
+                                         min(self.cd_size, 0xFFFFFFFF), min(self.cd_offset, 0xFFFFFFFF), 0))
+                self._tail = b"".join(parts)
+            return self._tail
+
+    def _entry_central(self, entry: _StoredEntry) -> bytes:
+        self._crc(entry)
+        return entry.central_header()
+
+    # ── 发送 ──
+
+    def send(self, request: HTTPRequestHandler, start: int, end: int) -> None:
+        """发送归档中 [start, end] 闭区间的字节。"""
+        end += 1
+        i = max(bisect.bisect_right(self._starts, start) - 1, 0)
+        while start < end and i < len(self.entries):
+            entry = self.entries[i]
+            if start >= entry.end:
+                i += 1
+                continue
+            start = self._send_entry(request, entry, start, end)
+            i += 1
+        if start < end:
+            tail = self._tail_bytes()
+            request.wfile.write(tail[start - self.cd_offset:end - self.cd_offset])
+
+    def _send_entry(self, request: HTTPRequestHandler, entry: _StoredEntry, start: int, end: int) -> int:
+        if start < entry.data_offset:
+            request.wfile.write(entry.header[start - entry.offset:min(end, entry.data_offset) - entry.offset])
+            start = entry.data_offset
+        if start >= end:
+            return start
+        body_end = min(end, entry.descriptor_offset)
+        if start < body_end:
+            with _open_checked(entry) as fd:
+                if start == entry.data_offset and body_end == entry.descriptor_offset and entry.crc is None:
+                    self._send_with_crc(request, entry, fd)
+                elif send_file(request, fd, start - entry.data_offset, body_end - start) < body_end - start:
+                    raise OSError(f"{entry.path} was truncated")
+            start = body_end
+        if start < end:
+            self._crc(entry)
+            descriptor = entry.descriptor()
+            request.wfile.write(descriptor[start - entry.descriptor_offset:end - entry.descriptor_offset])
+            start = min(end, entry.end)
+        return start
+
+    def _send_with_crc(self, request: HTTPRequestHandler, entry: _StoredEntry, fd: int) -> None:
+        # 完整发送文件内容时顺带计算 CRC，避免再读一遍
+        size = entry.stat.st_size
+        crc = 0
+        offset = 0
+        while offset < size:
+            chunk = pread(fd, min(_CRC_CHUNK, size - offset), offset)
+            if not chunk:
+                raise OSError(f"{entry.path} was truncated")
+            crc = zlib.crc32(chunk, crc)
+            request.wfile.write(chunk)
+            offset += len(chunk)
+        self._set_crc(entry, crc)
+
+
+@contextmanager
+def _open_checked(entry: _StoredEntry):
+    # 打开文件并确认与生成布局时是同一个未变化的文件，否则已声明的长度与内容都不再可靠
+    fd = os.open(entry.path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        if not same_file(os.fstat(fd), entry.stat):
+            raise OSError(f"{entry.path} changed during download")
+        yield fd
+    finally:
+        os.close(fd)
@@ -0,0 +1,330 @@
+"""流式 ZIP 写入器：多线程并行 deflate，按确定的顺序输出。
+
+每个文件切分为固定大小的块，由线程池并行压缩（zlib 压缩时释放 GIL）：
+    - 每块独立压缩为原始 deflate 流，非末块以 Z_SYNC_FLUSH 结束（字节对齐），
+      末块以 Z_FINISH 结束，拼接后即为该文件完整的 deflate 数据（与 pigz 相同）；
+    - 非首块以前 32KB 原文作为预置字典，压缩率与整体压缩基本一致；
+    - 各块的 CRC32 在工作线程中计算，由写入线程按块顺序合并。
+写入线程按提交顺序取回结果并写出，同时在途的块数量有上限，内存占用有界。
+
+文件大小在写入前未知，使用数据描述符（通用标志位 3）记录 CRC 与大小；
+单个文件或整个归档超过 4GB 时使用 ZIP64 扩展。
+"""
+from __future__ import annotations
+
+import os
+import stat
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from typing import Callable, Iterable, Optional
+
+from .resumable import is_hidden
+from .transmit import pread
+
+# 默认压缩块大小
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+# 预置字典长度（deflate 回溯窗口）
+_WINDOW = 32 * 1024
+# 超过此大小的文件在本地文件头中预留 ZIP64 字段
+_ZIP64_FILE_THRESHOLD = 0xF0000000
+_ZIP32_LIMIT = 0xFFFFFFFF
+_ZIP32_COUNT_LIMIT = 0xFFFF
+
+# 通用标志：位 3 使用数据描述符，位 11 文件名为 UTF-8
+_FLAG_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_DEFLATED = 8
+_STORED = 0
+
+
+# ── CRC32 合并 ─────────────────────────────────────────────────
+# crc32(A + B) 可由 crc32(A)、crc32(B) 与 len(B) 计算（与 zlib 的 crc32_combine 相同），
+# 预先计算“追加 2^k 个零字节”对应的 GF(2) 矩阵，每次合并只需若干次矩阵乘向量。
+
+_crc_powers: list = []
+_crc_lock = threading.Lock()
+
+
+def _gf2_times(mat: list, vec: int) -> int:
+    result = 0
+    i = 0
+    while vec:
+        if vec & 1:
+            result ^= mat[i]
+        vec >>= 1
+        i += 1
+    return result
+
+
+def _gf2_square(mat: list) -> list:
+    return [_gf2_times(mat, mat[n]) for n in range(32)]
+
+
+def _powers() -> list:
+    if not _crc_powers:
+        with _crc_lock:
+            if not _crc_powers:
+                # 一个零比特对应的矩阵，平方三次得到一个零字节
+                mat = [0xEDB88320] + [1 << n for n in range(31)]
+                for _ in range(3):
+                    mat = _gf2_square(mat)
+                powers = []
+                for _ in range(64):
+                    powers.append(mat)
+                    mat = _gf2_square(mat)
+                _crc_powers.extend(powers)
+    return _crc_powers
+
+
+def crc32_combine(crc1: int, crc2: int, len2: int) -> int:
+    """返回 crc32(A + B)，其中 crc1 = crc32(A)，crc2 = crc32(B)，len2 = len(B)。"""
+    powers = _powers()
+    k = 0
+    while len2:
+        if len2 & 1:
+            crc1 = _gf2_times(powers[k], crc1)
+        len2 >>= 1
+        k += 1
+    return crc1 ^ crc2
+
+
+# ── 目录遍历 ───────────────────────────────────────────────────
+
+def walk_files(real_path: str, basename: str, on_skip: Optional[Callable] = None):
+    """按确定顺序（名称排序）遍历 real_path 下的文件，产出 (本地路径, 归档内路径)。
+
+    real_path 为文件时只产出它本身。解析后位于 real_path 之外的路径（符号链接）被跳过，
+    跳过时调用 on_skip(本地路径, 原因)。上传过程中的隐藏文件与目录不包含在内。
+    """
+    if os.path.isfile(real_path):
+        yield real_path, basename
+        return
+    root_real = os.path.realpath(real_path)
+    for dirpath, dirnames, filenames in os.walk(real_path):
+        dirnames[:] = sorted(d for d in dirnames if not is_hidden(d))
+        rel_dir = os.path.relpath(dirpath, real_path)
+        prefix = basename if rel_dir == "." else basename + "/" + rel_dir.replace(os.sep, "/")
+        for fn in sorted(filenames):
+            if is_hidden(fn):
+                continue
+            fp = os.path.join(dirpath, fn)
+            resolved = os.path.realpath(fp)
+            if not (resolved == root_real or resolved.startswith(root_real + os.sep)):
+                if on_skip is not None:
+                    on_skip(fp, f"out-of-tree path -> {resolved}")
+                continue
+            yield fp, prefix + "/" + fn
+
+
+# ── ZIP 结构 ───────────────────────────────────────────────────
+
+def dos_datetime(mtime: float) -> tuple:
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return 0, (1 << 5) | 1  # 1980-01-01 00:00
+    dos_time = (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+    dos_date = ((min(t.tm_year, 2107) - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday
+    return dos_time, dos_date
+
+
+class ZipEntry:
+    """归档中的一个文件，记录写出过程中累计的 CRC 与大小。"""
+
+    __slots__ = ("arcname", "name_bytes", "mode", "dos_time", "dos_date", "size",
+                 "zip64", "method", "offset", "crc", "compressed", "uncompressed", "fd")
+
+    def __init__(self, arcname: str, st: os.stat_result, method: int = _DEFLATED, fd: Optional[int] = None) -> None:
+        self.arcname = arcname
+        self.name_bytes = arcname.encode("utf-8")
+        self.mode = st.st_mode
+        self.dos_time, self.dos_date = dos_datetime(st.st_mtime)
+        self.size = st.st_size
+        self.zip64 = st.st_size >= _ZIP64_FILE_THRESHOLD
+        self.method = method
+        self.offset = 0
+        self.crc = 0
+        self.compressed = 0
+        self.uncompressed = 0
+        self.fd = fd
+
+    def local_header(self, flags: int = _FLAG_DESCRIPTOR | _FLAG_UTF8,
+                     crc: int = 0, compressed: int = 0, uncompressed: int = 0) -> bytes:
+        extra = b""
+        if self.zip64:
+            extra = struct.pack("<HHQQ", 0x0001, 16, uncompressed, compressed)
+            compressed = uncompressed = _ZIP32_LIMIT
+        return struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, 45 if self.zip64 else 20, flags, self.method,
+            self.dos_time, self.dos_date, crc, compressed, uncompressed,
+            len(self.name_bytes), len(extra),
+        ) + self.name_bytes + extra
+
+    def data_descriptor(self) -> bytes:
+        if self.zip64:
+            return struct.pack("<IIQQ", 0x08074B50, self.crc, self.compressed, self.uncompressed)
+        return struct.pack("<IIII", 0x08074B50, self.crc, self.compressed, self.uncompressed)
+
+    def central_header(self, flags: int = _FLAG_DESCRIPTOR | _FLAG_UTF8) -> bytes:
+        fields = []
+        compressed, uncompressed, offset = self.compressed, self.uncompressed, self.offset
+        if uncompressed >= _ZIP32_LIMIT or self.zip64:
+            fields.append(uncompressed)
+            uncompressed = _ZIP32_LIMIT
+        if compressed >= _ZIP32_LIMIT or self.zip64:
+            fields.append(compressed)
+            compressed = _ZIP32_LIMIT
+        if offset >= _ZIP32_LIMIT:
+            fields.append(offset)
+            offset = _ZIP32_LIMIT
+        extra = b""
+        if fields:
+            extra = struct.pack("<HH", 0x0001, 8 * len(fields)) + struct.pack("<" + "Q" * len(fields), *fields)
+        version = 45 if fields else 20
+        return struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | version, version, flags, self.method,
+            self.dos_time, self.dos_date, self.crc, compressed, uncompressed,
+            len(self.name_bytes), len(extra), 0, 0, 0, (self.mode & 0xFFFF) << 16, offset,
+        ) + self.name_bytes + extra
+
+
+def end_of_central_directory(count: int, cd_offset: int, cd_size: int) -> bytes:
+    """中央目录之后的结束记录，必要时附带 ZIP64 结束记录与定位器。"""
+    out = b""
+    if count >= _ZIP32_COUNT_LIMIT or cd_offset >= _ZIP32_LIMIT or cd_size >= _ZIP32_LIMIT:
+        zip64_eocd_offset = cd_offset + cd_size
+        out += struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, count, count, cd_size, cd_offset)
+        out += struct.pack("<IIQI", 0x07064B50, 0, zip64_eocd_offset, 1)
+        count = min(count, _ZIP32_COUNT_LIMIT)
+        cd_offset = min(cd_offset, _ZIP32_LIMIT)
+        cd_size = min(cd_size, _ZIP32_LIMIT)
+    out += struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0)
+    return out
+
+
+# ── 并行压缩 ───────────────────────────────────────────────────
+
+def _compress_block(fd: int, offset: int, length: int, last: bool, level: int) -> tuple:
+    data = pread(fd, length, offset) if length else b""
+    if offset:
+        start = max(0, offset - _WINDOW)
+        zdict = pread(fd, offset - start, start)
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, zdict)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    out = compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    return zlib.crc32(data), len(data), out
+
+
+class ParallelZipWriter:
+    """把文件写成 ZIP 流。write 为输出函数（接收 bytes），executor 为压缩线程池。
+
+    max_inflight 限制同时在途（已提交未写出）的块数，内存占用约为
+    max_inflight × block_size 的两倍。
+    """
+
+    def __init__(
+        self,
+        write: Callable[[bytes], object],
+        executor,
+        max_inflight: int,
+        level: int = 6,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        on_skip: Optional[Callable] = None,
+    ) -> None:
+        self._write = write
+        self.executor = executor
+        self.max_inflight = max(1, max_inflight)
+        self.level = level
+        self.block_size = block_size
+        self.on_skip = on_skip
+        self.position = 0
+        self.entries: list = []
+
+    def _emit(self, data: bytes) -> None:
+        if data:
+            self._write(data)
+            self.position += len(data)
+
+    def write_files(self, files: Iterable) -> None:
+        """写入 (本地路径, 归档内路径) 序列中的所有文件以及中央目录。"""
+        pending: deque = deque()
+        opened: list = []
+        try:
+            for path, arcname in files:
+                entry = self._open(path, arcname)
+                if entry is None:
+                    continue
+                opened.append(entry)
+                offset = 0
+                while True:
+                    length = min(self.block_size, entry.size - offset)
+                    last = offset + length >= entry.size
+                    future = self.executor.submit(_compress_block, entry.fd, offset, length, last, self.level)
+                    pending.append((entry, offset == 0, last, future))
+                    while len(pending) >= self.max_inflight:
+                        self._drain(pending.popleft())
+                    if last:
+                        break
+                    offset += length
+            while pending:
+                self._drain(pending.popleft())
+            self._finish()
+        finally:
+            for _, _, _, future in pending:
+                future.cancel()
+            for _, _, _, future in pending:
+                if not future.cancelled():
+                    try:
+                        future.result()
+                    except Exception:
+                        pass
+            for entry in opened:
+                if entry.fd is not None:
+                    os.close(entry.fd)
+                    entry.fd = None
+
+    def _open(self, path: str, arcname: str) -> Optional[ZipEntry]:
+        try:
+            fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+        except OSError as e:
+            if self.on_skip is not None:
+                self.on_skip(path, e)
+            return None
+        try:
+            st = os.fstat(fd)
+        except OSError as e:
+            os.close(fd)
+            if self.on_skip is not None:
+                self.on_skip(path, e)
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            os.close(fd)
+            return None
+        return ZipEntry(arcname, st, _DEFLATED, fd)
+
+    def _drain(self, item: tuple) -> None:
+        entry, first, last, future = item
+        crc, length, out = future.result()
+        if first:
+            entry.offset = self.position
+            self._emit(entry.local_header())
+            entry.crc = crc
+        else:
+            entry.crc = crc32_combine(entry.crc, crc, length)
+        self._emit(out)
+        entry.compressed += len(out)
+        entry.uncompressed += length
+        if last:
+            self._emit(entry.data_descriptor())
+            os.close(entry.fd)
+            entry.fd = None
+            self.entries.append(entry)
+
+    def _finish(self) -> None:
+        cd_offset = self.position
+        for entry in self.entries:
+            self._emit(entry.central_header())
+        self._emit(end_of_central_directory(len(self.entries), cd_offset, self.position - cd_offset))
@@ -0,0 +1,43 @@
+from http import HTTPStatus
+
+from . import BaseService, Route
+from .. import Handler
+from ..Metrics import Metrics
+
+_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsService(BaseService):
+    """以 Prometheus 文本格式导出请求指标（见 cryskura.Metrics）。
+
+    加入 HTTPServer 的服务列表后，服务器在处理每个请求时记录指标；没有 MetricsService 时不做任何记录。
+    导出时附带各服务的缓存统计、服务器引擎统计与 TLS 握手统计。
+    """
+
+    def __init__(self, remote_path="/metrics", metrics: Metrics = None, auth_func=None, host=None, port=None):
+        self.routes = [
+            Route(remote_path, ["GET", "HEAD"], "exact", host, port),
+        ]
+        super().__init__(self.routes, auth_func)
+        self.remote_path = self.routes[0].path
+        self.metrics = metrics if metrics is not None else Metrics()
+        # 由 HTTPServer 在创建时设置
+        self.server = None
+
+    def _send(self, request: Handler, path: list, args: dict, method: str) -> None:
+        if not self.auth_verify(request, path, args, method):
+            return
+        body = self.metrics.render(self.server).encode("utf-8")
+        request.send_response(HTTPStatus.OK)
+        request.send_header("Content-Type", _CONTENT_TYPE)
+        request.send_header("Content-Length", str(len(body)))
+        request.send_header("Cache-Control", "no-store")
+        request.end_headers()
+        if method == "GET":
+            request.wfile.write(body)
+
+    def handle_GET(self, request: Handler, path: list, args: dict):
+        self._send(request, path, args, "GET")
+
+    def handle_HEAD(self, request: Handler, path: list, args: dict):
+        self._send(request, path, args, "HEAD")
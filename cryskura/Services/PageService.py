@@ -1,59 +1,83 @@
 from . import BaseService, Route
+from .FileService.encoding import ContentEncoder
+from .FileService.fdcache import OpenFileCache
+from .FileService.objcache import HotObjectCache
+from .FileService.resolve import PathResolver
+from .FileService.static import serve_file
 from .. import Handler
 import os
+import stat
 from http import HTTPStatus
 
 class PageService(BaseService):
-    def __init__(self, local_path, remote_path,index_pages=("index.html", "index.htm"),auth_func=None,host=None,port=None):
+    def __init__(self, local_path, remote_path,index_pages=("index.html", "index.htm"),auth_func=None,host=None,port=None,resolve_cache_size=4096,resolve_cache_ttl=2.0,open_file_cache:OpenFileCache=None,object_cache:HotObjectCache=None,precompressed=True,compression:ContentEncoder=None):
         self.routes = [
             Route(remote_path, ["GET","HEAD"], "prefix",host,port),
         ]
         self.local_path = os.path.abspath(local_path)
         self.index_pages = index_pages
+        # 路径解析缓存，每个请求只需一次 stat；设为 0 关闭
+        self.resolver = PathResolver(self.local_path, resolve_cache_ttl, resolve_cache_size)
+        # 可选的已打开文件缓存，可在多个服务之间共享
+        self.open_file_cache = open_file_cache
+        # 可选的小文件内存缓存，可在多个服务之间共享
+        self.object_cache = object_cache
+        # 存在 .br / .gz 旁路文件时按 Accept-Encoding 发送；compression 为可选的实时压缩配置
+        self.precompressed = precompressed
+        self.compression = compression
         super().__init__(self.routes, auth_func)
         self.remote_path = self.routes[0].path
-    
-    def calc_path(self, path:list):
+
+    def resolve(self, path:list):
+        # 返回 (isValid, r_directory, r_path, real_path, stat)，目录会被解析为其中的首页文件
         sub_path = path[len(self.remote_path):]
-        r_directory=os.path.abspath(self.local_path)
+        r_directory=self.local_path
         r_path='/'+'/'.join(sub_path)
-        real_path = os.path.join(r_directory, '/'.join(sub_path))
-        isValid = False
-        common_path = os.path.commonpath([real_path, self.local_path])
-        if os.path.exists(real_path) and os.path.samefile(common_path, self.local_path):
-            if os.path.isfile(real_path):
-                isValid = True
-            else:
-                for file in self.index_pages:
-                    if os.path.exists(os.path.join(real_path, file)):
-                        isValid = True
-                        r_path = os.path.join(r_path, file)
-                        break
+        resolved = self.resolver.resolve(os.path.join(r_directory, '/'.join(sub_path)), tuple(sub_path))
+        if resolved.is_file:
+            return True, r_directory, r_path, resolved.real_path, resolved.stat
+        if resolved.is_dir:
+            for file in self.index_pages:
+                index_path = os.path.join(resolved.real_path, file)
+                try:
+                    st = os.stat(index_path)
+                except OSError:
+                    continue
+                if stat.S_ISREG(st.st_mode):
+                    return True, r_directory, os.path.join(r_path, file), index_path, st
+        return False, r_directory, r_path, resolved.real_path, None
+
+    def calc_path(self, path:list):
+        isValid, r_directory, r_path, _, _ = self.resolve(path)
         return isValid, r_directory, r_path
 
     def handle_GET(self, request:Handler, path:list,args:dict):
         if not self.auth_verify(request, path, args, "GET"):
             return
-        isValid, request.directory, request.path = self.calc_path(path)
+        isValid, request.directory, request.path, real_path, st = self.resolve(path)
         if not isValid:
             request.errsvc.handle(request, path, args, "GET",HTTPStatus.NOT_FOUND)
             return
-        f = request.send_head()
-        if f:
-            try:
-                request.copyfile(f, request.wfile)
-            except Exception as e:
-                f.close()
-                raise e
-            f.close()
-    
+        serve_file(request, real_path, st, cache=self.open_file_cache, objects=self.object_cache,
+                   precompressed=self.precompressed, encoder=self.compression)
+
     def handle_HEAD(self, request:Handler, path:list,args:dict):
         if not self.auth_verify(request, path, args, "HEAD"):
             return
-        isValid,request.directory, request.path = self.calc_path(path)
+        isValid,request.directory, request.path, real_path, st = self.resolve(path)
         if not isValid:
             request.errsvc.handle(request, path, args, "HEAD",HTTPStatus.NOT_FOUND)
             return
-        f = request.send_head()
-        if f:
-            f.close()
\ No newline at end of file
+        serve_file(request, real_path, st, send_body=False, cache=self.open_file_cache, objects=self.object_cache,
+                   precompressed=self.precompressed, encoder=self.compression)
+
+    def stats(self):
+        # 返回各缓存的命中统计
+        stats = {"resolve": self.resolver.stats()}
+        if self.open_file_cache is not None:
+            stats["open_file"] = self.open_file_cache.stats()
+        if self.object_cache is not None:
+            stats["object"] = self.object_cache.stats()
+        if self.compression is not None:
+            stats["compression"] = self.compression.stats()
+        return stats
@@ -39,6 +39,7 @@ class RedirectService(BaseService):
         r_path = self.calc_path(path,request)
         request.send_response(HTTPStatus.MOVED_PERMANENTLY)
         request.send_header("Location", r_path)
+        request.send_header("Content-Length", "0")
         request.end_headers()
     
     def handle_HEAD(self, request:Handler, path:list,args:dict):
@@ -47,6 +48,7 @@ class RedirectService(BaseService):
         r_path = self.calc_path(path,request)
         request.send_response(HTTPStatus.MOVED_PERMANENTLY)
         request.send_header("Location", r_path)
+        request.send_header("Content-Length", "0")
         request.end_headers()
 
     def handle_POST(self, request:Handler, path:list,args:dict):
@@ -55,4 +57,5 @@ class RedirectService(BaseService):
         r_path = self.calc_path(path,request)
         request.send_response(HTTPStatus.PERMANENT_REDIRECT)
         request.send_header("Location", r_path)
+        request.send_header("Content-Length", "0")
         request.end_headers()
@@ -0,0 +1,88 @@
+"""路由表：在服务器启动时把所有服务的 Route 编译为按 (host, port) 分组的路径前缀树。
+
+查找代价与请求路径的深度成正比，与已注册的服务 / 路由数量无关。
+匹配语义与逐个调用 Route.match 完全一致：
+    - 多个路由同时匹配时，按服务注册顺序、服务内路由顺序取第一个支持该方法的路由；
+    - 路径存在但没有路由支持该方法时返回 path_exists=True（405），否则为 404。
+"""
+from __future__ import annotations
+
+from typing import Optional
+
+# 路由未限制 host / port 时使用的通配键，与请求中缺失的 host（None）区分开
+_ANY = object()
+
+
+class _Node:
+    __slots__ = ("children", "prefix", "exact")
+
+    def __init__(self) -> None:
+        self.children: dict = {}
+        # (注册序号, 方法集合, 服务)，按注册序号升序
+        self.prefix: list = []
+        self.exact: list = []
+
+
+class RouteTable:
+    def __init__(self, services: list) -> None:
+        self._roots: dict = {}
+        order = 0
+        for service in services:
+            for route in service.routes:
+                entry = (order, frozenset(route.methods), service)
+                order += 1
+                hosts = route.host if route.host is not None else (_ANY,)
+                ports = route.port if route.port is not None else (_ANY,)
+                for host in hosts:
+                    for port in ports:
+                        self._insert((host, port), route, entry)
+
+    def _insert(self, key: tuple, route, entry: tuple) -> None:
+        node = self._roots.get(key)
+        if node is None:
+            node = self._roots[key] = _Node()
+        for part in route.path:
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = _Node()
+            node = child
+        if route.type == "exact":
+            node.exact.append(entry)
+        else:
+            node.prefix.append(entry)
+
+    def lookup(self, path: list, method: str, host=None, port=None) -> tuple:
+        """返回 (service, path_exists)。没有可处理该请求的路由时 service 为 None。"""
+        best: Optional[tuple] = None
+        path_exists = False
+        roots = self._roots
+        for key in ((host, port), (host, _ANY), (_ANY, port), (_ANY, _ANY)):
+            node = roots.get(key)
+            if node is None:
+                continue
+            depth = len(path)
+            i = 0
+            while True:
+                if node.prefix:
+                    path_exists = True
+                    best = _pick(node.prefix, method, best)
+                if i == depth:
+                    if node.exact:
+                        path_exists = True
+                        best = _pick(node.exact, method, best)
+                    break
+                node = node.children.get(path[i])
+                if node is None:
+                    break
+                i += 1
+        return (best[2] if best is not None else None), path_exists
+
+
+def _pick(entries: list, method: str, best: Optional[tuple]) -> Optional[tuple]:
+    # entries 已按注册序号排序，第一个支持该方法的即为本节点的最佳候选
+    for entry in entries:
+        if best is not None and entry[0] >= best[0]:
+            break
+        if method in entry[1]:
+            return entry
+    return best
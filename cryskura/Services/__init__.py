@@ -3,4 +3,6 @@ from .ErrorService import ErrorService
 from .FileService import FileService
 from .RedirectService import RedirectService
 from .PageService import PageService
-from .APIService import APIService
\ No newline at end of file
+from .APIService import APIService
+from .AssetService import AssetService
+from .MetricsService import MetricsService
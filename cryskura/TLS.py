@@ -0,0 +1,134 @@
+"""HTTPS 配置：证书与私钥、密码套件与 ECDHE 曲线、ALPN、会话恢复，以及握手统计。
+
+    certfile / keyfile   — 证书链与私钥（PEM）；keyfile 为 None 时私钥须与证书在同一文件中
+    ciphers              — TLS 1.2 及以下的 OpenSSL 密码套件字符串（TLS 1.3 的套件不可配置）
+    prefer_server_ciphers — 按服务器而不是客户端的顺序选择密码套件
+    ecdh_curve           — ECDHE 使用的曲线名（如 "prime256v1"），None 使用 OpenSSL 默认
+    alpn                 — 通过 ALPN 宣告的协议，默认只宣告 http/1.1
+    tickets              — 是否签发会话票据（session ticket）
+    num_tickets          — TLS 1.3 每次完整握手后签发的票据数
+    handshake_timeout    — 握手超时（秒）
+
+会话恢复有两种方式：服务器端会话缓存（OpenSSL 默认开启，按进程）与会话票据。
+票据密钥在创建 SSL 上下文时由 OpenSSL 随机生成；上下文在 start() 中、派生工作进程之前创建，
+各工作进程继承同一组密钥，客户端在任一进程上都能用票据恢复会话。
+
+握手在处理连接的线程中进行（asyncio 引擎中由事件循环异步进行），不占用接受连接的线程。
+"""
+from __future__ import annotations
+
+import os
+import threading
+from typing import Optional, Sequence
+
+try:
+    import ssl
+except ImportError:
+    ssl = None
+
+
+class TLSConfig:
+    """HTTPServer 的 TLS 配置，同时记录本进程内的握手统计。"""
+
+    def __init__(
+        self,
+        certfile: Optional[str] = None,
+        keyfile: Optional[str] = None,
+        ciphers: Optional[str] = None,
+        prefer_server_ciphers: bool = True,
+        ecdh_curve: Optional[str] = None,
+        alpn: Sequence[str] = ("http/1.1",),
+        tickets: bool = True,
+        num_tickets: Optional[int] = None,
+        handshake_timeout: float = 10,
+    ) -> None:
+        if ssl is None:
+            raise RuntimeError("SSL module not found. HTTPS is not supported.")
+        for path in (certfile, keyfile):
+            if path is not None and not os.path.exists(path):
+                raise ValueError(f"Certfile {path} does not exist.")
+        if num_tickets is not None and num_tickets < 0:
+            raise ValueError(f"num_tickets must be non-negative, got {num_tickets}.")
+        if handshake_timeout is None or handshake_timeout <= 0:
+            raise ValueError(f"handshake_timeout must be positive, got {handshake_timeout}.")
+        self.certfile = certfile
+        self.keyfile = keyfile
+        self.ciphers = ciphers
+        self.prefer_server_ciphers = prefer_server_ciphers
+        self.ecdh_curve = ecdh_curve
+        self.alpn = tuple(alpn or ())
+        self.tickets = tickets
+        self.num_tickets = num_tickets
+        self.handshake_timeout = handshake_timeout
+        self.context = None
+        self._lock = threading.Lock()
+        self._handshakes = 0
+        self._resumed = 0
+        self._failures = 0
+
+    def create_context(self):
+        """创建服务器端 SSL 上下文。certfile 未设置时抛出 ValueError。"""
+        if self.certfile is None:
+            raise ValueError("TLS requires a certificate file.")
+        ctx = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        try:
+            ctx.load_cert_chain(certfile=self.certfile, keyfile=self.keyfile)
+        except Exception as e:
+            raise ValueError(
+                f"Error loading certificate: {e}\nPlease provide a valid certificate file.\nOnly PEM files are supported; "
+                f"pass keyfile if the private key is not in the certificate file.")
+        if self.ciphers is not None:
+            ctx.set_ciphers(self.ciphers)
+        if self.prefer_server_ciphers:
+            ctx.options |= ssl.OP_CIPHER_SERVER_PREFERENCE
+        if self.ecdh_curve is not None:
+            ctx.set_ecdh_curve(self.ecdh_curve)
+        if self.alpn and ssl.HAS_ALPN:
+            ctx.set_alpn_protocols(list(self.alpn))
+        if not self.tickets:
+            ctx.options |= ssl.OP_NO_TICKET
+        elif self.num_tickets is not None:
+            ctx.num_tickets = self.num_tickets
+        self.context = ctx
+        return ctx
+
+    def handshake(self, sock) -> bool:
+        """在已接受的连接上完成握手（带超时），返回是否成功。"""
+        timeout = sock.gettimeout()
+        sock.settimeout(self.handshake_timeout)
+        try:
+            sock.do_handshake()
+        except (ssl.SSLError, OSError):
+            self.record_failure()
+            return False
+        finally:
+            sock.settimeout(timeout)
+        self.record_handshake(sock)
+        return True
+
+    def record_handshake(self, ssl_object) -> None:
+        """记录一次完成的握手；ssl_object 为 SSLSocket 或 SSLObject。"""
+        resumed = ssl_object.session_reused
+        with self._lock:
+            self._handshakes += 1
+            if resumed:
+                self._resumed += 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+
+    def stats(self) -> dict:
+        """返回本进程的握手统计（多进程模式下为各工作进程分别统计）。
+
+        session_cache 为 OpenSSL 服务器端会话缓存的统计（SSLContext.session_stats）。
+        """
+        with self._lock:
+            result = {
+                "handshakes": self._handshakes,
+                "resumed": self._resumed,
+                "full_handshakes": self._handshakes - self._resumed,
+                "failures": self._failures,
+            }
+        result["session_cache"] = self.context.session_stats() if self.context is not None else {}
+        return result
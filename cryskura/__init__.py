@@ -4,4 +4,5 @@ __license__ = "MIT"
 
 from .Server import HTTPServer as Server
 from .Handler import HTTPRequestHandler as Handler
+from .TLS import TLSConfig
 from .uPnP import uPnPClient as uPnP
\ No newline at end of file
@@ -22,7 +22,8 @@ setup(
     packages=find_packages(),
     install_requires=["psutil"],
     extras_require={
-        'upnp': ["upnpclient"]
+        'upnp': ["upnpclient"],
+        'zstd': ["zstandard"]
     },
     python_requires=">=3.7",
     url="https://github.com/HofNature/CryskuraHTTP",